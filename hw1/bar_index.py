@@ -0,0 +1,102 @@
+"""
+Sorted (futcode, timestamp) index over a loaded futures frame.
+
+ContractIndex sorts the rows of a frame by (futcode, date) once. After that,
+the rows of any contract and time window are one contiguous range of the
+sort permutation, located with two binary searches instead of a boolean mask
+over the whole frame.
+
+The index keeps only the permutation, the sorted timestamps and the
+(start, stop) range of each futcode, not the frame itself: rows are taken
+from the frame passed to each lookup, so the index never holds a frame alive.
+"""
+import numpy as np
+import pandas as pd
+
+
+class ContractIndex:
+    """Sort permutation of futures rows by (futcode, date) with binary-search slicing."""
+
+    def __init__(self, df):
+        """
+        Args:
+            df: DataFrame with futcode and date columns (not modified or kept)
+        """
+        dates = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ns]').view('int64')
+        codes = df['futcode'].to_numpy(dtype='int64')
+        order = np.lexsort((dates, codes))
+        codes = codes[order]
+
+        self.order = order
+        self.dates = dates[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) > 0 else np.empty(0, 'int64')
+        self.futcodes = codes[starts]
+        self.starts = starts
+        self.stops = np.r_[starts[1:], len(codes)].astype('int64')
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def first_date(self):
+        """Earliest timestamp in the frame."""
+        return pd.Timestamp(int(self.dates.min())) if len(self.dates) > 0 else None
+
+    def bounds(self, futcode, start=None, end=None):
+        """
+        Range of one contract within a time window.
+
+        Args:
+            futcode: Futcode of the contract
+            start: Optional first timestamp (inclusive)
+            end: Optional last timestamp (exclusive)
+
+        Returns:
+            Tuple (lo, hi) of positions into self.order
+        """
+        i = np.searchsorted(self.futcodes, futcode)
+        if i == len(self.futcodes) or self.futcodes[i] != futcode:
+            return 0, 0
+        lo, hi = self.starts[i], self.stops[i]
+        if start is not None:
+            lo += np.searchsorted(self.dates[lo:hi], pd.Timestamp(start).value, side='left')
+        if end is not None:
+            hi = lo + np.searchsorted(self.dates[lo:hi], pd.Timestamp(end).value, side='left')
+        return int(lo), int(hi)
+
+    def rows(self, df, futcode, start=None, end=None):
+        """
+        Rows of one contract within [start, end), sorted by date.
+
+        Args:
+            df: The indexed DataFrame
+            futcode: Futcode of the contract
+            start: Optional first timestamp (inclusive)
+            end: Optional last timestamp (exclusive)
+
+        Returns:
+            DataFrame of the rows (a copy taken from df)
+        """
+        lo, hi = self.bounds(futcode, start, end)
+        return df.iloc[self.order[lo:hi]]
+
+    def contract_series(self, df, futcode, start=None, end=None):
+        """
+        Close prices of one contract indexed by date (no time component).
+
+        Args:
+            df: The indexed DataFrame
+            futcode: Futcode of the contract
+            start: Optional first timestamp (inclusive)
+            end: Optional last timestamp (exclusive)
+
+        Returns:
+            Series sorted by date, or None if there are no rows
+        """
+        lo, hi = self.bounds(futcode, start, end)
+        if hi <= lo:
+            return None
+        index = pd.DatetimeIndex(self.dates[lo:hi].view('datetime64[ns]')).date
+        close = df['close']
+        return pd.Series(close.to_numpy()[self.order[lo:hi]], index=pd.Index(index, name='date'),
+                         name='close', dtype=close.dtype)
@@ -0,0 +1,237 @@
+"""
+Memory-mapped, append-only bar store.
+
+Bars are kept as one raw binary file per column (the fact-table dtypes of
+bars.FACT_DTYPES) that is opened with np.memmap, plus an offset index with
+one record per (futcode, appended segment): rows [start, stop) of the column
+files hold that contract's bars of one append, sorted by date. Reading a
+contract therefore slices the memory maps without copying or scanning, and
+reopening a large history only maps the files; pages are read on touch.
+
+Layout of a store directory:
+
+    meta.json          committed row and segment counts, column dtypes
+    <column>.bin       raw column values (date as int64 nanoseconds)
+    index.bin          offset index records (INDEX_DTYPE)
+    contracts.parquet  contract dimension table
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from bars import ContractBars, FACT_DTYPES
+
+# Offset index record: rows [start, stop) hold one contract's bars of one append
+INDEX_DTYPE = np.dtype([
+    ('futcode', 'int32'),
+    ('start', 'int64'),
+    ('stop', 'int64'),
+    ('first_date', 'int64'),
+    ('last_date', 'int64')
+])
+
+
+class BarStore:
+    """Append-only store of bars with memory-mapped per-column files."""
+
+    def __init__(self, root):
+        """
+        Open (or create) a store directory.
+
+        Args:
+            root: Directory of the store
+        """
+        self.root = root
+        if not os.path.exists(root):
+            os.makedirs(root)
+        self.meta_path = os.path.join(root, 'meta.json')
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {'rows': 0, 'segments': 0,
+                         'columns': dict({'date': 'int64'}, **FACT_DTYPES)}
+        self._maps = {}
+        self._index = None
+        self._contracts = None
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def column(self, name):
+        """
+        Memory-mapped values of one column (read-only).
+
+        Args:
+            name: Column name ('date' holds int64 nanoseconds)
+
+        Returns:
+            np.memmap of length len(self) (an empty array if the store is empty)
+        """
+        if name not in self._maps:
+            dtype = np.dtype(self.meta['columns'][name])
+            if self.meta['rows'] == 0:
+                return np.empty(0, dtype=dtype)
+            self._maps[name] = np.memmap(self._path(f'{name}.bin'), dtype=dtype, mode='r',
+                                         shape=(self.meta['rows'],))
+        return self._maps[name]
+
+    @property
+    def index(self):
+        """Offset index records of all committed segments."""
+        if self._index is None:
+            if self.meta['segments'] == 0:
+                self._index = np.empty(0, dtype=INDEX_DTYPE)
+            else:
+                self._index = np.memmap(self._path('index.bin'), dtype=INDEX_DTYPE, mode='r',
+                                        shape=(self.meta['segments'],))
+        return self._index
+
+    @property
+    def contracts(self):
+        """Contract dimension table indexed by futcode."""
+        if self._contracts is None:
+            path = self._path('contracts.parquet')
+            self._contracts = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+        return self._contracts
+
+    @property
+    def first_date(self):
+        """Earliest stored bar timestamp."""
+        if len(self.index) == 0:
+            return None
+        return pd.Timestamp(int(self.index['first_date'].min()))
+
+    def append(self, df):
+        """
+        Append bars; rows at or before a contract's last stored date are skipped.
+
+        Args:
+            df: DataFrame from download_futures_data, or ContractBars
+
+        Returns:
+            Number of rows appended
+        """
+        bars = df if isinstance(df, ContractBars) else ContractBars.from_frame(df)
+        fact = bars.bars
+        codes = fact['futcode'].to_numpy(dtype='int32')
+        dates = fact['date'].to_numpy(dtype='datetime64[ns]').view('int64')
+
+        # Append-only: keep only bars newer than each contract's stored history
+        last = pd.Series(self.index['last_date'], index=self.index['futcode']).groupby(level=0).max()
+        cutoff = last.reindex(codes).fillna(np.iinfo('int64').min).to_numpy(dtype='int64')
+        keep = dates > cutoff
+        if not keep.any():
+            return 0
+
+        order = np.lexsort((dates[keep], codes[keep]))
+        codes, dates = codes[keep][order], dates[keep][order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        stops = np.r_[starts[1:], len(codes)]
+
+        base = self.meta['rows']
+        for name, dtype in self.meta['columns'].items():
+            if name == 'date':
+                values = dates
+            elif name in fact.columns:
+                values = fact[name].to_numpy(dtype=dtype)[keep][order]
+            else:
+                values = np.full(len(codes), np.nan if np.dtype(dtype).kind == 'f' else 0, dtype=dtype)
+            with open(self._path(f'{name}.bin'), 'r+b' if base else 'wb') as f:
+                f.seek(base * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+        records = np.empty(len(starts), dtype=INDEX_DTYPE)
+        records['futcode'] = codes[starts]
+        records['start'] = base + starts
+        records['stop'] = base + stops
+        records['first_date'] = dates[starts]
+        records['last_date'] = dates[stops - 1]
+        with open(self._path('index.bin'), 'r+b' if self.meta['segments'] else 'wb') as f:
+            f.seek(self.meta['segments'] * INDEX_DTYPE.itemsize)
+            f.write(records.tobytes())
+
+        contracts = bars.contracts
+        if len(self.contracts) > 0:
+            contracts = pd.concat([self.contracts, contracts[~contracts.index.isin(self.contracts.index)]])
+        contracts.to_parquet(self._path('contracts.parquet'))
+
+        # Commit: the new rows only become visible once meta.json is replaced
+        self.meta['rows'] = base + len(codes)
+        self.meta['segments'] += len(records)
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp_path, self.meta_path)
+
+        self._maps, self._index, self._contracts = {}, None, None
+        return len(codes)
+
+    def contract_slices(self, futcode):
+        """(start, stop) row ranges of one contract, in append order."""
+        segments = self.index[self.index['futcode'] == futcode]
+        return list(zip(segments['start'].tolist(), segments['stop'].tolist()))
+
+    def contract_rows(self, futcode, columns=('date', 'close')):
+        """
+        Column values of one contract.
+
+        Args:
+            futcode: Futcode of the contract
+            columns: Columns to return
+
+        Returns:
+            Dictionary of column name to array; views into the memory maps
+            (no copy) when the contract was written in a single append
+        """
+        slices = self.contract_slices(futcode)
+        rows = {}
+        for name in columns:
+            values = self.column(name)
+            parts = [values[start:stop] for start, stop in slices]
+            if len(parts) == 1:
+                rows[name] = parts[0]
+            elif parts:
+                rows[name] = np.concatenate(parts)
+            else:
+                rows[name] = np.empty(0, dtype=values.dtype)
+        return rows
+
+    def contract_series(self, futcode):
+        """
+        Close prices of one contract indexed by date (no time component).
+
+        Args:
+            futcode: Futcode of the contract
+
+        Returns:
+            Series sorted by date, or None if the contract has no bars
+        """
+        rows = self.contract_rows(futcode)
+        if len(rows['date']) == 0:
+            return None
+        dates = pd.DatetimeIndex(np.asarray(rows['date']).view('datetime64[ns]'))
+        return pd.Series(rows['close'], index=dates.date, name='close').rename_axis('date')
+
+    def contract_counts(self):
+        """Row count, symbol and last trade date per futcode."""
+        index = pd.DataFrame({'futcode': self.index['futcode'].astype('int64'),
+                              'count': self.index['stop'] - self.index['start']})
+        counts = index.groupby('futcode')[['count']].sum()
+        meta = self.contracts[[col for col in ['dsmnem', 'lasttrddate'] if col in self.contracts.columns]]
+        return counts.join(meta.set_axis(meta.index.astype('int64')))
+
+    def frame(self, columns=None):
+        """Denormalized DataFrame of all stored bars (see ContractBars.frame)."""
+        return self.to_contract_bars().frame(columns)
+
+    def to_contract_bars(self):
+        """All stored bars as ContractBars (copied into memory)."""
+        bars = pd.DataFrame({name: np.asarray(self.column(name)) for name in self.meta['columns']})
+        bars['date'] = bars['date'].to_numpy().view('datetime64[ns]')
+        bars = bars.sort_values('date', kind='stable').reset_index(drop=True)
+        return ContractBars(self.contracts, bars)
@@ -0,0 +1,312 @@
+"""
+Benchmarks of the FuturesSpreadAnalyzer stages on synthetic minute bars.
+
+For each data size, a synthetic tr_ds_fut database (see synthetic.py) is
+written once to the work directory and the two-spread pipeline runs on it
+stage by stage:
+
+    download_many, identify_top_contracts, prepare_contract_data,
+    calculate_calendar_spread, analyze_spread_dynamics,
+    analyze_cross_spread_dynamics, create_visualizations, generate_report
+
+Every stage is timed over several repeats (memoized rolling means and
+indexes are cleared in between), and its peak Python memory is measured
+with tracemalloc in one extra run. One JSON line per (stage, size) is
+appended to the results file with the git commit, so runs of different
+versions can be compared (asv style): a stage is flagged as a regression
+when its best time or peak memory exceeds the latest result of another
+commit by more than the threshold.
+
+The results file and work directory default to benchmarks/ (both ignored
+by git) and can be moved with FUTURES_BENCH_RESULTS and
+FUTURES_BENCH_WORK_DIR, e.g. to keep the history outside the checkout.
+
+Usage:
+    python benchmarks/bench_pipeline.py --sizes 1e4 1e5 1e6
+    python benchmarks/bench_pipeline.py --baseline 5293224 --fail-on-regression
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pandas as pd
+import numpy as np
+
+from main import FuturesSpreadAnalyzer
+from synthetic import SyntheticFutures
+
+DEFAULT_SIZES = [1e4, 1e5, 1e6]  # Bars in the synthetic database
+RESULTS_PATH = os.getenv("FUTURES_BENCH_RESULTS", os.path.join(HERE, 'results.jsonl'))  # Ignored by git
+WORK_DIR = os.getenv("FUTURES_BENCH_WORK_DIR", os.path.join(HERE, 'work'))  # Ignored by git
+REGRESSION_THRESHOLD = 0.2  # Relative slowdown (or memory growth) flagged as a regression
+MIN_REGRESSION = {'seconds': 0.005, 'peak_mb': 1.0}  # Absolute increases below these are timer/allocator noise
+TICKERS = ['CL', 'HO']  # The two spreads of the benchmarked pipeline
+BAR_FREQ = '1m'
+
+
+def git_commit():
+    """
+    Short hash of the checked-out commit (with a '+' if the tree is dirty).
+
+    Only tracked files count: the results file and work directory are
+    untracked (and ignored), so recording results does not dirty the tree.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=HERE,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('+' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def synthetic_database(size, work_dir=WORK_DIR):
+    """
+    Path and generator of the synthetic database for a size, written if missing.
+
+    Args:
+        size: Number of bars
+        work_dir: Directory of the generated databases
+
+    Returns:
+        Tuple of (path, SyntheticFutures)
+    """
+    generator = SyntheticFutures.for_rows(size, freq=BAR_FREQ, tickers=TICKERS)
+    path = os.path.join(work_dir, f'synthetic_{int(size)}.db')
+    if not os.path.exists(path):
+        if not os.path.exists(work_dir):
+            os.makedirs(work_dir)
+        print(f"Generating {int(size):,} synthetic bars: {path}")
+        generator.write(path + '.tmp')
+        os.replace(path + '.tmp', path)
+    return path, generator
+
+
+class StageTimer:
+    """Runs pipeline stages with repeats and collects timing and memory records."""
+
+    def __init__(self, analyzer, size, repeat=3, verbose=False):
+        """
+        Args:
+            analyzer: FuturesSpreadAnalyzer on the synthetic database
+            size: Data size label of the records
+            repeat: Timed runs per stage
+            verbose: Show the analyzer's progress output
+        """
+        self.analyzer = analyzer
+        self.size = size
+        self.repeat = repeat
+        self.verbose = verbose
+        self.records = []
+
+    def _call(self, fn):
+        self.analyzer.rolling.clear()
+        self.analyzer._indexes.clear()
+        if self.verbose:
+            return fn()
+        with redirect_stdout(io.StringIO()):
+            return fn()
+
+    def run(self, stage, fn, rows):
+        """
+        Time one stage.
+
+        Args:
+            stage: Stage name
+            fn: Callable running the stage (called repeat + 1 times)
+            rows: Rows processed by the stage (for the throughput)
+
+        Returns:
+            Result of the last call of fn
+        """
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = self._call(fn)
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            result = self._call(fn)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        best = min(times)
+        record = {
+            'stage': stage,
+            'size': int(self.size),
+            'rows': int(rows),
+            'seconds': best,
+            'seconds_mean': float(np.mean(times)),
+            'rows_per_second': rows / best if best > 0 else None,
+            'peak_mb': peak / 1e6
+        }
+        self.records.append(record)
+        print(f"  {stage:<32} {best * 1e3:10.1f} ms  {record['peak_mb']:8.1f} MB  "
+              f"{int(rows):>12,} rows")
+        return result
+
+
+def benchmark_size(size, repeat=3, work_dir=WORK_DIR, verbose=False):
+    """
+    Benchmark all stages on the synthetic database of one size.
+
+    Returns:
+        List of record dictionaries
+    """
+    path, generator = synthetic_database(size, work_dir)
+    start_date, end_date = str(generator.start_date.date()), str(generator.end_date.date())
+    with redirect_stdout(io.StringIO()):
+        analyzer = FuturesSpreadAnalyzer(None, None, source=f'sqlite:{path}',
+                                         start_date=start_date, end_date=end_date)
+    output_dir = os.path.join(work_dir, f'output_{int(size)}')
+    timer = StageTimer(analyzer, size, repeat=repeat, verbose=verbose)
+    print(f"\nSize {int(size):,} ({start_date} to {end_date})")
+
+    try:
+        downloads = timer.run('download_many',
+                              lambda: analyzer.download_many(TICKERS, start_date, end_date, intraday=True),
+                              size)
+        frames = [downloads[ticker] for ticker in TICKERS]
+        total_rows = sum(len(df) for df in frames)
+
+        contracts = timer.run('identify_top_contracts',
+                              lambda: [analyzer.identify_top_contracts(df, n_contracts=2) for df in frames],
+                              total_rows)
+
+        def prepare():
+            return [(analyzer.prepare_contract_data(df, codes[0], freq=BAR_FREQ),
+                     analyzer.prepare_contract_data(df, codes[1], freq=BAR_FREQ))
+                    for df, codes in zip(frames, contracts)]
+        legs = timer.run('prepare_contract_data', prepare, total_rows)
+
+        spreads = timer.run('calculate_calendar_spread',
+                            lambda: [analyzer.calculate_calendar_spread(second, front) for front, second in legs],
+                            sum(len(front) for front, _ in legs))
+        spread_rows = sum(len(spread) for spread in spreads)
+
+        labels = [f'{ticker} Calendar Spread' for ticker in TICKERS]
+        results = timer.run('analyze_spread_dynamics',
+                            lambda: [analyzer.analyze_spread_dynamics(spread, label)
+                                     for spread, label in zip(spreads, labels)],
+                            spread_rows)
+        cross = timer.run('analyze_cross_spread_dynamics',
+                          lambda: analyzer.analyze_cross_spread_dynamics(spreads[0], spreads[1], *labels),
+                          spread_rows)
+        timer.run('create_visualizations',
+                  lambda: analyzer.create_visualizations(results[0], results[1], cross, output_dir=output_dir),
+                  spread_rows)
+        timer.run('generate_report',
+                  lambda: analyzer.generate_report(results[0], results[1], cross, output_dir=output_dir),
+                  spread_rows)
+    finally:
+        with redirect_stdout(io.StringIO()):
+            analyzer.close()
+    return timer.records
+
+
+def load_results(path=RESULTS_PATH):
+    """All recorded benchmark results as a DataFrame."""
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def find_regressions(records, history, baseline=None, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare new records with the latest results of another commit.
+
+    Args:
+        records: New record dictionaries (with 'commit')
+        history: DataFrame of earlier results (load_results)
+        baseline: Commit to compare against (default: the latest other commit
+            with a result for the same stage and size)
+        threshold: Relative increase of time or peak memory that is flagged
+            (if also above MIN_REGRESSION)
+
+    Returns:
+        List of (record, baseline record, metric, ratio) tuples
+    """
+    regressions = []
+    if len(history) == 0:
+        return regressions
+    for record in records:
+        previous = history[(history['stage'] == record['stage']) & (history['size'] == record['size'])
+                           & (history['commit'] != record['commit'])]
+        if baseline is not None:
+            previous = previous[previous['commit'].str.startswith(baseline)]
+        if len(previous) == 0:
+            continue
+        reference = previous.iloc[-1]
+        for metric in ('seconds', 'peak_mb'):
+            if reference[metric] > 0 and record[metric] - reference[metric] > MIN_REGRESSION[metric]:
+                ratio = record[metric] / reference[metric]
+                if ratio > 1 + threshold:
+                    regressions.append((record, reference, metric, ratio))
+    return regressions
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the spread pipeline stages")
+    parser.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES, help="Bars per dataset")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage")
+    parser.add_argument('--results', default=RESULTS_PATH, help="JSON lines file of results")
+    parser.add_argument('--work-dir', default=WORK_DIR, help="Directory of the synthetic databases")
+    parser.add_argument('--baseline', help="Commit to compare against (default: latest other commit)")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown flagged as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit with status 1 on regressions")
+    parser.add_argument('--verbose', action='store_true', help="Show the analyzer output")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    run = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__
+    }
+    print("=" * 80)
+    print(f"SPREAD PIPELINE BENCHMARK: commit {commit}, sizes {', '.join(f'{int(s):,}' for s in args.sizes)}")
+    print("=" * 80)
+
+    history = load_results(args.results)
+    records = []
+    for size in args.sizes:
+        records.extend(dict(run, **record) for record in benchmark_size(size, args.repeat, args.work_dir,
+                                                                          args.verbose))
+
+    with open(args.results, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    print(f"\nSaved: {args.results} ({len(records)} results)")
+
+    regressions = find_regressions(records, history, args.baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) (threshold {args.threshold:.0%}):")
+        for record, reference, metric, ratio in regressions:
+            print(f"  {record['stage']} @ {record['size']:,}: {metric} {reference[metric]:.4g} "
+                  f"({reference['commit']}) -> {record[metric]:.4g} ({ratio:.2f}x)")
+    else:
+        print("\nNo regressions")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
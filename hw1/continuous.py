@@ -0,0 +1,235 @@
+"""
+Continuous back-adjusted futures series.
+
+ContinuousContractBuilder stitches the nearby contracts of one product into
+a single series. The held contract rolls either on the contract calendar
+(N days before the roll date) or when the next contract's volume or open
+interest overtakes the current one. Each stored row keeps the raw close and
+the cumulative roll adjustment at that date, so back-adjusted prices are
+derived on read:
+
+    difference:  adjusted(t) = close(t) + (total_adjustment - adjustment(t))
+    ratio:       adjusted(t) = close(t) * (total_adjustment / adjustment(t))
+
+Appending a new day therefore never rewrites history, and the stitched rows
+are persisted as append-only Parquet parts next to a small JSON state file.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+ROLL_RULES = ['calendar', 'volume', 'open_interest']
+ADJUSTMENTS = ['difference', 'ratio']
+
+
+class ContinuousContractBuilder:
+    """Incrementally stitched continuous contract with back-adjustment."""
+
+    def __init__(self, calendar, roll_rule='calendar', adjustment='difference', roll_days_before=0):
+        """
+        Args:
+            calendar: ContractCalendar of the product
+            roll_rule: 'calendar', 'volume' or 'open_interest'
+            adjustment: 'difference' or 'ratio' back-adjustment
+            roll_days_before: For the calendar rule, roll this many calendar
+                days before the current contract's roll date
+        """
+        if roll_rule not in ROLL_RULES:
+            raise ValueError(f"Unknown roll rule: {roll_rule}")
+        if adjustment not in ADJUSTMENTS:
+            raise ValueError(f"Unknown adjustment: {adjustment}")
+
+        self.calendar = calendar
+        self.roll_rule = roll_rule
+        self.adjustment = adjustment
+        self.roll_days_before = roll_days_before
+        self._position = {int(code): i for i, code in enumerate(calendar.futcodes)}
+
+        self.current = None
+        self.last_date = None
+        self.total_adjustment = 0.0 if adjustment == 'difference' else 1.0
+        self.last_close = {}
+        self.rolls = []
+        self._rows = []
+        self._saved_rows = 0
+
+    def _front_contract(self, date, days_before=0):
+        """Front contract on date + days_before (None past the last contract)."""
+        shifted = pd.Timestamp(date) + pd.Timedelta(days=days_before)
+        position = self.calendar.nearby_positions([shifted])[0]
+        return int(self.calendar.futcodes[position]) if position < len(self.calendar) else None
+
+    def _target_contract(self, date, day):
+        """Contract to hold on date under the configured roll rule."""
+        if self.roll_rule == 'calendar':
+            return self._front_contract(date, self.roll_days_before)
+
+        # Volume / open interest: never keep holding an expired contract
+        front = self._front_contract(date)
+        if self.current is None or front is None or self._position[front] > self._position[self.current]:
+            return front
+
+        next_position = self._position[self.current] + 1
+        metric = 'volume' if self.roll_rule == 'volume' else 'openinterest'
+        if next_position >= len(self.calendar) or metric not in day.columns:
+            return self.current
+        candidate = int(self.calendar.futcodes[next_position])
+        values = pd.to_numeric(day[metric], errors='coerce').astype('float64')
+        current_value = values.get(self.current, np.nan)
+        candidate_value = values.get(candidate, np.nan)
+        if candidate_value > current_value or (np.isnan(current_value) and not np.isnan(candidate_value)):
+            return candidate
+        return self.current
+
+    def _update_day(self, date, day):
+        """Process all contracts' bars of one date (day is indexed by futcode)."""
+        self.last_close.update({int(code): float(close) for code, close in day['close'].dropna().items()})
+
+        target = self._target_contract(date, day)
+        if self.current is None:
+            self.current = target
+        elif target is not None and target != self.current and target in self.last_close:
+            old_price = self.last_close.get(self.current)
+            new_price = self.last_close[target]
+            if self.adjustment == 'difference':
+                gap = 0.0 if old_price is None else new_price - old_price
+                self.total_adjustment += gap
+            else:
+                gap = 1.0 if not old_price else new_price / old_price
+                self.total_adjustment *= gap
+            self.rolls.append({'date': pd.Timestamp(date), 'from': self.current, 'to': target, 'gap': gap})
+            self.current = target
+
+        # Forward-fill: carry the held contract's last close on days without a print
+        price = self.last_close.get(self.current)
+        if price is not None:
+            self._rows.append((pd.Timestamp(date), self.current, price, self.total_adjustment))
+        self.last_date = pd.Timestamp(date)
+
+    def append(self, df):
+        """
+        Append bars of new dates (dates on or before last_date are ignored).
+
+        Args:
+            df: DataFrame with futcode, date, close and optionally volume and
+                openinterest columns, for any number of new dates
+
+        Returns:
+            Number of dates processed
+        """
+        columns = [col for col in ['futcode', 'date', 'close', 'volume', 'openinterest'] if col in df.columns]
+        bars = df[columns].copy()
+        bars['date'] = pd.to_datetime(bars['date'])
+        bars['futcode'] = bars['futcode'].astype('int64')
+        if self.last_date is not None:
+            bars = bars[bars['date'] > self.last_date]
+
+        n_dates = 0
+        for date, day in bars.sort_values('date', kind='stable').groupby('date', sort=True):
+            self._update_day(date, day.drop_duplicates('futcode', keep='last').set_index('futcode'))
+            n_dates += 1
+        return n_dates
+
+    def frame(self):
+        """Stitched rows: date index, futcode, raw close and cumulative adjustment."""
+        frame = pd.DataFrame(self._rows, columns=['date', 'futcode', 'close', 'adjustment'])
+        return frame.set_index('date')
+
+    def series(self, adjusted=True):
+        """
+        Continuous close series.
+
+        Args:
+            adjusted: Apply back-adjustment (False returns the raw stitched closes)
+
+        Returns:
+            Series indexed by date
+        """
+        frame = self.frame()
+        if not adjusted:
+            return frame['close'].rename('continuous')
+        if self.adjustment == 'difference':
+            values = frame['close'] + (self.total_adjustment - frame['adjustment'])
+        else:
+            values = frame['close'] * (self.total_adjustment / frame['adjustment'])
+        return values.rename('continuous')
+
+    def save(self, path):
+        """
+        Persist new rows (as a new Parquet part) and the builder state.
+
+        Args:
+            path: Directory of the persisted series
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        new_rows = self._rows[self._saved_rows:]
+        if new_rows:
+            part = pd.DataFrame(new_rows, columns=['date', 'futcode', 'close', 'adjustment'])
+            part.to_parquet(os.path.join(path, f'rows-{self._saved_rows:012d}.parquet'), index=False)
+            self._saved_rows = len(self._rows)
+
+        state = {
+            'roll_rule': self.roll_rule,
+            'adjustment': self.adjustment,
+            'roll_days_before': self.roll_days_before,
+            'current': self.current,
+            'last_date': None if self.last_date is None else self.last_date.isoformat(),
+            'total_adjustment': self.total_adjustment,
+            'last_close': {str(code): close for code, close in self.last_close.items()},
+            'rolls': [{**roll, 'date': roll['date'].isoformat()} for roll in self.rolls]
+        }
+        tmp_path = os.path.join(path, 'state.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp_path, os.path.join(path, 'state.json'))
+
+    @classmethod
+    def load(cls, path, calendar, roll_rule=None, adjustment=None, roll_days_before=None):
+        """
+        Restore a persisted builder.
+
+        A ValueError is raised if the persisted series was built with another
+        configuration than the expected one.
+
+        Args:
+            path: Directory written by save()
+            calendar: ContractCalendar of the product
+            roll_rule: Expected roll rule (None accepts the persisted one)
+            adjustment: Expected adjustment (None accepts the persisted one)
+            roll_days_before: Expected calendar roll offset (None accepts the
+                persisted one)
+
+        Returns:
+            ContinuousContractBuilder, or None if nothing is persisted at path
+        """
+        state_path = os.path.join(path, 'state.json')
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path) as f:
+            state = json.load(f)
+
+        expected = {'roll_rule': roll_rule, 'adjustment': adjustment, 'roll_days_before': roll_days_before}
+        mismatched = [f"{key}={state[key]!r} (requested {value!r})" for key, value in expected.items()
+                      if value is not None and state[key] != value]
+        if mismatched:
+            raise ValueError(f"Continuous series in {path} was built with {', '.join(mismatched)}; "
+                             f"delete it or use another path")
+
+        builder = cls(calendar, roll_rule=state['roll_rule'], adjustment=state['adjustment'],
+                      roll_days_before=state['roll_days_before'])
+        builder.current = state['current']
+        builder.last_date = None if state['last_date'] is None else pd.Timestamp(state['last_date'])
+        builder.total_adjustment = state['total_adjustment']
+        builder.last_close = {int(code): close for code, close in state['last_close'].items()}
+        builder.rolls = [{**roll, 'date': pd.Timestamp(roll['date'])} for roll in state['rolls']]
+
+        parts = sorted(name for name in os.listdir(path) if name.startswith('rows-'))
+        if parts:
+            rows = pd.concat([pd.read_parquet(os.path.join(path, name)) for name in parts])
+            rows = rows.sort_values('date', kind='stable')
+            builder._rows = list(rows.itertuples(index=False, name=None))
+        builder._saved_rows = len(builder._rows)
+        return builder
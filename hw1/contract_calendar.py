@@ -0,0 +1,102 @@
+"""
+Expiry-calendar index of futures contracts.
+
+A ContractCalendar holds the contracts of one product sorted by roll date
+(last trade date by default). On date d the k-th nearby contract is the k-th
+contract whose roll date is on or after d, so a single searchsorted over the
+sorted roll dates answers "which futcode is the k-th nearby" for every date
+at once, consistently across roll dates.
+"""
+import numpy as np
+import pandas as pd
+
+CALENDAR_COLUMNS = ['futcode', 'dsmnem', 'lasttrddate', 'expirationdate', 'startdate']
+
+
+class ContractCalendar:
+    """Contracts of one product sorted by roll date, with vectorized nearby lookups."""
+
+    def __init__(self, contracts, roll_on='lasttrddate'):
+        """
+        Args:
+            contracts: DataFrame with one row per contract (futcode and roll_on
+                columns, as in tr_ds_fut.wrds_contract_info)
+            roll_on: Column holding the roll date ('lasttrddate' or 'expirationdate')
+        """
+        if roll_on not in contracts.columns:
+            raise ValueError(f"Contracts have no {roll_on} column to roll on")
+        contracts = contracts.dropna(subset=[roll_on]).copy()
+        contracts[roll_on] = pd.to_datetime(contracts[roll_on])
+        contracts = contracts.sort_values([roll_on, 'futcode'], kind='stable').reset_index(drop=True)
+
+        self.roll_on = roll_on
+        self.contracts = contracts
+        self.futcodes = contracts['futcode'].to_numpy()
+        self.roll_dates = contracts[roll_on].to_numpy(dtype='datetime64[ns]')
+
+    @classmethod
+    def from_frame(cls, df, roll_on='lasttrddate'):
+        """
+        Build a calendar from downloaded bars (contract info repeated per row).
+
+        Args:
+            df: DataFrame from download_futures_data
+            roll_on: Column holding the roll date
+
+        Returns:
+            ContractCalendar
+        """
+        columns = [col for col in CALENDAR_COLUMNS if col in df.columns]
+        return cls(df[columns].drop_duplicates('futcode'), roll_on=roll_on)
+
+    def __len__(self):
+        return len(self.futcodes)
+
+    def nearby_positions(self, dates, k=0):
+        """
+        Position of the k-th nearby contract for each date (len(self) if none).
+
+        Intraday timestamps are looked up by their day, so a contract stays
+        the front month for the whole of its roll date.
+
+        Args:
+            dates: Array-like of dates or timestamps
+            k: 0 for the front month, 1 for the second month, ...
+
+        Returns:
+            NumPy array of positions into self.futcodes
+        """
+        dates = pd.to_datetime(pd.Index(dates)).normalize().to_numpy(dtype='datetime64[ns]')
+        positions = np.searchsorted(self.roll_dates, dates, side='left') + k
+        return np.minimum(positions, len(self.futcodes))
+
+    def nearby(self, dates, k=0):
+        """
+        Futcode of the k-th nearby contract on each date.
+
+        Args:
+            dates: Array-like of dates
+            k: 0 for the front month, 1 for the second month, ...
+
+        Returns:
+            Series of futcodes indexed by dates (<NA> past the last contract)
+        """
+        positions = self.nearby_positions(dates, k)
+        padded = np.append(self.futcodes, -1).astype('int64')
+        codes = pd.array(padded[positions], dtype='Int64')
+        codes[positions == len(self.futcodes)] = pd.NA
+        return pd.Series(codes, index=pd.Index(dates), name=f'nearby_{k}')
+
+    def nearby_table(self, dates, depth=2):
+        """
+        Futcodes of the first `depth` nearby contracts on each date.
+
+        Returns:
+            DataFrame indexed by dates with columns nearby_0 .. nearby_{depth-1}
+        """
+        return pd.concat([self.nearby(dates, k) for k in range(depth)], axis=1)
+
+    def roll_dates_of(self, futcodes):
+        """Roll dates of the given futcodes."""
+        lookup = pd.Series(self.roll_dates, index=self.futcodes)
+        return lookup.reindex(futcodes)
@@ -0,0 +1,198 @@
+"""
+Correlation matrices across many spreads.
+
+OnlineCorrelation keeps pairwise-complete covariance statistics for N
+series: per pair (i, j) the count, means and co-moments over the rows where
+both are valid, which is what DataFrame.corr and Series.corr use. A block of
+rows is reduced with a few matrix products (one vectorized pass), and blocks
+or single rows are folded into the running state with the Welford/Chan
+update, so the matrix can be maintained online as bars arrive and states
+from different workers can be merged.
+
+SpreadCorrelationTracker applies this to the spread levels and to every
+N-day deviation series at once, keeping the rolling means up to date with
+OnlineRollingMean.
+"""
+import numpy as np
+import pandas as pd
+
+from rolling_stats import OnlineRollingMean
+
+
+class OnlineCorrelation:
+    """Pairwise-complete covariance and correlation of N series, updated online."""
+
+    def __init__(self, labels):
+        """
+        Args:
+            labels: Names of the N series (column order of the updates)
+        """
+        self.labels = list(labels)
+        n = len(self.labels)
+        self.count = np.zeros((n, n))
+        # mean[i, j]: mean of series i over the rows where i and j are both valid
+        self.mean = np.zeros((n, n))
+        self.m2 = np.zeros((n, n))
+        self.comoment = np.zeros((n, n))
+
+    @staticmethod
+    def _block_stats(values):
+        """Pairwise count, means, second moments and co-moments of a block of rows."""
+        valid = ~np.isnan(values)
+        m = valid.astype('float64')
+        # Shift each column by its own mean to limit cancellation
+        shift = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(m.sum(axis=0), 1.0)
+        x = np.where(valid, values - shift, 0.0)
+
+        count = m.T @ m
+        sums = x.T @ m
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, sums / count, 0.0)
+        m2 = (x * x).T @ m - count * mean * mean
+        comoment = x.T @ x - count * mean * mean.T
+        return count, mean + shift[:, None], m2, comoment
+
+    def _combine(self, count, mean, m2, comoment):
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(total > 0, count / total, 0.0)
+            cross = np.where(total > 0, self.count * count / total, 0.0)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + m2 + delta * delta * cross
+        self.comoment = self.comoment + comoment + delta * delta.T * cross
+        self.count = total
+
+    def update_many(self, values):
+        """
+        Add a block of rows in one vectorized pass.
+
+        Args:
+            values: 2-D array (rows x N series), NaN for missing values
+
+        Returns:
+            self
+        """
+        values = np.asarray(values, dtype='float64')
+        if values.ndim == 1:
+            values = values[None, :]
+        if len(values) > 0:
+            self._combine(*self._block_stats(values))
+        return self
+
+    def update(self, row):
+        """
+        Add one row of N values (NaN for missing) with the Welford update.
+
+        Returns:
+            self
+        """
+        x = np.asarray(row, dtype='float64')
+        valid = ~np.isnan(x)
+        both = valid[:, None] & valid[None, :]
+        self.count = self.count + both
+        column = np.where(valid, x, 0.0)[:, None]
+        delta = np.where(both, column - self.mean, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = self.mean + np.where(both, delta / self.count, 0.0)
+        self.m2 = self.m2 + delta * np.where(both, column - self.mean, 0.0)
+        self.comoment = self.comoment + delta * np.where(both, column.T - self.mean.T, 0.0)
+        return self
+
+    def merge(self, other):
+        """Fold in the state of another OnlineCorrelation over the same labels."""
+        if other.labels != self.labels:
+            raise ValueError("Cannot merge correlations of different series")
+        self._combine(other.count, other.mean, other.m2, other.comoment)
+        return self
+
+    def covariance(self):
+        """Sample covariance matrix (NaN for pairs with fewer than 2 joint values)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.comoment / (self.count - 1)
+        cov[self.count < 2] = np.nan
+        return pd.DataFrame(cov, index=self.labels, columns=self.labels)
+
+    def correlation(self):
+        """Correlation matrix (NaN for pairs with fewer than 2 joint values)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr[self.count < 2] = np.nan
+        return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=self.labels, columns=self.labels)
+
+
+def correlation_matrix(frame):
+    """
+    Pairwise-complete correlation matrix of the columns of a DataFrame in one pass.
+
+    Args:
+        frame: DataFrame with one column per series
+
+    Returns:
+        DataFrame of correlations (same values as frame.corr())
+    """
+    online = OnlineCorrelation(frame.columns)
+    return online.update_many(frame.to_numpy(dtype='float64', na_value=np.nan)).correlation()
+
+
+class SpreadCorrelationTracker:
+    """Online correlation matrices of spreads and their N-day deviations."""
+
+    def __init__(self, labels, windows):
+        """
+        Args:
+            labels: Spread labels (column order of the updates)
+            windows: Rolling window sizes of the deviations
+        """
+        self.labels = list(labels)
+        self.windows = list(windows)
+        self.means = OnlineRollingMean(self.windows, shape=(len(self.labels),))
+        self.spreads = OnlineCorrelation(self.labels)
+        self.deviations = {N: OnlineCorrelation(self.labels) for N in self.windows}
+        # Index of the last row added, for callers that persist the tracker;
+        # with spreads updated separately, the last index seen per label and
+        # the rows after last_date held until every spread has reached them
+        self.last_date = None
+        self.last_dates = {}
+        self.pending = None
+
+    @classmethod
+    def from_history(cls, spreads, deviations, windows):
+        """
+        Tracker warmed up with the history of the spreads.
+
+        Args:
+            spreads: DataFrame of spread values (one column per spread)
+            deviations: Dictionary mapping window size to DataFrame of deviations
+            windows: Rolling window sizes
+
+        Returns:
+            SpreadCorrelationTracker
+        """
+        tracker = cls(spreads.columns, windows)
+        tracker.spreads.update_many(spreads.to_numpy(dtype='float64', na_value=np.nan))
+        for N in tracker.windows:
+            tracker.deviations[N].update_many(deviations[N].to_numpy(dtype='float64', na_value=np.nan))
+        tracker.means = OnlineRollingMean.from_history(tracker.windows,
+                                                       spreads.to_numpy(dtype='float64', na_value=np.nan))
+        return tracker
+
+    def update(self, row):
+        """
+        Add one bar of spread values.
+
+        Args:
+            row: Array-like of N spread values (NaN for missing)
+        """
+        row = np.asarray(row, dtype='float64')
+        deviations = self.means.deviations(row)
+        self.spreads.update(row)
+        for i, N in enumerate(self.windows):
+            self.deviations[N].update(deviations[i])
+
+    def correlations(self):
+        """Dictionary with the 'spread' and each 'd_N' correlation matrix."""
+        results = {'spread': self.spreads.correlation()}
+        for N in self.windows:
+            results[f'd_{N}'] = self.deviations[N].correlation()
+        return results
@@ -0,0 +1,292 @@
+"""
+Local Parquet cache for WRDS futures downloads.
+
+Each cached segment holds the rows returned for one (contrcode, start_date,
+end_date, columns) query and is stored as a columnar Parquet file named by
+the hash of that key. Segments sharing the same (contrcode, columns) cover a
+set of dates; a request only queries the database for the days no segment
+covers yet. Days older than the publication lag are final, so a segment
+covers them whether or not the query returned rows (weekends, holidays,
+days after the data ends); more recent days are covered only up to the
+last date the query returned rows for, and are queried again until they
+are published. Total cache size is bounded with least-recently-used
+eviction.
+
+Several processes may share one cache directory: the manifest is only read
+and rewritten under an exclusive lock on a sidecar lock file, and a segment
+whose file another process has evicted counts as not cached.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock across processes
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+PUBLICATION_LAG_DAYS = 7  # Days after which no more rows are expected for a date
+
+
+class ParquetCache:
+    """Content-addressed, size-bounded Parquet cache of futures query results."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, publication_lag_days=PUBLICATION_LAG_DAYS):
+        """
+        Open (or create) a cache directory.
+
+        Args:
+            cache_dir: Directory holding the Parquet segments and manifest
+            max_bytes: Upper bound on total segment size before LRU eviction
+            publication_lag_days: Days after which a date's rows are final
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.publication_lag_days = publication_lag_days
+        self.manifest_path = os.path.join(cache_dir, 'manifest.json')
+        self.lock_path = os.path.join(cache_dir, 'manifest.lock')
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        # Changes not yet written to the manifest: segments stored, access
+        # times and segments removed by this process
+        self._stored = {}
+        self._accessed = {}
+        self._removed = set()
+        # Guards the manifest when downloads run on several threads
+        self._lock = threading.RLock()
+        self.segments = {}
+        self._refresh()
+
+    @staticmethod
+    def _hash(payload):
+        """Stable short hash of a JSON-serializable payload."""
+        text = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:20]
+
+    def entry_key(self, contrcode, columns):
+        """Key shared by all segments of one contract code and column list."""
+        return self._hash({'contrcode': contrcode, 'columns': list(columns)})
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Hold the thread lock and an exclusive lock on the manifest across processes."""
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _merge_manifest(self):
+        # Apply this process's pending changes to the manifest on disk, which
+        # other processes sharing the directory may have changed (call under
+        # _manifest_lock)
+        segments = self._load_manifest()
+        for name in self._removed:
+            segments.pop(name, None)
+        segments.update(self._stored)
+        for name, last_access in self._accessed.items():
+            if name in segments:
+                segments[name]['last_access'] = max(segments[name]['last_access'], last_access)
+        self.segments = segments
+
+    def _refresh(self):
+        """Reload the manifest, keeping this process's pending changes."""
+        with self._manifest_lock():
+            self._merge_manifest()
+
+    def _save_manifest(self, keep=None):
+        """Merge pending changes into the manifest, evict, and write it."""
+        with self._manifest_lock():
+            self._merge_manifest()
+            self._evict(keep=keep)
+            tmp_path = f'{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.segments, f, indent=1)
+            os.replace(tmp_path, self.manifest_path)
+            self._stored, self._accessed, self._removed = {}, {}, set()
+
+    def _segment_path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _entry_segments(self, key):
+        with self._lock:
+            return {name: meta for name, meta in self.segments.items() if meta['key'] == key}
+
+    def missing_ranges(self, contrcode, columns, start_date, end_date):
+        """
+        Find the date ranges not yet covered by cached segments.
+
+        Args:
+            contrcode: Datastream contract code
+            columns: Column list of the query
+            start_date: Start date of the request
+            end_date: End date of the request
+
+        Returns:
+            List of (start, end) date string tuples, inclusive, to be fetched
+        """
+        self._refresh()
+        days = pd.date_range(start=start_date, end=end_date, freq='D')
+        covered = pd.Series(False, index=days)
+        for name, meta in self._entry_segments(self.entry_key(contrcode, columns)).items():
+            # A segment evicted by another process no longer covers its range
+            if os.path.exists(self._segment_path(name)):
+                covered[meta['start']:meta['end']] = True
+
+        missing = covered.index[~covered.values]
+        if len(missing) == 0:
+            return []
+
+        # Group consecutive missing days into contiguous ranges
+        run_id = (missing.to_series().diff() != pd.Timedelta(days=1)).cumsum()
+        ranges = []
+        for _, run in missing.to_series().groupby(run_id.values):
+            ranges.append((run.iloc[0].strftime('%Y-%m-%d'), run.iloc[-1].strftime('%Y-%m-%d')))
+        return ranges
+
+    def store(self, contrcode, columns, start_date, end_date, df, date_col='date'):
+        """
+        Store the query result for one date range as a new segment.
+
+        The segment covers start_date through end_date if end_date is older
+        than the publication lag; otherwise through the later of the last
+        date with rows and the last final date, so recent days without rows
+        stay missing until the database returns data for them.
+
+        Args:
+            contrcode: Datastream contract code
+            columns: Column list of the query
+            start_date: Start date the rows were queried for
+            end_date: End date the rows were queried for
+            df: DataFrame returned by the query (may be empty)
+            date_col: Name of the observation date column
+        """
+        if df is None:
+            return
+        final = pd.Timestamp.today().normalize() - pd.Timedelta(days=self.publication_lag_days)
+        last = min(pd.Timestamp(end_date), final)
+        if len(df) > 0:
+            last = max(last, min(pd.Timestamp(end_date), pd.to_datetime(df[date_col]).max().normalize()))
+        if last < pd.Timestamp(start_date):
+            return
+        end_date = last.strftime('%Y-%m-%d')
+
+        key = self.entry_key(contrcode, columns)
+        name = self._hash({'contrcode': contrcode, 'columns': list(columns),
+                           'start': start_date, 'end': end_date}) + '.parquet'
+        entry_dir = os.path.join(self.cache_dir, key)
+        if not os.path.exists(entry_dir):
+            os.makedirs(entry_dir)
+
+        path = os.path.join(entry_dir, name)
+        df.to_parquet(path, index=False)
+        with self._lock:
+            self._stored[f'{key}/{name}'] = {
+                'key': key,
+                'contrcode': contrcode,
+                'start': start_date,
+                'end': end_date,
+                'bytes': os.path.getsize(path),
+                'last_access': time.time()
+            }
+            self._save_manifest(keep=f'{key}/{name}')
+
+    def load(self, contrcode, columns, start_date, end_date, date_col='date'):
+        """
+        Load cached rows for a date range from all overlapping segments.
+
+        Args:
+            contrcode: Datastream contract code
+            columns: Column list of the query
+            start_date: Start date of the request
+            end_date: End date of the request
+            date_col: Name of the observation date column
+
+        Returns:
+            DataFrame with the cached rows inside [start_date, end_date], or
+            None if a segment was removed (e.g. evicted by another process
+            sharing the directory) since missing_ranges was called
+        """
+        self._refresh()
+        key = self.entry_key(contrcode, columns)
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        frames = []
+        now = time.time()
+        for name, meta in self._entry_segments(key).items():
+            if pd.Timestamp(meta['end']) < start or pd.Timestamp(meta['start']) > end:
+                continue
+            try:
+                frames.append(pd.read_parquet(self._segment_path(name)))
+            except FileNotFoundError:
+                with self._lock:
+                    self._removed.add(name)
+                self._save_manifest()
+                return None
+            with self._lock:
+                self._accessed[name] = now
+        self._save_manifest()
+
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat([f for f in frames if len(f) > 0] or frames[:1], ignore_index=True)
+        if len(df) == 0:
+            return df
+
+        dates = pd.to_datetime(df[date_col])
+        mask = (dates >= start) & (dates <= end)
+        # Same contract-lifetime filter as the WRDS query
+        if 'startdate' in df.columns:
+            mask &= pd.to_datetime(df['startdate']) <= end
+        if 'lasttrddate' in df.columns:
+            mask &= pd.to_datetime(df['lasttrddate']) >= start
+        df = df[mask.values]
+
+        sort_cols = [c for c in (date_col, 'lasttrddate') if c in df.columns]
+        return df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+
+    def total_bytes(self):
+        """Total size of all cached segments in bytes."""
+        with self._lock:
+            return sum(meta['bytes'] for meta in self.segments.values())
+
+    def _evict(self, keep=None):
+        """Drop least-recently-used segments until the cache fits in max_bytes (call under _manifest_lock)."""
+        by_age = sorted(self.segments.items(), key=lambda item: item[1]['last_access'])
+        total = self.total_bytes()
+        for name, meta in by_age:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            path = self._segment_path(name)
+            if os.path.exists(path):
+                os.remove(path)
+            total -= meta['bytes']
+            del self.segments[name]
+            self._removed.add(name)
+
+    def clear(self):
+        """Remove every cached segment."""
+        with self._manifest_lock():
+            self._merge_manifest()
+            for name in list(self.segments):
+                path = self._segment_path(name)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._removed.update(self.segments)
+            self._save_manifest()
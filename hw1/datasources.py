@@ -0,0 +1,355 @@
+"""
+Local stand-ins for the WRDS database connection, and a connection pool.
+
+SQLiteConnection and DuckDBConnection expose the subset of the
+wrds.Connection interface used by FuturesSpreadAnalyzer (raw_sql and close),
+so the download and caching code can run offline against a local file
+holding the tr_ds_fut tables (see write_tables, and synthetic.py for
+generated data). source_factory turns a data source spec such as
+'sqlite:local_wrds.db' into a connection factory for the analyzer.
+ConnectionPool hands out a bounded number of such connections to the
+concurrent download stage.
+"""
+import os
+import sys
+import math
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+
+SCHEMA = 'tr_ds_fut'
+
+# Date columns of the tr_ds_fut tables, stored as ISO 'YYYY-MM-DD' text so that
+# string comparisons in the WRDS queries behave the same as in Postgres
+DATE_COLUMNS = ['date_', 'lasttrddate', 'expirationdate', 'startdate']
+
+# Errors worth retrying: dropped connections, timeouts, locked databases
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, sqlite3.OperationalError)
+
+
+def transient_errors():
+    """
+    TRANSIENT_ERRORS plus the SQLAlchemy connection errors raised through wrds.
+
+    SQLAlchemy is only consulted once something (wrds) has imported it, so
+    local backends do not pay for importing it.
+    """
+    if 'sqlalchemy' not in sys.modules:
+        return TRANSIENT_ERRORS
+    from sqlalchemy.exc import OperationalError, DisconnectionError
+    return TRANSIENT_ERRORS + (OperationalError, DisconnectionError)
+
+
+def _parse_dates(df, date_cols):
+    for col in date_cols:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+class SQLiteConnection:
+    """SQLite-backed drop-in for wrds.Connection."""
+
+    def __init__(self, path, schema=SCHEMA, latency=0.0):
+        """
+        Open a local database file under the WRDS schema name.
+
+        Args:
+            path: Path to the SQLite file with the tr_ds_fut tables
+            schema: Schema name the file is attached as
+            latency: Seconds to sleep per query, simulating a remote round trip
+        """
+        self.path = path
+        self.latency = latency
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+
+    def raw_sql(self, sql, date_cols=None, chunksize=None, return_iter=False, **kwargs):
+        """
+        Run a query and return the result as a DataFrame.
+
+        Args:
+            sql: SQL query string
+            date_cols: Columns to parse as dates (defaults to known date columns)
+            chunksize: Number of rows per chunk when return_iter is True
+            return_iter: Return an iterator of DataFrame chunks instead
+
+        Returns:
+            DataFrame with query results, or an iterator of chunks
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        date_cols = date_cols if date_cols is not None else DATE_COLUMNS
+        if return_iter and chunksize:
+            return (_parse_dates(chunk, date_cols)
+                    for chunk in pd.read_sql_query(sql, self.conn, chunksize=chunksize))
+        return _parse_dates(pd.read_sql_query(sql, self.conn), date_cols)
+
+    def close(self):
+        """Close the SQLite connection."""
+        self.conn.close()
+
+
+class DuckDBConnection:
+    """DuckDB-backed drop-in for wrds.Connection (requires the duckdb package)."""
+
+    def __init__(self, path, schema=SCHEMA, latency=0.0):
+        """
+        Open a local DuckDB file read-only under the WRDS schema name.
+
+        Args:
+            path: Path to the DuckDB file with the tr_ds_fut tables
+            schema: Catalog name the file is attached as
+            latency: Seconds to sleep per query, simulating a remote round trip
+        """
+        import duckdb
+        self.path = path
+        self.latency = latency
+        self.conn = duckdb.connect(':memory:')
+        self.conn.execute(f"ATTACH '{path}' AS {schema} (READ_ONLY)")
+
+    def raw_sql(self, sql, date_cols=None, chunksize=None, return_iter=False, **kwargs):
+        """
+        Run a query and return the result as a DataFrame.
+
+        Args:
+            sql: SQL query string
+            date_cols: Columns to parse as dates (defaults to known date columns)
+            chunksize: Number of rows per chunk when return_iter is True
+            return_iter: Return an iterator of DataFrame chunks instead
+
+        Returns:
+            DataFrame with query results, or an iterator of chunks
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        date_cols = date_cols if date_cols is not None else DATE_COLUMNS
+        if return_iter and chunksize:
+            return self._iter_chunks(sql, chunksize, date_cols)
+        return _parse_dates(self.conn.execute(sql).df(), date_cols)
+
+    def _iter_chunks(self, sql, chunksize, date_cols):
+        # DuckDB returns results in vectors of 2048 rows
+        result = self.conn.cursor().execute(sql)
+        vectors = max(1, math.ceil(chunksize / 2048))
+        while True:
+            chunk = result.fetch_df_chunk(vectors)
+            if len(chunk) == 0:
+                break
+            yield _parse_dates(chunk, date_cols)
+
+    def close(self):
+        """Close the DuckDB connection."""
+        self.conn.close()
+
+
+# Local backends by data source scheme (see source_factory)
+DATA_SOURCES = {
+    'sqlite': SQLiteConnection,
+    'duckdb': DuckDBConnection
+}
+DUCKDB_EXTENSIONS = ('.duckdb', '.ddb')
+
+
+def source_backend(path):
+    """Local backend name of a database file, from its extension."""
+    return 'duckdb' if path.endswith(DUCKDB_EXTENSIONS) else 'sqlite'
+
+
+def source_factory(spec, latency=0.0):
+    """
+    Connection factory for a data source spec.
+
+    Args:
+        spec: 'wrds' (or None), '<backend>:<path>' with backend 'sqlite' or
+            'duckdb', or the path of a local database file (the backend is
+            taken from the extension)
+        latency: Seconds to sleep per query on local backends
+
+    Returns:
+        Callable opening a new connection, or None for WRDS (the analyzer
+        then opens WRDS connections itself)
+    """
+    if spec is None or spec == 'wrds':
+        return None
+    backend, _, path = spec.partition(':')
+    if backend not in DATA_SOURCES or not path:
+        backend, path = source_backend(spec), spec
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Data source not found: {path}")
+    connection_class = DATA_SOURCES[backend]
+    return lambda: connection_class(path, latency=latency)
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections with a maximum size."""
+
+    def __init__(self, factory, max_size=4, connections=None, on_discard=None):
+        """
+        Create a pool; connections are opened lazily up to max_size.
+
+        Args:
+            factory: Callable returning a new connection (None if the pool can
+                only hand out the given connections)
+            max_size: Maximum number of open connections
+            connections: Existing connections to seed the pool with; these are
+                never closed by the pool (a broken one is dropped and replaced
+                by a new connection from factory)
+            on_discard: Optional callable receiving each connection dropped as
+                broken, so owners of seeded connections can stop using them
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.on_discard = on_discard
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._seeded = set()
+        self._created = 0
+        for conn in connections or []:
+            self._idle.put(conn)
+            self._seeded.add(id(conn))
+            self._created += 1
+        if factory is None:
+            self.max_size = self._created
+
+    def acquire(self, timeout=None):
+        """Take an idle connection, opening a new one if the pool is not full."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.max_size
+            if create:
+                self._created += 1
+
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        """Return a connection to the pool."""
+        self._idle.put(conn)
+
+    def discard(self, conn):
+        """Drop a broken connection so a fresh one is opened on next acquire."""
+        if id(conn) in self._seeded:
+            # Seeded connections are not ours to close; without a factory
+            # there is nothing to replace them with, so keep them in use
+            if self.factory is None:
+                self.release(conn)
+                return
+            with self._lock:
+                self._seeded.discard(id(conn))
+                self._created -= 1
+        else:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._created -= 1
+        if self.on_discard is not None:
+            self.on_discard(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager yielding a pooled connection."""
+        conn = self.acquire(timeout=timeout)
+        try:
+            yield conn
+        except transient_errors():
+            self.discard(conn)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Close all idle connections opened by the pool."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if id(conn) not in self._seeded:
+                conn.close()
+                with self._lock:
+                    self._created -= 1
+
+
+def _date_strings(values, intraday):
+    # ISO text compares correctly against the 'YYYY-MM-DD' literals of the queries
+    return pd.to_datetime(values).dt.strftime('%Y-%m-%d %H:%M:%S' if intraday else '%Y-%m-%d')
+
+
+def write_tables(path, contract_info, fut_contract, if_exists='replace', intraday=False):
+    """
+    Write contract info and daily values tables into a local SQLite or DuckDB file.
+
+    The backend is taken from the extension ('.duckdb' or '.ddb' for DuckDB).
+    Either table may be None, so large generated data can be written in
+    chunks with if_exists='append'.
+
+    Args:
+        path: Path to the database file
+        contract_info: DataFrame shaped like tr_ds_fut.wrds_contract_info
+        fut_contract: DataFrame shaped like tr_ds_fut.wrds_fut_contract
+        if_exists: 'replace' or 'append'
+        intraday: Keep the time of day of the bar timestamps (minute bars)
+    """
+    tables = [(name, df) for name, df in [('wrds_contract_info', contract_info),
+                                          ('wrds_fut_contract', fut_contract)] if df is not None]
+    if source_backend(path) == 'duckdb':
+        _write_duckdb(path, tables, if_exists, intraday)
+        return
+
+    conn = sqlite3.connect(path)
+    try:
+        for name, df in tables:
+            df = df.copy()
+            for col in DATE_COLUMNS:
+                if col in df.columns:
+                    df[col] = _date_strings(df[col], intraday and col == 'date_')
+            df.to_sql(name, conn, if_exists=if_exists, index=False)
+        if fut_contract is not None:
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_fut_contract ON wrds_fut_contract (futcode, date_)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _write_duckdb(path, tables, if_exists, intraday):
+    # DuckDB keeps native timestamps (compared with the query literals as
+    # timestamps); as in SQLite, only intraday bar dates keep their time of day
+    import duckdb
+    conn = duckdb.connect(path)
+    try:
+        for name, df in tables:
+            df = df.copy()
+            for col in DATE_COLUMNS:
+                if col in df.columns:
+                    df[col] = pd.to_datetime(df[col])
+                    if not (intraday and col == 'date_'):
+                        df[col] = df[col].dt.normalize()
+            conn.register('frame', df)
+            exists = conn.execute("SELECT count(*) FROM information_schema.tables WHERE table_name = ?",
+                                  [name]).fetchone()[0]
+            if exists and if_exists == 'append':
+                conn.execute(f"INSERT INTO {name} SELECT * FROM frame")
+            else:
+                conn.execute(f"CREATE OR REPLACE TABLE {name} AS SELECT * FROM frame")
+            conn.unregister('frame')
+    finally:
+        conn.close()
@@ -0,0 +1,205 @@
+"""
+Persistent state for incremental (daily) spread updates.
+
+A full analysis recomputes every statistic from START_DATE. SpreadState
+keeps what is needed to extend it by a few new days instead:
+
+- the two contracts of the spread and their last closes, so the
+  forward-filled price series continue across the update boundary
+- an OnlineRollingMean with the tail of the spread, so the N-day
+  deviations of new days match the full computation
+- running moments (count, mean, variance, min, max) and a quantile sketch
+  per series ('spread' and each 'd_N')
+
+Each update costs O(new days), independent of the history length. The
+state is pickled next to the results store and replaced atomically.
+"""
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+from quantiles import make_sketch, sketch_to_series
+from rolling_stats import OnlineRollingMean
+
+
+def save_state(state, path):
+    """Pickle a state object, replacing path atomically."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_state(path):
+    """Load a pickled state object (None if path does not exist)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def state_path(state_dir, name):
+    """File of the state of a spread or pair label."""
+    return os.path.join(state_dir, name.replace(' ', '_').replace('|', '-') + '.pkl')
+
+
+def sketch_median(sketch):
+    """Median of a sketch (P2 sketches only track their configured quantiles)."""
+    if 0.5 in sketch.quantiles:
+        return sketch.quantile()[sketch.quantiles.index(0.5)]
+    return sketch.quantile([0.5])[0]
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max of a stream of values (NaNs skipped)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update_many(self, values):
+        """Fold in an array of values with the Chan et al. combination."""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        count = len(values)
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        return self
+
+    def std(self):
+        """Sample standard deviation (NaN for fewer than 2 values)."""
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+
+class SpreadState:
+    """Incrementally updatable statistics of one calendar spread."""
+
+    def __init__(self, label, futcodes, windows, backend, quantiles):
+        """
+        Args:
+            label: Spread label
+            futcodes: (second month, front month) futcodes of the spread
+            windows: Rolling window sizes
+            backend: Quantile backend of the sketches (see quantiles.make_sketch)
+            quantiles: Quantiles reported by the sketches
+        """
+        self.label = label
+        self.futcodes = tuple(futcodes)
+        self.windows = list(windows)
+        self.last_date = None
+        self.last_closes = (np.nan, np.nan)
+        self.rolling = OnlineRollingMean(self.windows)
+        self.keys = ['spread'] + [f'd_{N}' for N in self.windows]
+        self.moments = {key: RunningMoments() for key in self.keys}
+        self.sketches = {key: make_sketch(backend, quantiles) for key in self.keys}
+
+    @classmethod
+    def from_history(cls, label, futcodes, second, front, deviations, windows, backend, quantiles):
+        """
+        State after a full analysis of the spread.
+
+        Args:
+            label: Spread label
+            futcodes: (second month, front month) futcodes
+            second: Forward-filled close series of the second month
+            front: Forward-filled close series of the front month
+            deviations: Dictionary mapping window size to the deviation series
+                of the spread (RollingStatsEngine.deviations)
+            windows: Rolling window sizes
+            backend: Quantile backend
+            quantiles: Quantiles to report
+
+        Returns:
+            SpreadState
+        """
+        state = cls(label, futcodes, windows, backend, quantiles)
+        spread = second - front
+        state.rolling = OnlineRollingMean.from_history(state.windows,
+                                                       spread.to_numpy(dtype='float64', na_value=np.nan))
+        state._fold(second, front, spread, deviations)
+        return state
+
+    def _fold(self, second, front, spread, deviations):
+        """Add new values to the moments and sketches and remember the last closes."""
+        values = {'spread': spread.to_numpy(dtype='float64', na_value=np.nan)}
+        for N in self.windows:
+            values[f'd_{N}'] = deviations[N].to_numpy(dtype='float64', na_value=np.nan)
+        for key in self.keys:
+            self.moments[key].update_many(values[key])
+            self.sketches[key].update_many(values[key])
+        if len(spread) > 0:
+            self.last_date = spread.index[-1]
+            self.last_closes = (second.iloc[-1], front.iloc[-1])
+
+    def extend(self, second, front):
+        """
+        Add the closes of new dates.
+
+        Args:
+            second: Second-month closes on the new dates (NaN where it did not trade)
+            front: Front-month closes on the same dates
+
+        Returns:
+            Tuple of (spread Series, dictionary N -> deviation Series) of the new dates
+        """
+        # Continue the forward fill from the last closes of the previous update
+        second = second.ffill().fillna(self.last_closes[0])
+        front = front.ffill().fillna(self.last_closes[1])
+        spread = second - front
+
+        rows = np.empty((len(spread), len(self.windows)))
+        for i, x in enumerate(spread.to_numpy(dtype='float64', na_value=np.nan)):
+            rows[i] = self.rolling.deviations(x)
+        deviations = {N: pd.Series(rows[:, i], index=spread.index) for i, N in enumerate(self.windows)}
+
+        self._fold(second, front, spread, deviations)
+        return spread, deviations
+
+    def results(self, spread, deviations):
+        """
+        Results in the analyze_spread_dynamics layout.
+
+        Statistics cover the whole history; 'spread' and the deviation
+        'values' hold only the given (new) dates, as appended to the results
+        store. Medians are the sketch's 0.5 quantile.
+        """
+        stats = self.moments['spread']
+        quantiles = sketch_to_series(self.sketches['spread'])
+        results = {
+            'label': self.label,
+            'spread': spread,
+            'stats': {
+                'mean': stats.mean if stats.count else np.nan,
+                'median': sketch_median(self.sketches['spread']),
+                'std': stats.std(),
+                'min': stats.min if stats.count else np.nan,
+                'max': stats.max if stats.count else np.nan,
+                'quantiles': quantiles
+            },
+            'deviations': {}
+        }
+        for N in self.windows:
+            key = f'd_{N}'
+            results['deviations'][key] = {
+                'values': deviations[N],
+                'median': sketch_median(self.sketches[key]),
+                'std': self.moments[key].std(),
+                'quantiles': sketch_to_series(self.sketches[key])
+            }
+        return results
@@ -0,0 +1,229 @@
+"""
+Intraday bar resampling on exchange-session grids.
+
+A SessionCalendar describes when an exchange trades (CME Globex sessions
+open the previous evening and close in the afternoon of the trade date) and
+builds the shared grid of bar start times for a date range. Raw ticks or
+minute bars are mapped onto that grid with a single searchsorted and
+aggregated per (contract, bar) with ufunc reduceat, so every contract ends up
+on the same timestamps regardless of when it actually printed.
+"""
+import numpy as np
+import pandas as pd
+
+# Bar frequency aliases accepted by the resampler
+BAR_FREQS = {
+    '1m': '1min',
+    '5m': '5min',
+    '15m': '15min',
+    '1h': '1h'
+}
+
+# Default OHLCV aggregation per column
+OHLCV_AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'openinterest': 'last'
+}
+
+
+def bar_step(freq):
+    """Bar length as a Timedelta ('1m', '5m', '15m', '1h' or any pandas offset)."""
+    return pd.Timedelta(BAR_FREQS.get(freq, freq))
+
+
+class SessionCalendar:
+    """Daily trading sessions of an exchange, in exchange local time."""
+
+    def __init__(self, name, open_time, close_time, tz, weekdays=(0, 1, 2, 3, 4), holidays=()):
+        """
+        Args:
+            name: Calendar name
+            open_time: Session open ('HH:MM'); if later than close_time the
+                session opens on the previous calendar day
+            close_time: Session close ('HH:MM') on the trade date
+            tz: Exchange time zone (tz-aware timestamps are converted to it)
+            weekdays: Trade-date weekdays (Monday=0)
+            holidays: Trade dates without a session
+        """
+        self.name = name
+        self.tz = tz
+        self.weekdays = tuple(weekdays)
+        self.holidays = pd.DatetimeIndex(pd.to_datetime(list(holidays)))
+        self.close_offset = pd.Timedelta(f'{close_time}:00')
+        self.open_offset = pd.Timedelta(f'{open_time}:00')
+        if self.open_offset >= self.close_offset:
+            self.open_offset -= pd.Timedelta(days=1)
+
+    def session_open(self, trade_date):
+        """Open of the session of a trade date (the evening before for overnight sessions)."""
+        return pd.Timestamp(trade_date).normalize() + self.open_offset
+
+    def trade_dates(self, start_date, end_date):
+        """Trade dates with a session between start_date and end_date (inclusive)."""
+        dates = pd.date_range(start=start_date, end=end_date, freq='D')
+        return dates[dates.weekday.isin(self.weekdays) & ~dates.isin(self.holidays)]
+
+    def session_bounds(self, start_date, end_date):
+        """
+        Open and close of every session in a date range.
+
+        Returns:
+            Tuple of (opens, closes) DatetimeIndexes
+        """
+        dates = self.trade_dates(start_date, end_date)
+        return dates + self.open_offset, dates + self.close_offset
+
+    def grid(self, start_date, end_date, freq='1m'):
+        """
+        Start times of all bars of all sessions in a date range.
+
+        Args:
+            start_date: First trade date
+            end_date: Last trade date
+            freq: Bar frequency
+
+        Returns:
+            DatetimeIndex of bar start times (naive, exchange local time)
+        """
+        step = bar_step(freq).value
+        opens, closes = self.session_bounds(start_date, end_date)
+        if len(opens) == 0:
+            return pd.DatetimeIndex([])
+        opens, closes = opens.asi8, closes.asi8
+        n_bars = -(-(closes - opens) // step)
+        times = opens[:, None] + np.arange(n_bars.max()) * step
+        return pd.DatetimeIndex(times[times < closes[:, None]])
+
+    def localize(self, timestamps):
+        """Timestamps as naive exchange local time (tz-aware input is converted)."""
+        timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps))
+        if timestamps.tz is not None:
+            timestamps = timestamps.tz_convert(self.tz).tz_localize(None)
+        return timestamps
+
+
+# Trade dates on which CME Globex does not open at all; on early-close
+# holidays (e.g. Thanksgiving Friday) the session is kept with its normal grid
+CME_HOLIDAYS = ['2025-01-01', '2025-04-18', '2025-12-25', '2026-01-01', '2026-12-25']
+
+# CME Globex: Sunday-Friday 17:00-16:00 CT with a daily one-hour maintenance break.
+# NYMEX energy (CL, HO) and CME equity index (YM, RTY) futures trade the same
+# Globex hours and full-day closures; the two calendars are kept separate so
+# CONTRACT_SESSIONS can diverge where their holiday schedules differ.
+CME_ENERGY = SessionCalendar('cme_energy', '17:00', '16:00', 'America/Chicago', holidays=CME_HOLIDAYS)
+CME_EQUITY = SessionCalendar('cme_equity', '17:00', '16:00', 'America/Chicago', holidays=CME_HOLIDAYS)
+
+SESSION_CALENDARS = {
+    'cme_energy': CME_ENERGY,
+    'cme_equity': CME_EQUITY
+}
+
+
+def bar_positions(timestamps, grid, freq):
+    """
+    Grid position of the bar containing each timestamp.
+
+    Args:
+        timestamps: DatetimeIndex in the grid's time zone
+        grid: DatetimeIndex of bar start times (sorted)
+        freq: Bar frequency of the grid
+
+    Returns:
+        NumPy array of positions into grid (-1 outside every bar)
+    """
+    ts = timestamps.asi8
+    starts = grid.asi8
+    positions = np.searchsorted(starts, ts, side='right') - 1
+    inside = (positions >= 0) & (ts - starts[np.maximum(positions, 0)] < bar_step(freq).value)
+    return np.where(inside, positions, -1)
+
+
+def _reduce(how, values, starts, ends):
+    if how == 'first':
+        return values[starts]
+    if how == 'last':
+        return values[ends]
+    if how == 'max':
+        return np.fmax.reduceat(values, starts)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts)
+    if how == 'sum':
+        return np.add.reduceat(np.nan_to_num(values), starts)
+    raise ValueError(f"Unknown aggregation: {how}")
+
+
+def resample_bars(bars, grid, freq, session=None, aggregations=None, time_col='date'):
+    """
+    Aggregate ticks or bars of any number of contracts onto a bar grid.
+
+    Args:
+        bars: DataFrame with futcode, time_col and the aggregated columns
+        grid: DatetimeIndex of bar start times (from SessionCalendar.grid)
+        freq: Bar frequency of the grid
+        session: Optional SessionCalendar used to convert tz-aware timestamps
+        aggregations: Dict of column -> 'first', 'last', 'max', 'min' or 'sum'
+            (default: OHLCV_AGGREGATIONS for the columns present)
+        time_col: Timestamp column
+
+    Returns:
+        DataFrame with one row per (futcode, bar) that has data: futcode,
+        time_col (bar start) and the aggregated columns
+    """
+    aggregations = {col: how for col, how in (aggregations or OHLCV_AGGREGATIONS).items()
+                    if col in bars.columns}
+    timestamps = pd.DatetimeIndex(pd.to_datetime(bars[time_col]))
+    if session is not None:
+        timestamps = session.localize(timestamps)
+
+    positions = bar_positions(timestamps, grid, freq)
+    keep = positions >= 0
+    codes = bars['futcode'].to_numpy(dtype='int64')[keep]
+    positions = positions[keep]
+    if len(codes) == 0:
+        return pd.DataFrame(columns=['futcode', time_col] + list(aggregations))
+
+    # Sort by (futcode, bar, time) and find the group boundaries
+    order = np.lexsort((timestamps.asi8[keep], positions, codes))
+    codes, positions = codes[order], positions[order]
+    boundary = np.r_[True, (np.diff(codes) != 0) | (np.diff(positions) != 0)]
+    starts = np.flatnonzero(boundary)
+    ends = np.r_[starts[1:], len(codes)] - 1
+
+    result = {'futcode': codes[starts], time_col: grid[positions[starts]]}
+    for col, how in aggregations.items():
+        values = pd.to_numeric(bars[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        result[col] = _reduce(how, values[keep][order], starts, ends)
+    return pd.DataFrame(result)
+
+
+def align_to_grid(resampled, grid, futcodes=None, column='close', time_col='date', ffill=True):
+    """
+    Place resampled bars of several contracts on the shared grid.
+
+    Args:
+        resampled: DataFrame from resample_bars
+        grid: DatetimeIndex of bar start times
+        futcodes: Column order (default: all futcodes in resampled)
+        column: Value column to align
+        time_col: Bar start column
+        ffill: Forward-fill bars without data
+
+    Returns:
+        DataFrame indexed by grid with one column per futcode
+    """
+    if futcodes is None:
+        futcodes = np.unique(resampled['futcode'].to_numpy(dtype='int64'))
+    futcodes = pd.Index(futcodes)
+
+    matrix = np.full((len(grid), len(futcodes)), np.nan)
+    rows = grid.get_indexer(pd.DatetimeIndex(resampled[time_col]))
+    cols = futcodes.get_indexer(resampled['futcode'].to_numpy(dtype='int64'))
+    valid = (rows >= 0) & (cols >= 0)
+    matrix[rows[valid], cols[valid]] = resampled[column].to_numpy(dtype='float64')[valid]
+
+    aligned = pd.DataFrame(matrix, index=grid.rename(time_col), columns=futcodes.rename('futcode'))
+    return aligned.ffill() if ffill else aligned
@@ -6,17 +6,54 @@ Future pairs:
 - YM versus RTY
 """
 import os
-from dotenv import load_dotenv
-import wrds
+import sys
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import warnings
+import weakref
 warnings.filterwarnings('ignore')
 
-load_dotenv()
+from data_cache import ParquetCache
+from datasources import ConnectionPool, source_factory, transient_errors
+from streaming import ContractStreamAccumulator, coerce_chunk, iter_query
+from bars import ContractBars
+from bar_store import BarStore
+from bar_index import ContractIndex
+from rolling_stats import RollingStatsEngine
+from quantiles import DEFAULT_QUANTILES, QUANTILE_BACKENDS, make_sketch, sketch_to_series
+from results_store import ResultsStore
+from incremental import SpreadState, load_state, save_state, state_path
+from metrics import StageMetrics, instrumented, metrics_enabled
+from contract_calendar import ContractCalendar, CALENDAR_COLUMNS
+from correlation import SpreadCorrelationTracker, correlation_matrix
+from continuous import ContinuousContractBuilder
+from intraday import SESSION_CALENDARS, align_to_grid, resample_bars
+
+
+def load_env():
+    """
+    Load the nearest .env file (searching up from this directory) into the environment.
+
+    python-dotenv is only imported when there is a file to load.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, '.env')
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+load_env()
 
 WRDS_USERNAME = os.getenv("WRDS_USERNAME")
 WRDS_PASSWORD = os.getenv("WRDS_PASSWORD")
@@ -25,17 +62,262 @@ WRDS_PASSWORD = os.getenv("WRDS_PASSWORD")
 START_DATE = '2025-12-12'
 END_DATE = '2025-12-19'  # Third Friday of December 2025
 ROLLING_WINDOWS = [3, 5, 10, 20]  # N-day rolling windows for analysis
+SHARD_FREQS = {'week': 'W-MON', 'month': 'MS'}  # Date shard boundaries for sharded runs
+QUANTILES = DEFAULT_QUANTILES  # Quantiles reported for spreads and deviations
+MAX_INDEXED_FRAMES = 8  # Loaded frames whose (futcode, date) index is kept
+
+# Contract codes mapping (from Thomson Reuters Datastream)
+CONTRACT_CODES = {
+    'CL': 1986,  # Crude Oil (Light Sweet)
+    'HO': 2029,  # Heating Oil (New York)
+    'YM': 4712,  # Micro E-Mini Dow Jones
+    'RTY': 4396  # CME E-mini Russell 2000
+}
+
+# Tickers downloaded by main(), labels of the analyzed spreads and of their
+# cross analysis (the keys of their results in the results store)
+TICKERS = ['CL', 'HO', 'YM', 'RTY']
+SPREAD_LABELS = ('CL Calendar Spread', 'YM Calendar Spread')
+SPREAD_TICKERS = ('CL', 'YM')  # Tickers of SPREAD_LABELS
+CROSS_LABELS = ('CL Spread', 'YM Spread')
+
+# Command-line steps: fetch -> analyze -> plot / report, or all of them; update
+# extends the stored results with the days since the last run
+COMMANDS = ['all', 'fetch', 'analyze', 'plot', 'report', 'update']
+
+# Exchange session calendar of each ticker (see intraday.SESSION_CALENDARS)
+CONTRACT_SESSIONS = {
+    'CL': 'cme_energy',
+    'HO': 'cme_energy',
+    'YM': 'cme_equity',
+    'RTY': 'cme_equity'
+}
+
+# Data source: 'wrds', or a local stand-in such as 'sqlite:local_wrds.db' or
+# 'duckdb:local_wrds.duckdb' (see datasources.source_factory and synthetic.py)
+DATA_SOURCE = os.getenv("FUTURES_DATA_SOURCE", "wrds")
+
+# Local download cache (set FUTURES_CACHE_DIR to an empty string to disable)
+CACHE_DIR = os.getenv("FUTURES_CACHE_DIR", "cache")
+
+# Columnar results store (set FUTURES_RESULTS_DIR to an empty string to disable)
+RESULTS_DIR = os.getenv("FUTURES_RESULTS_DIR", os.path.join("output", "results"))
+
+# Per-stage metrics as JSON lines, recorded when FUTURES_PROFILE is set to 'metrics'
+# (or to 'cprofile' or 'pyinstrument' to also profile each stage); set
+# FUTURES_METRICS_PATH to an empty string to keep the records in memory only
+METRICS_PATH = os.getenv("FUTURES_METRICS_PATH", os.path.join("output", "metrics.jsonl"))
+
+# Saved state of the incremental update command (see incremental.py)
+STATE_DIR = os.getenv("FUTURES_STATE_DIR", os.path.join("output", "state"))
+UPDATE_QUANTILE_BACKEND = 'tdigest'  # Bounded-size sketches for the saved incremental state
+
+# Columns selected from the wrds_contract_info JOIN wrds_fut_contract query
+FUTURES_COLUMNS = [
+    'c.futcode',
+    'c.contrcode',
+    'c.dsmnem',
+    'c.contrname',
+    'c.lasttrddate',
+    'c.expirationdate',
+    'c.startdate',
+    'v.date_',
+    'v.open_',
+    'v.high',
+    'v.low',
+    'v.settlement as close',
+    'v.volume',
+    'v.openinterest'
+]
+
+def _next_day(date):
+    """ISO date string of the day after date."""
+    return (pd.Timestamp(date) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def session_start(tickers, start_date):
+    """
+    First calendar day with bars of the session of start_date.
+
+    CME Globex sessions open the evening before their trade date, so intraday
+    downloads of a date range start one day before its first trade date.
+
+    Args:
+        tickers: Futures ticker symbols (keys of CONTRACT_SESSIONS)
+        start_date: First trade date
+
+    Returns:
+        ISO date string
+    """
+    opens = [SESSION_CALENDARS[CONTRACT_SESSIONS.get(ticker, 'cme_energy')].session_open(start_date)
+             for ticker in tickers]
+    return min(opens, default=pd.Timestamp(start_date)).strftime('%Y-%m-%d')
+
 
 class FuturesSpreadAnalyzer:
     """Analyzes futures spread dynamics for calendar spreads."""
 
-    def __init__(self, username, password):
-        """Initialize WRDS connection."""
+    def __init__(self, username, password, db=None, cache_dir=None, db_factory=None, pool_size=4,
+                 quantile_backend='exact', results_dir=None, start_date=None, end_date=None, source=None,
+                 metrics=None, metrics_path=None, state_dir=None):
+        """
+        Set up the analyzer; the database connection is opened on first query.
+
+        Args:
+            username: WRDS username
+            password: WRDS password
+            db: Optional connection object with a wrds-style raw_sql (e.g. a
+                local SQLite stand-in); a WRDS connection is opened if None
+            cache_dir: Optional directory for the local Parquet download cache
+            db_factory: Optional callable opening a new connection for the
+                concurrent download pool; defaults to new WRDS connections
+                (or to the single db connection if db is given)
+            pool_size: Maximum number of pooled connections
+            quantile_backend: 'exact' (Series.quantile), or a streaming sketch:
+                'tdigest' (mergeable) or 'p2'
+            results_dir: Optional root of the columnar (Parquet) results store;
+                when set, deviation series are written there instead of being
+                kept in the results dictionaries
+            start_date: Default first date of the analysis (default: START_DATE)
+            end_date: Default last date of the analysis (default: END_DATE)
+            source: Optional data source spec ('wrds', 'sqlite:<path>',
+                'duckdb:<path>' or a database file path) used when db and
+                db_factory are not given
+            metrics: Record per-stage timing, rows, query result bytes and RSS
+                growth of the public methods in self.metrics (see metrics.py);
+                by default only when the FUTURES_PROFILE variable is set
+            metrics_path: Optional JSON lines file the stage records are
+                appended to as they happen
+            state_dir: Optional directory of the saved incremental state
+                (see update_spread_dynamics)
+        """
+        self.username = username
+        self.password = password
+        if metrics is None:
+            metrics = metrics_enabled()
+        self.metrics = StageMetrics(metrics_path) if metrics else None
+        if db_factory is None and db is None:
+            db_factory = source_factory(source) or self._connect_wrds
+        # Opened on first query (see the db property)
+        self._db = db
+        self.db_factory = db_factory
+        self.pool_size = pool_size
+        self._pool = None
+        self.cache = ParquetCache(cache_dir) if cache_dir else None
+        self.download_timings = {}
+        # Rolling means shared by the per-spread and cross-spread analyses
+        self.rolling = RollingStatsEngine(ROLLING_WINDOWS)
+        self.quantile_backend = quantile_backend
+        self.results_store = ResultsStore(results_dir) if results_dir else None
+        self.state_dir = state_dir
+        self.start_date = start_date or START_DATE
+        self.end_date = end_date or END_DATE
+        # (futcode, date) indexes of loaded frames: id(frame) -> (weak reference, index)
+        self._indexes = {}
+
+    def _date_range(self, start_date=None, end_date=None):
+        """Per-call date range, falling back to the analyzer's default range."""
+        return start_date or self.start_date, end_date or self.end_date
+
+    def _connect_wrds(self):
+        """Open a new WRDS connection."""
+        import wrds
         print("Connecting to WRDS...")
-        self.db = wrds.Connection(wrds_username=username, wrds_password=password)
+        db = wrds.Connection(wrds_username=self.username, wrds_password=self.password)
         print("Connected successfully!")
+        return db
+
+    @property
+    def db(self):
+        """Database connection, opened on first use."""
+        if self._db is None:
+            self._db = self.db_factory()
+        return self._db
+
+    @property
+    def pool(self):
+        """Connection pool for concurrent downloads, seeded with self.db."""
+        if self._pool is None:
+            self._pool = ConnectionPool(self.db_factory, max_size=self.pool_size, connections=[self.db],
+                                        on_discard=self._forget_connection)
+        return self._pool
+
+    def _forget_connection(self, conn):
+        """Stop using a connection the pool dropped as broken; the next query opens a new one."""
+        if self._db is conn:
+            self._db = None
+
+    def _query_contracts(self, contrcodes, start_date, end_date, db=None):
+        """
+        Query all contracts of the given contract codes that trade within a date range.
 
-    def download_futures_data(self, ticker, start_date, end_date):
+        Args:
+            contrcodes: List of Datastream contract codes
+            start_date: Start date for data
+            end_date: End date for data
+            db: Connection to query on (defaults to self.db)
+
+        Returns:
+            DataFrame with futures data, columns renamed for consistency
+        """
+        df = (db or self.db).raw_sql(self._build_query(contrcodes, start_date, end_date))
+        if self.metrics is not None:
+            self.metrics.add_result_bytes(df)
+        # Rename columns for consistency
+        return df.rename(columns={'date_': 'date', 'open_': 'open'})
+
+    @staticmethod
+    def _build_query(contrcodes, start_date, end_date):
+        """SQL for all contracts of the given codes that trade within a date range."""
+        # Query to get all contracts for this ticker that overlap with our date range;
+        # the day after end_date bounds the range so intraday bars of end_date are kept
+        return f"""
+        SELECT
+            {', '.join(FUTURES_COLUMNS)}
+        FROM tr_ds_fut.wrds_contract_info c
+        INNER JOIN tr_ds_fut.wrds_fut_contract v ON c.futcode = v.futcode
+        WHERE c.contrcode IN ({', '.join(str(code) for code in contrcodes)})
+        AND v.date_ >= '{start_date}'
+        AND v.date_ < '{_next_day(end_date)}'
+        AND c.startdate <= '{end_date}'
+        AND c.lasttrddate >= '{start_date}'
+        ORDER BY v.date_, c.lasttrddate
+        """
+
+    @staticmethod
+    def _build_delta_query(futcodes, after_date, end_date):
+        """SQL for the rows of the given contracts dated after after_date (up to end_date)."""
+        return f"""
+        SELECT
+            {', '.join(FUTURES_COLUMNS)}
+        FROM tr_ds_fut.wrds_contract_info c
+        INNER JOIN tr_ds_fut.wrds_fut_contract v ON c.futcode = v.futcode
+        WHERE v.futcode IN ({', '.join(str(code) for code in futcodes)})
+        AND v.date_ > '{after_date}'
+        AND v.date_ < '{_next_day(end_date)}'
+        ORDER BY v.date_, c.lasttrddate
+        """
+
+    @instrumented
+    def download_delta(self, futcodes, after_date, end_date):
+        """
+        Download only the rows of some contracts that are newer than the stored ones.
+
+        Args:
+            futcodes: Futcodes of the contracts
+            after_date: Last stored date (exclusive)
+            end_date: Last date to download (inclusive)
+
+        Returns:
+            DataFrame with futures data, columns renamed for consistency
+        """
+        df = self.db.raw_sql(self._build_delta_query(futcodes, after_date, end_date))
+        if self.metrics is not None:
+            self.metrics.add_result_bytes(df)
+        return df.rename(columns={'date_': 'date', 'open_': 'open'})
+
+    @instrumented
+    def download_futures_data(self, ticker, start_date, end_date, intraday=False):
         """
         Download futures data from WRDS Thomson Reuters Datastream for a given ticker.
 
@@ -43,88 +325,382 @@ class FuturesSpreadAnalyzer:
             ticker: Futures ticker symbol ('CL', 'HO', 'YM', 'RTY')
             start_date: Start date for data
             end_date: End date for data
+            intraday: Minute bars for session grids; the download then starts
+                at the session open the evening before start_date
 
         Returns:
             DataFrame with futures data including contract info
         """
         print(f"\nDownloading data for {ticker}...")
+        return self.download_many([ticker], start_date, end_date, intraday=intraday).get(ticker)
 
-        # Contract codes mapping (from Thomson Reuters Datastream)
-        contract_mapping = {
-            'CL': 1986,  # Crude Oil (Light Sweet)
-            'HO': 2029,  # Heating Oil (New York)
-            'YM': 4712,  # Micro E-Mini Dow Jones
-            'RTY': 4396  # CME E-mini Russell 2000
-        }
+    @instrumented
+    def download_many(self, tickers, start_date, end_date, max_codes_per_query=50, intraday=False):
+        """
+        Download futures data for several tickers with one query per chunk of tickers.
 
-        if ticker not in contract_mapping:
+        The contract codes are sent as a single ``contrcode IN (...)`` query (split
+        into chunks of at most max_codes_per_query codes) and the result set is
+        split by ticker in memory.
+
+        Args:
+            tickers: List of futures ticker symbols (keys of CONTRACT_CODES)
+            start_date: Start date for data
+            end_date: End date for data
+            max_codes_per_query: Maximum number of contract codes per query
+            intraday: Minute bars for session grids; the download then starts
+                at the session open the evening before start_date
+
+        Returns:
+            Dictionary mapping ticker to DataFrame (None if the download failed)
+        """
+        codes = self._resolve_contract_codes(tickers)
+        names = list(codes)
+        if intraday:
+            start_date = session_start(names, start_date)
+
+        results = {}
+        for i in range(0, len(names), max_codes_per_query):
+            chunk = {ticker: codes[ticker] for ticker in names[i:i + max_codes_per_query]}
+            try:
+                results.update(self._download_batch(chunk, start_date, end_date, None))
+            except Exception as e:
+                print(f"Error downloading {', '.join(chunk)}: {e}")
+                import traceback
+                traceback.print_exc()
+                results.update({ticker: None for ticker in chunk})
+
+        for ticker in names:
+            self._print_download_summary(ticker, results[ticker])
+        return results
+
+    @instrumented
+    def download_concurrent(self, tickers, start_date, end_date, max_workers=4,
+                            tickers_per_query=1, retries=3, backoff=0.5):
+        """
+        Download futures data in parallel over the connection pool.
+
+        Tickers are split into batches of tickers_per_query; each batch runs on
+        its own thread with a pooled connection, and transient database errors
+        are retried with exponential backoff.
+
+        Args:
+            tickers: List of futures ticker symbols (keys of CONTRACT_CODES)
+            start_date: Start date for data
+            end_date: End date for data
+            max_workers: Maximum number of concurrent downloads (capped by pool size)
+            tickers_per_query: Number of tickers sent in each IN (...) query
+            retries: Number of retries after a transient error
+            backoff: Initial retry delay in seconds, doubled after each retry
+
+        Returns:
+            Dictionary mapping ticker to DataFrame (None if the download failed)
+        """
+        codes = self._resolve_contract_codes(tickers)
+        names = list(codes)
+        batches = [{ticker: codes[ticker] for ticker in names[i:i + tickers_per_query]}
+                   for i in range(0, len(names), tickers_per_query)]
+
+        def run_batch(batch):
+            started = time.perf_counter()
+            for attempt in range(retries + 1):
+                try:
+                    with self.pool.connection() as db:
+                        data = self._download_batch(batch, start_date, end_date, db)
+                    return data, attempt + 1, time.perf_counter() - started
+                except transient_errors() as e:
+                    if attempt == retries:
+                        raise
+                    delay = backoff * 2 ** attempt
+                    print(f"  Transient error for {', '.join(batch)}: {e}; retrying in {delay:.1f}s")
+                    time.sleep(delay)
+
+        results = {}
+        n_workers = max(1, min(max_workers, self.pool.max_size, len(batches)))
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = {executor.submit(run_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    data, attempts, elapsed = future.result()
+                except Exception as e:
+                    print(f"Error downloading {', '.join(batch)}: {e}")
+                    results.update({ticker: None for ticker in batch})
+                    continue
+                results.update(data)
+                for ticker in batch:
+                    self.download_timings[ticker] = elapsed
+                print(f"  {', '.join(batch)}: {elapsed:.3f}s ({attempts} attempt(s))")
+
+        for ticker in names:
+            self._print_download_summary(ticker, results[ticker])
+        return {ticker: results[ticker] for ticker in names}
+
+    def _resolve_contract_codes(self, tickers):
+        """Map tickers to contract codes, skipping unknown tickers."""
+        codes = {}
+        for ticker in tickers:
+            if ticker not in CONTRACT_CODES:
+                print(f"Unknown ticker: {ticker}")
+                continue
+            codes[ticker] = CONTRACT_CODES[ticker]
+        return codes
+
+    def _download_batch(self, codes, start_date, end_date, db):
+        """
+        Download a batch of tickers, querying the cache's missing ranges only.
+
+        Args:
+            codes: Dictionary mapping ticker to contract code
+            start_date: Start date for data
+            end_date: End date for data
+            db: Connection to query on (None: self.db, which is only opened
+                if the cache cannot serve the request)
+
+        Returns:
+            Dictionary mapping ticker to DataFrame
+        """
+        # Group tickers by the date ranges still missing from the cache, so
+        # tickers with the same gaps share a query
+        if self.cache is None:
+            to_query = {((start_date, end_date),): list(codes)}
+        else:
+            to_query = {}
+            for ticker, contrcode in codes.items():
+                missing = tuple(self.cache.missing_ranges(contrcode, FUTURES_COLUMNS, start_date, end_date))
+                if missing:
+                    to_query.setdefault(missing, []).append(ticker)
+                else:
+                    print(f"  Cache: hit for {ticker}")
+
+        data = {}
+        for ranges, group in to_query.items():
+            for range_start, range_end in ranges:
+                parts = self._split_by_ticker(
+                    self._query_contracts([codes[t] for t in group], range_start, range_end, db=db),
+                    {codes[t]: t for t in group}
+                )
+                for ticker in group:
+                    # Without a cache (or for an empty result) the query result is returned as is
+                    data.setdefault(ticker, parts[ticker])
+                    if self.cache is not None:
+                        self.cache.store(codes[ticker], FUTURES_COLUMNS, range_start, range_end, parts[ticker])
+
+        if self.cache is not None:
+            for ticker, contrcode in codes.items():
+                cached = self.cache.load(contrcode, FUTURES_COLUMNS, start_date, end_date)
+                if cached is None:
+                    # A segment was evicted meanwhile (by another process
+                    # sharing the cache): query the whole range again
+                    print(f"  Cache: segment evicted for {ticker}, querying the database")
+                    cached = self._split_by_ticker(
+                        self._query_contracts([contrcode], start_date, end_date, db=db), {contrcode: ticker}
+                    )[ticker]
+                    self.cache.store(contrcode, FUTURES_COLUMNS, start_date, end_date, cached)
+                if len(cached) > 0 or ticker not in data:
+                    data[ticker] = cached
+        return data
+
+    @staticmethod
+    def _print_download_summary(ticker, df):
+        """Print row count, contract count and date range of a download."""
+        if df is None:
+            return
+        print(f"Downloaded {len(df)} rows for {ticker}")
+        if len(df) > 0:
+            print(f"  Found {df['futcode'].nunique()} unique contracts")
+            print(f"  Date range: {df['date'].min()} to {df['date'].max()}")
+
+    @staticmethod
+    def _split_by_ticker(df, code_to_ticker):
+        """
+        Split a multi-contract query result into one DataFrame per ticker.
+
+        Args:
+            df: DataFrame returned by _query_contracts
+            code_to_ticker: Dictionary mapping contract code to ticker
+
+        Returns:
+            Dictionary mapping ticker to its rows (empty DataFrame if none)
+        """
+        parts = {ticker: df.iloc[0:0] for ticker in code_to_ticker.values()}
+        for contrcode, part in df.groupby('contrcode', sort=False):
+            ticker = code_to_ticker.get(int(contrcode))
+            if ticker is not None:
+                parts[ticker] = part.reset_index(drop=True)
+        return parts
+
+    def stream_futures_data(self, ticker, start_date, end_date, chunksize=100000):
+        """
+        Stream futures data for a ticker as an iterator of typed DataFrame chunks.
+
+        Rows are read through a chunked (server-side on WRDS) cursor, so peak
+        memory is bounded by chunksize rather than by the size of the result.
+
+        Args:
+            ticker: Futures ticker symbol (key of CONTRACT_CODES)
+            start_date: Start date for data
+            end_date: End date for data
+            chunksize: Number of rows per chunk
+
+        Yields:
+            DataFrame chunks with fixed column names and dtypes
+        """
+        if ticker not in CONTRACT_CODES:
             print(f"Unknown ticker: {ticker}")
+            return
+
+        query = self._build_query([CONTRACT_CODES[ticker]], start_date, end_date)
+        for chunk in iter_query(self.db, query, chunksize):
+            if self.metrics is not None:
+                self.metrics.add_result_bytes(chunk)
+            yield coerce_chunk(chunk)
+
+    @instrumented
+    def consume_stream(self, chunks):
+        """
+        Fold a stream of chunks into per-contract counts and daily closes.
+
+        The returned accumulator can be passed to identify_top_contracts and
+        prepare_contract_data in place of a DataFrame.
+
+        Args:
+            chunks: Iterator of DataFrame chunks (e.g. from stream_futures_data)
+
+        Returns:
+            ContractStreamAccumulator
+        """
+        accumulator = ContractStreamAccumulator().consume(chunks)
+        print(f"  Streamed {accumulator.rows} rows for {len(accumulator.counts)} contracts")
+        return accumulator
+
+    @instrumented
+    def compact_futures_data(self, df):
+        """
+        Split downloaded futures data into a contract dimension table and typed bars.
+
+        The returned ContractBars can be passed to identify_top_contracts,
+        prepare_contract_data and prepare_contract_matrix in place of a DataFrame.
+
+        Args:
+            df: DataFrame from download_futures_data
+
+        Returns:
+            ContractBars, or None if df is None
+        """
+        if df is None:
             return None
+        compact = ContractBars.from_frame(df)
+        before = df.memory_usage(deep=True).sum()
+        print(f"  Compacted {len(df)} rows: {before / 1e6:.2f} MB -> {compact.memory_usage() / 1e6:.2f} MB")
+        return compact
 
-        contrcode = contract_mapping[ticker]
+    @instrumented
+    def write_bar_store(self, df, root):
+        """
+        Append downloaded bars to a memory-mapped bar store.
 
-        # Query to get all contracts for this ticker that overlap with our date range
-        query = f"""
-        SELECT
-            c.futcode,
-            c.contrcode,
-            c.dsmnem,
-            c.contrname,
-            c.lasttrddate,
-            c.expirationdate,
-            c.startdate,
-            v.date_,
-            v.open_,
-            v.high,
-            v.low,
-            v.settlement as close,
-            v.volume,
-            v.openinterest
-        FROM tr_ds_fut.wrds_contract_info c
-        INNER JOIN tr_ds_fut.wrds_fut_contract v ON c.futcode = v.futcode
-        WHERE c.contrcode = {contrcode}
-        AND v.date_ >= '{start_date}'
-        AND v.date_ <= '{end_date}'
-        AND c.startdate <= '{end_date}'
-        AND c.lasttrddate >= '{start_date}'
-        ORDER BY v.date_, c.lasttrddate
+        Only bars newer than each contract's stored history are appended, so
+        the same download can be written again safely. The returned BarStore
+        can be passed to identify_top_contracts and prepare_contract_data in
+        place of a DataFrame; contracts are then sliced from the memory maps.
+
+        Args:
+            df: DataFrame from download_futures_data, or ContractBars
+            root: Directory of the store
+
+        Returns:
+            BarStore
+        """
+        store = BarStore(root)
+        if df is not None:
+            appended = store.append(df)
+            print(f"  Bar store {root}: appended {appended} rows ({len(store)} total)")
+        return store
+
+    @instrumented
+    def load_contract_calendar(self, ticker, roll_on='lasttrddate'):
         """
+        Build the contract calendar of a ticker from tr_ds_fut.wrds_contract_info.
+
+        Unlike build_contract_calendar, this includes contracts without any
+        rows in the downloaded date range.
+
+        Args:
+            ticker: Futures ticker symbol (key of CONTRACT_CODES)
+            roll_on: Roll date column ('lasttrddate' or 'expirationdate')
 
-        try:
-            df = self.db.raw_sql(query)
-            print(f"Downloaded {len(df)} rows for {ticker}")
-            if len(df) > 0:
-                # Rename columns for consistency
-                df = df.rename(columns={'date_': 'date', 'open_': 'open'})
-                print(f"  Found {df['futcode'].nunique()} unique contracts")
-                print(f"  Date range: {df['date'].min()} to {df['date'].max()}")
-            return df
-        except Exception as e:
-            print(f"Error downloading {ticker}: {e}")
-            import traceback
-            traceback.print_exc()
+        Returns:
+            ContractCalendar, or None for an unknown ticker
+        """
+        if ticker not in CONTRACT_CODES:
+            print(f"Unknown ticker: {ticker}")
             return None
 
-    def identify_top_contracts(self, df, n_contracts=2):
+        query = f"""
+        SELECT {', '.join(CALENDAR_COLUMNS)}
+        FROM tr_ds_fut.wrds_contract_info
+        WHERE contrcode = {CONTRACT_CODES[ticker]}
+        """
+        contracts = self.db.raw_sql(query)
+        if self.metrics is not None:
+            self.metrics.add_result_bytes(contracts)
+        calendar = ContractCalendar(contracts, roll_on=roll_on)
+        print(f"  Contract calendar for {ticker}: {len(calendar)} contracts")
+        return calendar
+
+    @instrumented
+    def build_contract_calendar(self, df, roll_on='lasttrddate'):
+        """
+        Build the contract calendar from downloaded futures data.
+
+        Args:
+            df: DataFrame with futures data (or a ContractStreamAccumulator, ContractBars or BarStore)
+            roll_on: Roll date column ('lasttrddate' or 'expirationdate')
+
+        Returns:
+            ContractCalendar
+        """
+        if isinstance(df, (ContractBars, BarStore)):
+            return ContractCalendar(df.contracts.reset_index(), roll_on=roll_on)
+        if isinstance(df, ContractStreamAccumulator):
+            return ContractCalendar(df.contract_counts().rename_axis('futcode').reset_index(), roll_on=roll_on)
+        return ContractCalendar.from_frame(df, roll_on=roll_on)
+
+    @instrumented
+    def identify_top_contracts(self, df, n_contracts=2, method='rows', as_of=None, calendar=None):
         """
         Identify the top N contracts by number of data points.
 
+        With method='calendar' the contracts are instead the first N nearby
+        contracts on date as_of, looked up in the contract calendar.
+
         Args:
-            df: DataFrame with futures data
+            df: DataFrame with futures data (or a ContractStreamAccumulator, ContractBars or BarStore)
             n_contracts: Number of contracts to identify
+            method: 'rows' (most data points) or 'calendar' (nearest expiries)
+            as_of: Date for the calendar lookup (default: first date in df)
+            calendar: Optional ContractCalendar (default: built from df)
 
         Returns:
             List of futcodes for top contracts
         """
-        if df is None or len(df) == 0:
+        if method == 'calendar':
+            return self._nearby_contracts(df, n_contracts, as_of, calendar)
+
+        if isinstance(df, (ContractStreamAccumulator, ContractBars, BarStore)):
+            if len(df) == 0:
+                return []
+            contract_counts = df.contract_counts()
+        elif df is None or len(df) == 0:
             return []
-
-        # Count rows per contract (futcode)
-        contract_counts = df.groupby('futcode').agg({
-            'date': 'count',
-            'dsmnem': 'first',
-            'lasttrddate': 'first'
-        }).rename(columns={'date': 'count'})
+        else:
+            # Count rows per contract (futcode)
+            contract_counts = df.groupby('futcode').agg({
+                'date': 'count',
+                'dsmnem': 'first',
+                'lasttrddate': 'first'
+            }).rename(columns={'date': 'count'})
         contract_counts = contract_counts.sort_values('count', ascending=False)
 
         print(f"\nTop contracts by data points:")
@@ -133,31 +709,129 @@ class FuturesSpreadAnalyzer:
         top_contracts = contract_counts.head(n_contracts).index.tolist()
         return top_contracts
 
-    def prepare_contract_data(self, df, futcode):
+    def _nearby_contracts(self, df, n_contracts, as_of, calendar):
+        """First n_contracts nearby futcodes on date as_of."""
+        if calendar is None:
+            if df is None or len(df) == 0:
+                return []
+            calendar = self.build_contract_calendar(df)
+        if as_of is None:
+            if isinstance(df, (ContractStreamAccumulator, ContractBars, BarStore)):
+                as_of = df.first_date
+            else:
+                as_of = pd.to_datetime(df['date']).min()
+
+        nearby = calendar.nearby_table([as_of], depth=n_contracts).iloc[0]
+        contracts = [int(code) for code in nearby.dropna()]
+        print(f"\nNearby contracts on {pd.Timestamp(as_of).date()}: {contracts}")
+        return contracts
+
+    @instrumented
+    def prepare_nearby_series(self, df, k=0, calendar=None, start_date=None, end_date=None):
         """
-        Prepare data for a specific contract with forward-fill.
+        Continuous k-th nearby close series that rolls on the calendar's roll dates.
 
         Args:
             df: DataFrame with futures data
+            k: 0 for the front month, 1 for the second month, ...
+            calendar: Optional ContractCalendar (default: built from df)
+            start_date: First date of the output index (default: self.start_date)
+            end_date: Last date of the output index (default: self.end_date)
+
+        Returns:
+            Series with close prices of the k-th nearby contract on each date
+        """
+        contract_matrix = self.prepare_contract_matrix(df, start_date=start_date, end_date=end_date)
+        if contract_matrix is None:
+            return None
+        if calendar is None:
+            calendar = self.build_contract_calendar(df)
+
+        codes = calendar.nearby(contract_matrix.index, k)
+        columns = contract_matrix.columns.get_indexer(codes.fillna(-1).astype('int64'))
+        values = contract_matrix.to_numpy()[np.arange(len(columns)), columns]
+        values[columns < 0] = np.nan
+        return pd.Series(values, index=contract_matrix.index, name=f'nearby_{k}')
+
+    @instrumented
+    def build_continuous_series(self, df, calendar=None, roll_rule='calendar', adjustment='difference',
+                                roll_days_before=0, path=None, adjusted=True):
+        """
+        Continuous back-adjusted close series stitched across nearby contracts.
+
+        With a path, the stitched series is loaded from and saved back to that
+        directory, so each call only appends the dates after the last stored one.
+        A series stored with another roll rule, adjustment or roll offset is
+        not reused: ValueError is raised.
+
+        Args:
+            df: DataFrame with futures data of one ticker
+            calendar: Optional ContractCalendar (default: built from df)
+            roll_rule: 'calendar', 'volume' or 'open_interest'
+            adjustment: 'difference' or 'ratio' back-adjustment
+            roll_days_before: Days before the roll date to roll (calendar rule)
+            path: Optional directory of the persisted series
+            adjusted: Apply back-adjustment
+
+        Returns:
+            Series of continuous close prices indexed by date
+        """
+        if df is None or len(df) == 0:
+            return None
+        if calendar is None:
+            calendar = self.build_contract_calendar(df)
+
+        if isinstance(df, (ContractBars, BarStore)):
+            df = df.frame(columns=[])
+        builder = None
+        if path:
+            builder = ContinuousContractBuilder.load(path, calendar, roll_rule=roll_rule, adjustment=adjustment,
+                                                     roll_days_before=roll_days_before)
+        if builder is None:
+            builder = ContinuousContractBuilder(calendar, roll_rule=roll_rule, adjustment=adjustment,
+                                                roll_days_before=roll_days_before)
+        n_dates = builder.append(df)
+        if path:
+            builder.save(path)
+
+        print(f"  Continuous series: {n_dates} new dates, {len(builder.rolls)} rolls")
+        return builder.series(adjusted=adjusted)
+
+    @instrumented
+    def prepare_contract_data(self, df, futcode, freq=None, session=None, start_date=None, end_date=None):
+        """
+        Prepare data for a specific contract with forward-fill.
+
+        Args:
+            df: DataFrame with futures data (or a ContractStreamAccumulator, ContractBars or BarStore)
             futcode: Futcode of the contract
+            freq: Optional intraday bar frequency ('1m', '5m', '15m', '1h');
+                by default closes are aligned on a daily calendar
+            session: Session calendar name or SessionCalendar for intraday bars
+                (default: from CONTRACT_SESSIONS)
+            start_date: First date of the output index (default: self.start_date)
+            end_date: Last date of the output index (default: self.end_date)
 
         Returns:
             Series with close prices, forward-filled
         """
         if df is None or futcode is None:
             return None
+        start_date, end_date = self._date_range(start_date, end_date)
+        if freq is not None:
+            return self._prepare_intraday(df, futcode, freq, session, start_date, end_date)
 
-        contract_data = df[df['futcode'] == futcode].copy()
-        if len(contract_data) == 0:
+        contract_data = self._contract_closes(df, futcode, start_date, end_date)
+        if contract_data is None or len(contract_data) == 0:
             print(f"  Warning: No data for futcode {futcode}")
             return None
-
-        # Ensure date column is datetime without time component
-        contract_data['date'] = pd.to_datetime(contract_data['date']).dt.date
-        contract_data = contract_data.set_index('date')['close'].sort_index()
+        # Several rows of one date (repeated or intraday rows): keep the last,
+        # as prepare_contract_matrix does
+        if not contract_data.index.is_unique:
+            contract_data = contract_data[~contract_data.index.duplicated(keep='last')]
 
         # Create full date range (as date objects, not datetime)
-        date_range = pd.date_range(start=START_DATE, end=END_DATE, freq='D').date
+        date_range = pd.date_range(start=start_date, end=end_date, freq='D').date
         contract_data = contract_data.reindex(date_range)
 
         # Forward fill on days where data exists
@@ -167,6 +841,98 @@ class FuturesSpreadAnalyzer:
 
         return contract_data
 
+    def session_calendar(self, df, session=None):
+        """
+        Session calendar of the contracts in df.
+
+        Args:
+            df: DataFrame with futures data (contrcode column)
+            session: Optional calendar name or SessionCalendar overriding the lookup
+
+        Returns:
+            SessionCalendar
+        """
+        if session is None:
+            tickers = {code: ticker for ticker, code in CONTRACT_CODES.items()}
+            ticker = tickers.get(int(df['contrcode'].iloc[0])) if 'contrcode' in df.columns else None
+            session = CONTRACT_SESSIONS.get(ticker, 'cme_energy')
+        return SESSION_CALENDARS[session] if isinstance(session, str) else session
+
+    def _prepare_intraday(self, df, futcode, freq, session, start_date, end_date):
+        """Close bars of one contract on the session grid, forward-filled."""
+        if isinstance(df, ContractStreamAccumulator):
+            print("  Warning: intraday bars need the raw rows, not a stream accumulator")
+            return None
+        if isinstance(df, (ContractBars, BarStore)):
+            df = df.frame()
+
+        contract_data = self.index_futures_data(df).rows(df, futcode)
+        if len(contract_data) == 0:
+            print(f"  Warning: No data for futcode {futcode}")
+            return None
+
+        calendar = self.session_calendar(contract_data, session)
+        grid = calendar.grid(start_date, end_date, freq)
+        bars = resample_bars(contract_data, grid, freq, session=calendar, aggregations={'close': 'last'})
+        contract_data = align_to_grid(bars, grid, futcodes=[futcode])[futcode].rename('close')
+
+        print(f"  Futcode {futcode}: {contract_data.notna().sum()} {freq} bars")
+        return contract_data
+
+    @instrumented
+    def index_futures_data(self, df):
+        """
+        Sorted (futcode, date) index of a loaded frame, built once per frame.
+
+        Later lookups of any contract and time window in the same frame are
+        binary searches returning a contiguous slice. The index assumes the
+        frame is not modified in place after it was first indexed.
+
+        Indexes are cached by frame identity with only a weak reference to
+        the frame, so they are dropped as soon as the frame is freed.
+
+        Args:
+            df: DataFrame with futures data
+
+        Returns:
+            ContractIndex (pass df again to its lookups)
+        """
+        key = id(df)
+        entry = self._indexes.get(key)
+        # id() values can be reused after a frame is freed, so check identity
+        if entry is None or entry[0]() is not df:
+            indexes = self._indexes
+
+            def forget(ref):
+                if key in indexes and indexes[key][0] is ref:
+                    indexes.pop(key, None)
+
+            entry = (weakref.ref(df, forget), ContractIndex(df))
+            self._indexes[key] = entry
+            while len(self._indexes) > MAX_INDEXED_FRAMES:
+                self._indexes.pop(next(iter(self._indexes)))
+        return entry[1]
+
+    def _contract_closes(self, df, futcode, start_date=None, end_date=None):
+        """
+        Close prices of one contract indexed by date (no time component).
+
+        Args:
+            df: DataFrame with futures data (or a ContractStreamAccumulator, ContractBars or BarStore)
+            futcode: Futcode of the contract
+            start_date: Optional first date to return
+            end_date: Optional last date to return (inclusive)
+
+        Returns:
+            Series with close prices sorted by date, or None if no rows
+        """
+        if isinstance(df, (ContractStreamAccumulator, ContractBars, BarStore)):
+            return df.contract_series(futcode)
+
+        end = pd.Timestamp(end_date) + pd.Timedelta(days=1) if end_date is not None else None
+        return self.index_futures_data(df).contract_series(df, futcode, start_date, end)
+
+    @instrumented
     def calculate_calendar_spread(self, second_month, front_month):
         """
         Calculate calendar spread: second_month - front_month.
@@ -184,6 +950,182 @@ class FuturesSpreadAnalyzer:
         spread = second_month - front_month
         return spread
 
+    @staticmethod
+    def date_shards(start_date, end_date, shard='month'):
+        """
+        Split a date range into consecutive week or month shards.
+
+        Args:
+            start_date: First date of the range
+            end_date: Last date of the range
+            shard: 'week' (Monday-Sunday) or 'month'
+
+        Returns:
+            List of (start_date, end_date) string tuples covering the range
+        """
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        edges = pd.date_range(start, end, freq=SHARD_FREQS[shard])
+        starts = [start] + [edge for edge in edges if edge > start]
+        ends = [s - pd.Timedelta(days=1) for s in starts[1:]] + [end]
+        return [(s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')) for s, e in zip(starts, ends)]
+
+    @instrumented
+    def calculate_spread_sharded(self, ticker, start_date, end_date, futcodes=None, shard='month',
+                                 max_workers=4):
+        """
+        Calendar spread of a ticker over a long range, processed in parallel date shards.
+
+        Each shard downloads its own date range on a pooled connection and
+        forward-fills both legs within the shard. The shards are then stitched
+        in date order, carrying each leg's last close over the shard edges, so
+        the result matches an unsharded prepare_contract_data run.
+
+        Args:
+            ticker: Futures ticker symbol (key of CONTRACT_CODES)
+            start_date: First date of the range
+            end_date: Last date of the range
+            futcodes: Optional [front, second] futcodes (default: the first two
+                nearby contracts on start_date)
+            shard: 'week' or 'month'
+            max_workers: Maximum number of shards processed concurrently
+
+        Returns:
+            Tuple (spread Series, [front, second] futcodes), or (None, futcodes)
+        """
+        if ticker not in CONTRACT_CODES:
+            print(f"Unknown ticker: {ticker}")
+            return None, []
+        if futcodes is None:
+            calendar = self.load_contract_calendar(ticker)
+            futcodes = self.identify_top_contracts(None, n_contracts=2, method='calendar',
+                                                   as_of=start_date, calendar=calendar)
+        if len(futcodes) < 2:
+            print(f"  Not enough contracts for {ticker}")
+            return None, futcodes
+
+        shards = self.date_shards(start_date, end_date, shard)
+        print(f"\nProcessing {ticker} in {len(shards)} {shard} shards...")
+
+        def run_shard(shard_range):
+            shard_start, shard_end = shard_range
+            with self.pool.connection() as db:
+                data = self._download_batch({ticker: CONTRACT_CODES[ticker]}, shard_start, shard_end, db)[ticker]
+            dates = pd.date_range(start=shard_start, end=shard_end, freq='D').date
+            legs = {}
+            for futcode in futcodes[:2]:
+                closes = None
+                if data is not None and len(data) > 0:
+                    closes = self.prepare_contract_data(data, futcode, start_date=shard_start, end_date=shard_end)
+                legs[futcode] = closes if closes is not None else pd.Series(np.nan, index=dates)
+            return pd.DataFrame(legs, index=dates)
+
+        n_workers = max(1, min(max_workers, self.pool.max_size, len(shards)))
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            shard_legs = list(executor.map(run_shard, shards))
+
+        # Stitch in date order; ffill carries each leg over the shard edges
+        legs = pd.concat(shard_legs).ffill()
+        front, second = futcodes[0], futcodes[1]
+        spread = self.calculate_calendar_spread(legs[second], legs[front]).rename(None)
+        print(f"  {ticker} sharded spread: {spread.notna().sum()} non-null data points")
+        return spread, futcodes[:2]
+
+    @instrumented
+    def prepare_contract_matrix(self, df, futcodes=None, freq=None, session=None, start_date=None, end_date=None):
+        """
+        Prepare forward-filled close prices for all contracts in one pivot.
+
+        Equivalent to calling prepare_contract_data for every contract, but the
+        long frame is reshaped once into a (date x futcode) matrix instead of
+        being boolean-masked per contract.
+
+        Args:
+            df: DataFrame with futures data (or ContractBars or BarStore)
+            futcodes: Optional list of futcodes to keep (default: all)
+            freq: Optional intraday bar frequency; contracts are then aligned
+                on the shared session grid instead of daily dates
+            session: Session calendar for intraday bars (see prepare_contract_data)
+            start_date: First date of the output index (default: self.start_date)
+            end_date: Last date of the output index (default: self.end_date)
+
+        Returns:
+            DataFrame indexed by date (or bar start) with one column per futcode, columns
+            ordered by last trade date (nearest expiry first)
+        """
+        if df is None or len(df) == 0:
+            return None
+
+        start_date, end_date = self._date_range(start_date, end_date)
+        if isinstance(df, (ContractBars, BarStore)):
+            df = df.frame()
+        data = df[['date', 'futcode', 'close', 'lasttrddate']]
+        if futcodes is not None:
+            data = data[data['futcode'].isin(futcodes)]
+
+        # Order contracts by expiry so adjacent columns are adjacent maturities
+        expiry_order = data.groupby('futcode')['lasttrddate'].first().sort_values(kind='stable').index
+
+        if freq is not None:
+            calendar = self.session_calendar(df, session)
+            grid = calendar.grid(start_date, end_date, freq)
+            bars = resample_bars(data, grid, freq, session=calendar, aggregations={'close': 'last'})
+            wide = align_to_grid(bars, grid, futcodes=expiry_order)
+            print(f"  Contract matrix: {wide.shape[0]} {freq} bars x {wide.shape[1]} contracts")
+            return wide
+
+        data = data.assign(date=pd.to_datetime(data['date']).dt.date)
+
+        wide = (data.drop_duplicates(['date', 'futcode'], keep='last')
+                .pivot(index='date', columns='futcode', values='close'))
+
+        # Same full date range and forward-fill as prepare_contract_data
+        date_range = pd.date_range(start=start_date, end=end_date, freq='D').date
+        wide = wide.reindex(index=date_range, columns=expiry_order).ffill()
+
+        print(f"  Contract matrix: {wide.shape[0]} dates x {wide.shape[1]} contracts")
+        return wide
+
+    @instrumented
+    def calculate_adjacent_spreads(self, contract_matrix):
+        """
+        Calculate calendar spreads for every adjacent-expiry pair at once.
+
+        Args:
+            contract_matrix: DataFrame from prepare_contract_matrix
+
+        Returns:
+            DataFrame of spreads (later expiry - earlier expiry), with column
+            MultiIndex (second, front) of futcodes
+        """
+        if contract_matrix is None or contract_matrix.shape[1] < 2:
+            return None
+
+        values = contract_matrix.to_numpy()
+        spreads = values[:, 1:] - values[:, :-1]
+        columns = pd.MultiIndex.from_arrays(
+            [contract_matrix.columns[1:], contract_matrix.columns[:-1]], names=['second', 'front']
+        )
+        return pd.DataFrame(spreads, index=contract_matrix.index, columns=columns)
+
+    def _quantiles(self, values):
+        """
+        Quantiles of a series with the configured backend.
+
+        Args:
+            values: Series of values
+
+        Returns:
+            Tuple (Series of quantiles indexed by QUANTILES, sketch or None);
+            the sketch is returned for streaming backends so it can be merged
+            with sketches of other days or workers
+        """
+        if self.quantile_backend == 'exact':
+            return values.quantile(QUANTILES), None
+        sketch = make_sketch(self.quantile_backend, QUANTILES)
+        sketch.update_many(values.to_numpy(dtype='float64', na_value=np.nan))
+        return sketch_to_series(sketch), sketch
+
+    @instrumented
     def analyze_spread_dynamics(self, spread, label):
         """
         Analyze spread dynamics with rolling averages and deviations.
@@ -211,22 +1153,50 @@ class FuturesSpreadAnalyzer:
         results['stats']['std'] = spread.std()
         results['stats']['min'] = spread.min()
         results['stats']['max'] = spread.max()
-        results['stats']['quantiles'] = spread.quantile([0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99])
+        results['stats']['quantiles'], sketch = self._quantiles(spread)
+        if sketch is not None:
+            results['stats']['sketch'] = sketch
 
         # Rolling average deviations for different N values
+        deviations = self.rolling.deviations(spread)
         for N in ROLLING_WINDOWS:
-            rolling_avg = spread.rolling(window=N, min_periods=1).mean()
-            deviation = spread - rolling_avg
+            deviation = deviations[N]
 
+            quantiles, sketch = self._quantiles(deviation)
             results['deviations'][f'd_{N}'] = {
                 'values': deviation,
                 'median': deviation.median(),
                 'std': deviation.std(),
-                'quantiles': deviation.quantile([0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99])
+                'quantiles': quantiles
             }
+            if sketch is not None:
+                results['deviations'][f'd_{N}']['sketch'] = sketch
+
+        if self.results_store is not None:
+            self.results_store.write_spread_results(results)
+            # The deviation series now live in the store; read them back on demand
+            for dev in results['deviations'].values():
+                dev['values'] = None
 
         return results
 
+    def deviation_values(self, results, dev_key):
+        """
+        Deviation series of an analyzed spread, from the results or the store.
+
+        Args:
+            results: Dictionary returned by analyze_spread_dynamics
+            dev_key: Deviation key (e.g. 'd_5')
+
+        Returns:
+            Series with deviation values
+        """
+        values = results['deviations'][dev_key].get('values')
+        if values is None and self.results_store is not None:
+            values = self.results_store.read_deviations(results['label'])[dev_key]
+        return values
+
+    @instrumented
     def analyze_cross_spread_dynamics(self, spread1, spread2, label1, label2):
         """
         Analyze dynamics between two spreads.
@@ -251,146 +1221,336 @@ class FuturesSpreadAnalyzer:
         # Correlation between spreads
         results['correlation'] = spread1.corr(spread2)
 
-        # Correlations between deviation values
+        # Correlations between deviation values (rolling means are reused
+        # from analyze_spread_dynamics when the same series were analyzed)
+        deviations1 = self.rolling.deviations(spread1)
+        deviations2 = self.rolling.deviations(spread2)
         for N in ROLLING_WINDOWS:
-            rolling_avg1 = spread1.rolling(window=N, min_periods=1).mean()
-            deviation1 = spread1 - rolling_avg1
+            results['d_correlations'][f'd_{N}'] = deviations1[N].corr(deviations2[N])
+
+        if self.results_store is not None:
+            self.results_store.write_cross_results(label1, label2, results)
 
-            rolling_avg2 = spread2.rolling(window=N, min_periods=1).mean()
-            deviation2 = spread2 - rolling_avg2
+        return results
+
+    @instrumented
+    def analyze_rolling_pair(self, spread1, spread2, windows=None, min_periods=None):
+        """
+        Rolling correlation, covariance and beta time series between two spreads.
 
-            results['d_correlations'][f'd_{N}'] = deviation1.corr(deviation2)
+        All windows come from one pass of cumulative sums over the aligned
+        spreads, so the cost is O(n) per window size regardless of N.
 
+        Args:
+            spread1: First spread series
+            spread2: Second spread series (the hedge leg)
+            windows: Window sizes in bars (default: ROLLING_WINDOWS)
+            min_periods: Minimum joint observations per window (default: N)
+
+        Returns:
+            Dictionary mapping window size to a DataFrame with 'covariance',
+            'correlation' and 'beta' columns indexed by date, or None if a
+            spread is missing
+        """
+        if spread1 is None or spread2 is None:
+            return None
+
+        windows = ROLLING_WINDOWS if windows is None else list(windows)
+        results = self.rolling.rolling_pair(spread1, spread2, windows=windows, min_periods=min_periods)
+        for N in windows:
+            if len(results[N]) == 0:
+                print(f"  Rolling {N}-bar pair stats: no data")
+                continue
+            print(f"  Rolling {N}-bar pair stats: last correlation {results[N]['correlation'].iloc[-1]:.4f}, "
+                  f"last beta {results[N]['beta'].iloc[-1]:.4f}")
+        return results
+
+    @instrumented
+    def analyze_correlation_matrix(self, spreads, online=False):
+        """
+        Correlation matrices across many spreads and their N-day deviations.
+
+        All pairs are computed in one vectorized pass per series type, with
+        the same pairwise-complete semantics as analyze_cross_spread_dynamics.
+
+        Args:
+            spreads: Dictionary mapping label to spread Series, or a DataFrame
+                with one column per spread
+            online: Also return a SpreadCorrelationTracker warmed up with the
+                history, whose update(row) folds in new bars one at a time
+
+        Returns:
+            Dictionary with the 'spread' and each 'd_N' correlation matrix
+            (DataFrames indexed by label), plus 'tracker' if online
+        """
+        if isinstance(spreads, pd.DataFrame):
+            spreads = {label: spreads[label] for label in spreads.columns}
+        spreads = {label: spread for label, spread in spreads.items() if spread is not None}
+        if len(spreads) == 0:
+            return None
+
+        # Deviations are computed per spread (reusing memoized rolling means),
+        # then aligned on the union of dates
+        frame = pd.DataFrame(spreads)
+        deviations = {label: self.rolling.deviations(spread) for label, spread in spreads.items()}
+        deviations = {N: pd.DataFrame({label: devs[N] for label, devs in deviations.items()}).reindex(frame.index)
+                      for N in ROLLING_WINDOWS}
+
+        if online:
+            tracker = SpreadCorrelationTracker.from_history(frame, deviations, ROLLING_WINDOWS)
+            results = tracker.correlations()
+            results['tracker'] = tracker
+        else:
+            results = {'spread': correlation_matrix(frame)}
+            for N in ROLLING_WINDOWS:
+                results[f'd_{N}'] = correlation_matrix(deviations[N])
+
+        print(f"  Correlation matrix: {len(spreads)} spreads, "
+              f"{len(spreads) * (len(spreads) - 1) // 2} pairs per series")
+        return results
+
+    @instrumented
+    def update_spread_dynamics(self, ticker, label, end_date=None):
+        """
+        Extend the analysis of a spread with the days since the last update.
+
+        The first call (no saved state) analyzes the spread in full from the
+        analyzer's start date and saves a SpreadState (see incremental.py).
+        Later calls only query the rows of the spread's two contracts dated
+        after the last stored date, continue the forward-filled closes and
+        update the rolling deviations, moments and quantile sketches, so the
+        cost depends on the number of new days, not on the history. New
+        deviation rows are appended to the results store and its statistics
+        replaced. Dates are added up to the latest date with data; rows
+        published later for dates already added are not queried again, so
+        rerun the full analysis (or delete the state) to include them.
+
+        With the 'exact' quantile backend the saved state keeps every value
+        and grows with the history; 'tdigest' keeps it bounded (the default
+        of the update command).
+
+        The contracts of the spread are fixed when the state is created;
+        delete the state file to re-select them after a roll.
+
+        Args:
+            ticker: Futures ticker of the spread
+            label: Spread label (key of the state and of the stored results)
+            end_date: Last date to include (default: self.end_date)
+
+        Returns:
+            Dictionary in the analyze_spread_dynamics layout whose spread and
+            deviation values hold the added days (the full history on the
+            first call), or None
+        """
+        if self.state_dir is None:
+            print("No state directory configured for incremental updates")
+            return None
+        end_date = end_date or self.end_date
+        path = state_path(self.state_dir, label)
+        state = load_state(path)
+        if state is None:
+            print(f"  {label}: no saved state, analyzing from {self.start_date}")
+            return self._create_spread_state(ticker, label, end_date, path)
+
+        delta = self.download_delta(list(state.futcodes), state.last_date, end_date)
+        if len(delta) == 0:
+            print(f"  {label}: up to date ({state.last_date})")
+            empty = pd.Series(dtype='float64', index=pd.Index([], name='date'))
+            return state.results(empty, {N: empty for N in state.windows})
+
+        last = pd.Timestamp(delta['date'].max())
+        expired = delta.loc[pd.to_datetime(delta['lasttrddate']) < last, 'futcode'].unique()
+        if len(expired) > 0:
+            print(f"  Warning: futcode(s) {', '.join(str(code) for code in expired)} of {label} "
+                  f"stopped trading; delete {path} to re-select the contracts")
+
+        start = state.last_date + timedelta(days=1)
+        dates = pd.date_range(start=start, end=last, freq='D').date
+
+        def closes(futcode):
+            series = self._contract_closes(delta, futcode, start, last)
+            return (series if series is not None else pd.Series(dtype='float64')).reindex(dates)
+
+        spread, deviations = state.extend(*(closes(futcode) for futcode in state.futcodes))
+        results = state.results(spread, deviations)
+        if self.results_store is not None:
+            self.results_store.write_spread_results(results, append=True)
+        save_state(state, path)
+        print(f"  {label}: {len(delta)} new rows, {len(dates)} days added up to {state.last_date}")
+        return results
+
+    def _create_spread_state(self, ticker, label, end_date, path):
+        """Full analysis of a spread up to its latest data, saved as its incremental state."""
+        df = self.download_futures_data(ticker, self.start_date, end_date)
+        if df is None or len(df) == 0:
+            return None
+        end_date = min(pd.Timestamp(end_date), pd.Timestamp(df['date'].max())).strftime('%Y-%m-%d')
+
+        contracts = self.identify_top_contracts(df, n_contracts=2)
+        if len(contracts) < 2:
+            print(f"  Warning: fewer than two contracts for {ticker}")
+            return None
+        front = self.prepare_contract_data(df, contracts[0], end_date=end_date)
+        second = self.prepare_contract_data(df, contracts[1], end_date=end_date)
+        spread = self.calculate_calendar_spread(second, front)
+        results = self.analyze_spread_dynamics(spread, label)
+        if results is None:
+            return None
+
+        state = SpreadState.from_history(label, (contracts[1], contracts[0]), second, front,
+                                         self.rolling.deviations(spread), ROLLING_WINDOWS,
+                                         self.quantile_backend, QUANTILES)
+        save_state(state, path)
+        return results
+
+    @instrumented
+    def update_cross_spread_dynamics(self, results1, results2, label1, label2):
+        """
+        Extend the cross-spread correlations with the days added by update_spread_dynamics.
+
+        The pair's SpreadCorrelationTracker is saved with the spread states.
+        When missing, it is built from the full histories: read from the
+        results store if there is one, else taken from the given results
+        (which hold the full histories when the spread states were just
+        created). Days are only added to the correlations once both spreads
+        have reached them; when one spread is ahead (e.g. its data was
+        published earlier), its later days are kept with the tracker until
+        the other spread's update arrives.
+
+        Args:
+            results1: Result of update_spread_dynamics for the first spread
+            results2: Result of update_spread_dynamics for the second spread
+            label1: Label for first spread
+            label2: Label for second spread
+
+        Returns:
+            Dictionary with cross-analysis results, as analyze_cross_spread_dynamics
+        """
+        results = {
+            'correlation': None,
+            'd_correlations': {}
+        }
+        if results1 is None or results2 is None or self.state_dir is None:
+            return results
+
+        path = state_path(self.state_dir, f'{label1} | {label2}')
+        tracker = load_state(path)
+        labels = [label1, label2]
+        spreads = [results1['spread'], results2['spread']]
+        if tracker is None and self.results_store is not None:
+            spreads = [self.results_store.read_deviations(r['label'])['spread_value'] for r in (results1, results2)]
+        frame = pd.DataFrame(dict(zip(labels, spreads))).sort_index()
+        last_dates = tracker.last_dates if tracker is not None else {}
+        for label, spread in zip(labels, spreads):
+            if len(spread) > 0 and (label not in last_dates or spread.index.max() > last_dates[label]):
+                last_dates[label] = spread.index.max()
+
+        # Rows are only added once both spreads have reached them; the
+        # leading spread's later rows wait in the tracker for the other one
+        through = min(last_dates.values()) if len(last_dates) == len(labels) else None
+        if tracker is None:
+            history = frame.loc[:through] if through is not None else frame.iloc[:0]
+            deviations = [self.rolling.deviations(spread) for spread in spreads]
+            deviations = {N: pd.DataFrame({label1: deviations[0][N], label2: deviations[1][N]}).reindex(history.index)
+                          for N in ROLLING_WINDOWS}
+            tracker = SpreadCorrelationTracker.from_history(history, deviations, ROLLING_WINDOWS)
+            added = history
+        else:
+            if tracker.pending is not None:
+                frame = frame.combine_first(tracker.pending)
+            if tracker.last_date is not None:
+                frame = frame[frame.index > tracker.last_date]
+            added = frame.loc[:through] if through is not None else frame.iloc[:0]
+            for row in added.to_numpy(dtype='float64', na_value=np.nan):
+                tracker.update(row)
+        if len(added) > 0:
+            tracker.last_date = added.index[-1]
+        tracker.last_dates = last_dates
+        tracker.pending = frame.iloc[len(added):] if through is not None else frame
+
+        correlations = tracker.correlations()
+        results['correlation'] = correlations['spread'].iloc[0, 1]
+        for N in ROLLING_WINDOWS:
+            results['d_correlations'][f'd_{N}'] = correlations[f'd_{N}'].iloc[0, 1]
+
+        if self.results_store is not None:
+            self.results_store.write_cross_results(label1, label2, results)
+        save_state(tracker, path)
         return results
 
-    def create_visualizations(self, results1, results2, cross_results, output_dir='output'):
+    @instrumented
+    def create_visualizations(self, results1, results2, cross_results, output_dir='output',
+                              preview=False, max_workers=None, wait=True):
         """
         Create comprehensive visualizations of the analysis.
 
+        Figures are rendered in parallel on a process pool. Long series are
+        min/max-decimated to the plot's pixel width before being sent to the
+        renderers.
+
         Args:
             results1: Analysis results for first pair
             results2: Analysis results for second pair
             cross_results: Cross-analysis results
             output_dir: Directory to save plots
+            preview: Fast preview (low DPI, no tight bounding box)
+            max_workers: Number of render processes (default: plotting.MAX_RENDER_WORKERS,
+                capped by the CPU count)
+            wait: Block until all figures are written; if False, return the
+                RenderPipeline so the caller can continue (e.g. write the
+                report) and call wait() later
+
+        Returns:
+            RenderPipeline if wait is False, otherwise None
         """
+        # The plotting stack is only imported when figures are rendered
+        from plotting import (RenderPipeline, decimate_minmax, histogram, pixel_width, thin_pairs,
+                              plot_timeseries, plot_distributions, plot_deviations, plot_scatter)
+
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # Set style
-        sns.set_style('whitegrid')
-        plt.rcParams['figure.figsize'] = (15, 10)
+        pipeline = RenderPipeline(max_workers=max_workers)
+        width = pixel_width(15, preview)
+        colors = [None, 'orange']
+        results = [results1, results2]
 
         # 1. Time series of spreads
-        fig, axes = plt.subplots(2, 1, figsize=(15, 10))
-
-        if results1:
-            results1['spread'].plot(ax=axes[0], label=results1['label'], linewidth=2)
-            axes[0].set_title(f"{results1['label']} Over Time", fontsize=14, fontweight='bold')
-            axes[0].set_ylabel('Spread Value', fontsize=12)
-            axes[0].legend()
-            axes[0].grid(True, alpha=0.3)
-
-        if results2:
-            results2['spread'].plot(ax=axes[1], label=results2['label'], linewidth=2, color='orange')
-            axes[1].set_title(f"{results2['label']} Over Time", fontsize=14, fontweight='bold')
-            axes[1].set_xlabel('Date', fontsize=12)
-            axes[1].set_ylabel('Spread Value', fontsize=12)
-            axes[1].legend()
-            axes[1].grid(True, alpha=0.3)
-
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/spreads_timeseries.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print(f"\nSaved: {output_dir}/spreads_timeseries.png")
+        pipeline.submit(plot_timeseries, [
+            (r['label'], decimate_minmax(r['spread'], width), color) if r else None
+            for r, color in zip(results, colors)
+        ], f'{output_dir}/spreads_timeseries.png', preview=preview)
 
         # 2. Distribution of spreads
-        fig, axes = plt.subplots(1, 2, figsize=(15, 6))
-
-        if results1:
-            axes[0].hist(results1['spread'].dropna(), bins=30, alpha=0.7, edgecolor='black')
-            axes[0].axvline(results1['stats']['median'], color='red', linestyle='--',
-                           label=f"Median: {results1['stats']['median']:.4f}")
-            axes[0].set_title(f"Distribution of {results1['label']}", fontsize=14, fontweight='bold')
-            axes[0].set_xlabel('Spread Value', fontsize=12)
-            axes[0].set_ylabel('Frequency', fontsize=12)
-            axes[0].legend()
-            axes[0].grid(True, alpha=0.3)
-
-        if results2:
-            axes[1].hist(results2['spread'].dropna(), bins=30, alpha=0.7,
-                        color='orange', edgecolor='black')
-            axes[1].axvline(results2['stats']['median'], color='red', linestyle='--',
-                           label=f"Median: {results2['stats']['median']:.4f}")
-            axes[1].set_title(f"Distribution of {results2['label']}", fontsize=14, fontweight='bold')
-            axes[1].set_xlabel('Spread Value', fontsize=12)
-            axes[1].set_ylabel('Frequency', fontsize=12)
-            axes[1].legend()
-            axes[1].grid(True, alpha=0.3)
-
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/spreads_distribution.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print(f"Saved: {output_dir}/spreads_distribution.png")
+        pipeline.submit(plot_distributions, [
+            (r['label'], histogram(r['spread']), r['stats']['median'], color) if r else None
+            for r, color in zip(results, colors)
+        ], f'{output_dir}/spreads_distribution.png', preview=preview)
 
         # 3. Deviations for different rolling windows
-        if results1 and results1['deviations']:
-            fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-            axes = axes.flatten()
-
-            for idx, N in enumerate(ROLLING_WINDOWS):
-                if f'd_{N}' in results1['deviations']:
-                    dev_data = results1['deviations'][f'd_{N}']['values']
-                    dev_data.plot(ax=axes[idx], label=f'{N}-day deviation', linewidth=2)
-                    axes[idx].axhline(0, color='red', linestyle='--', alpha=0.5)
-                    axes[idx].set_title(f"{results1['label']} - Deviation from {N}-Day MA",
-                                      fontsize=12, fontweight='bold')
-                    axes[idx].set_ylabel('Deviation', fontsize=10)
-                    axes[idx].legend()
-                    axes[idx].grid(True, alpha=0.3)
-
-            plt.tight_layout()
-            plt.savefig(f'{output_dir}/spread1_deviations.png', dpi=300, bbox_inches='tight')
-            plt.close()
-            print(f"Saved: {output_dir}/spread1_deviations.png")
-
-        if results2 and results2['deviations']:
-            fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-            axes = axes.flatten()
-
-            for idx, N in enumerate(ROLLING_WINDOWS):
-                if f'd_{N}' in results2['deviations']:
-                    dev_data = results2['deviations'][f'd_{N}']['values']
-                    dev_data.plot(ax=axes[idx], label=f'{N}-day deviation',
-                                 linewidth=2, color='orange')
-                    axes[idx].axhline(0, color='red', linestyle='--', alpha=0.5)
-                    axes[idx].set_title(f"{results2['label']} - Deviation from {N}-Day MA",
-                                      fontsize=12, fontweight='bold')
-                    axes[idx].set_ylabel('Deviation', fontsize=10)
-                    axes[idx].legend()
-                    axes[idx].grid(True, alpha=0.3)
-
-            plt.tight_layout()
-            plt.savefig(f'{output_dir}/spread2_deviations.png', dpi=300, bbox_inches='tight')
-            plt.close()
-            print(f"Saved: {output_dir}/spread2_deviations.png")
+        for idx, (r, color) in enumerate(zip(results, colors)):
+            if r and r['deviations']:
+                deviations = [(N, decimate_minmax(self.deviation_values(r, f'd_{N}'), width // 2))
+                              for N in ROLLING_WINDOWS if f'd_{N}' in r['deviations']]
+                pipeline.submit(plot_deviations, r['label'], deviations,
+                                f'{output_dir}/spread{idx + 1}_deviations.png',
+                                color=color, preview=preview)
 
         # 4. Scatter plot of spreads
         if results1 and results2:
-            fig, ax = plt.subplots(figsize=(10, 8))
-            ax.scatter(results1['spread'], results2['spread'], alpha=0.6, s=100)
-            ax.set_xlabel(results1['label'], fontsize=12)
-            ax.set_ylabel(results2['label'], fontsize=12)
-            ax.set_title(f"Scatter Plot: {results1['label']} vs {results2['label']}\n" +
-                        f"Correlation: {cross_results['correlation']:.4f}",
-                        fontsize=14, fontweight='bold')
-            ax.grid(True, alpha=0.3)
-
-            plt.tight_layout()
-            plt.savefig(f'{output_dir}/spreads_scatter.png', dpi=300, bbox_inches='tight')
-            plt.close()
-            print(f"Saved: {output_dir}/spreads_scatter.png")
-
-    def generate_report(self, results1, results2, cross_results, output_dir='output'):
+            values1, values2 = thin_pairs(results1['spread'].to_numpy(), results2['spread'].to_numpy())
+            pipeline.submit(plot_scatter, results1['label'], values1, results2['label'], values2,
+                            cross_results['correlation'], f'{output_dir}/spreads_scatter.png',
+                            preview=preview)
+
+        if not wait:
+            return pipeline
+        print()
+        pipeline.wait()
+
+    @instrumented
+    def generate_report(self, results1, results2, cross_results, output_dir='output',
+                        start_date=None, end_date=None):
         """
         Generate a comprehensive text report of the analysis.
 
@@ -399,17 +1559,20 @@ class FuturesSpreadAnalyzer:
             results2: Analysis results for second pair
             cross_results: Cross-analysis results
             output_dir: Directory to save report
+            start_date: First date of the analysis period (default: self.start_date)
+            end_date: Last date of the analysis period (default: self.end_date)
         """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
         report_path = f'{output_dir}/analysis_report.txt'
+        start_date, end_date = self._date_range(start_date, end_date)
 
         with open(report_path, 'w') as f:
             f.write("=" * 80 + "\n")
             f.write("FUTURES SPREAD DYNAMICS ANALYSIS\n")
             f.write("Dafu Zhu - Student ID: 12504076\n")
-            f.write(f"Analysis Period: {START_DATE} to {END_DATE}\n")
+            f.write(f"Analysis Period: {start_date} to {end_date}\n")
             f.write("=" * 80 + "\n\n")
 
             # Pair 1 Analysis
@@ -495,114 +1658,304 @@ class FuturesSpreadAnalyzer:
 
     def close(self):
         """Close WRDS connection."""
-        self.db.close()
-        print("\nWRDS connection closed.")
+        if self._pool is not None:
+            self._pool.close()
+        if self._db is not None:
+            self._db.close()
+            print("\nWRDS connection closed.")
 
 
-def main():
-    """Main execution function."""
+def print_banner():
+    """Print the run header."""
     print("="*80)
     print("FUTURES SPREAD DYNAMICS ANALYSIS")
     print("Student: Dafu Zhu (12504076)")
     print(f"Date Range: {START_DATE} to {END_DATE}")
     print("="*80)
 
-    # Initialize analyzer
-    analyzer = FuturesSpreadAnalyzer(WRDS_USERNAME, WRDS_PASSWORD)
 
-    try:
-        # Pair 1: CL versus HO
-        print("\n" + "="*80)
-        print("ANALYZING PAIR 1: CL (Crude Oil) versus HO (Heating Oil)")
-        print("="*80)
+def fetch_data(analyzer):
+    """
+    Download (or load from the cache) all tickers in one batched query.
 
-        cl_data = analyzer.download_futures_data('CL', START_DATE, END_DATE)
-        ho_data = analyzer.download_futures_data('HO', START_DATE, END_DATE)
+    Returns:
+        Dictionary mapping ticker to DataFrame
+    """
+    return analyzer.download_many(TICKERS, START_DATE, END_DATE)
 
-        # Identify top contracts (by data points)
-        cl_contracts = analyzer.identify_top_contracts(cl_data, n_contracts=2)
-        ho_contracts = analyzer.identify_top_contracts(ho_data, n_contracts=2)
 
-        # Prepare contract data
-        print("\nPreparing CL contract data...")
-        cl_front = analyzer.prepare_contract_data(cl_data, cl_contracts[0]) if len(cl_contracts) > 0 else None
-        cl_second = analyzer.prepare_contract_data(cl_data, cl_contracts[1]) if len(cl_contracts) > 1 else None
+def run_analysis(analyzer, downloads=None):
+    """
+    Spread construction and analysis of both pairs plus the cross-spread analysis.
 
-        print("\nPreparing HO contract data...")
-        ho_front = analyzer.prepare_contract_data(ho_data, ho_contracts[0]) if len(ho_contracts) > 0 else None
-        ho_second = analyzer.prepare_contract_data(ho_data, ho_contracts[1]) if len(ho_contracts) > 1 else None
+    Args:
+        analyzer: FuturesSpreadAnalyzer
+        downloads: Optional result of fetch_data (downloaded if None)
 
-        # Calculate calendar spreads: second month - front month
-        print("\nCalculating calendar spreads...")
-        cl_spread = analyzer.calculate_calendar_spread(cl_second, cl_front)
-        ho_spread = analyzer.calculate_calendar_spread(ho_second, ho_front)
+    Returns:
+        Tuple of (CL results, YM results, cross results)
+    """
+    # Pair 1: CL versus HO
+    print("\n" + "="*80)
+    print("ANALYZING PAIR 1: CL (Crude Oil) versus HO (Heating Oil)")
+    print("="*80)
 
-        if cl_spread is not None:
-            print(f"CL calendar spread: {cl_spread.notna().sum()} non-null data points")
-        if ho_spread is not None:
-            print(f"HO calendar spread: {ho_spread.notna().sum()} non-null data points")
+    # Download all four tickers in one batched query (served from the cache when possible)
+    if downloads is None:
+        print(f"\nDownloading data for {', '.join(TICKERS)}...")
+        downloads = fetch_data(analyzer)
+    cl_data = downloads['CL']
+    ho_data = downloads['HO']
+
+    # Identify top contracts (by data points)
+    cl_contracts = analyzer.identify_top_contracts(cl_data, n_contracts=2)
+    ho_contracts = analyzer.identify_top_contracts(ho_data, n_contracts=2)
+
+    # Prepare contract data
+    print("\nPreparing CL contract data...")
+    cl_front = analyzer.prepare_contract_data(cl_data, cl_contracts[0]) if len(cl_contracts) > 0 else None
+    cl_second = analyzer.prepare_contract_data(cl_data, cl_contracts[1]) if len(cl_contracts) > 1 else None
+
+    print("\nPreparing HO contract data...")
+    ho_front = analyzer.prepare_contract_data(ho_data, ho_contracts[0]) if len(ho_contracts) > 0 else None
+    ho_second = analyzer.prepare_contract_data(ho_data, ho_contracts[1]) if len(ho_contracts) > 1 else None
+
+    # Calculate calendar spreads: second month - front month
+    print("\nCalculating calendar spreads...")
+    cl_spread = analyzer.calculate_calendar_spread(cl_second, cl_front)
+    ho_spread = analyzer.calculate_calendar_spread(ho_second, ho_front)
+
+    if cl_spread is not None:
+        print(f"CL calendar spread: {cl_spread.notna().sum()} non-null data points")
+    if ho_spread is not None:
+        print(f"HO calendar spread: {ho_spread.notna().sum()} non-null data points")
+
+    # Analyze CL spread (s1 for pair 1)
+    print("\nAnalyzing CL spread dynamics...")
+    results_cl = analyzer.analyze_spread_dynamics(cl_spread, SPREAD_LABELS[0])
+
+    # Pair 2: YM versus RTY
+    print("\n" + "="*80)
+    print("ANALYZING PAIR 2: YM (Dow Mini) versus RTY (Russell 2000 Mini)")
+    print("="*80)
 
-        # Analyze CL spread (s1 for pair 1)
-        print("\nAnalyzing CL spread dynamics...")
-        results_cl = analyzer.analyze_spread_dynamics(cl_spread, 'CL Calendar Spread')
+    ym_data = downloads['YM']
+    rty_data = downloads['RTY']
 
-        # Pair 2: YM versus RTY
-        print("\n" + "="*80)
-        print("ANALYZING PAIR 2: YM (Dow Mini) versus RTY (Russell 2000 Mini)")
-        print("="*80)
+    # Identify top contracts
+    ym_contracts = analyzer.identify_top_contracts(ym_data, n_contracts=2)
+    rty_contracts = analyzer.identify_top_contracts(rty_data, n_contracts=2)
 
-        ym_data = analyzer.download_futures_data('YM', START_DATE, END_DATE)
-        rty_data = analyzer.download_futures_data('RTY', START_DATE, END_DATE)
+    # Prepare contract data
+    print("\nPreparing YM contract data...")
+    ym_front = analyzer.prepare_contract_data(ym_data, ym_contracts[0]) if len(ym_contracts) > 0 else None
+    ym_second = analyzer.prepare_contract_data(ym_data, ym_contracts[1]) if len(ym_contracts) > 1 else None
 
-        # Identify top contracts
-        ym_contracts = analyzer.identify_top_contracts(ym_data, n_contracts=2)
-        rty_contracts = analyzer.identify_top_contracts(rty_data, n_contracts=2)
+    print("\nPreparing RTY contract data...")
+    rty_front = analyzer.prepare_contract_data(rty_data, rty_contracts[0]) if len(rty_contracts) > 0 else None
+    rty_second = analyzer.prepare_contract_data(rty_data, rty_contracts[1]) if len(rty_contracts) > 1 else None
 
-        # Prepare contract data
-        print("\nPreparing YM contract data...")
-        ym_front = analyzer.prepare_contract_data(ym_data, ym_contracts[0]) if len(ym_contracts) > 0 else None
-        ym_second = analyzer.prepare_contract_data(ym_data, ym_contracts[1]) if len(ym_contracts) > 1 else None
+    # Calculate calendar spreads: second month - front month
+    print("\nCalculating calendar spreads...")
+    ym_spread = analyzer.calculate_calendar_spread(ym_second, ym_front)
+    rty_spread = analyzer.calculate_calendar_spread(rty_second, rty_front)
 
-        print("\nPreparing RTY contract data...")
-        rty_front = analyzer.prepare_contract_data(rty_data, rty_contracts[0]) if len(rty_contracts) > 0 else None
-        rty_second = analyzer.prepare_contract_data(rty_data, rty_contracts[1]) if len(rty_contracts) > 1 else None
+    if ym_spread is not None:
+        print(f"YM calendar spread: {ym_spread.notna().sum()} non-null data points")
+    if rty_spread is not None:
+        print(f"RTY calendar spread: {rty_spread.notna().sum()} non-null data points")
 
-        # Calculate calendar spreads: second month - front month
-        print("\nCalculating calendar spreads...")
-        ym_spread = analyzer.calculate_calendar_spread(ym_second, ym_front)
-        rty_spread = analyzer.calculate_calendar_spread(rty_second, rty_front)
+    # Analyze YM spread (s1 for pair 2)
+    print("\nAnalyzing YM spread dynamics...")
+    results_ym = analyzer.analyze_spread_dynamics(ym_spread, SPREAD_LABELS[1])
 
-        if ym_spread is not None:
-            print(f"YM calendar spread: {ym_spread.notna().sum()} non-null data points")
-        if rty_spread is not None:
-            print(f"RTY calendar spread: {rty_spread.notna().sum()} non-null data points")
+    # Cross-spread analysis
+    print("\n" + "="*80)
+    print("CROSS-SPREAD ANALYSIS")
+    print("="*80)
 
-        # Analyze YM spread (s1 for pair 2)
-        print("\nAnalyzing YM spread dynamics...")
-        results_ym = analyzer.analyze_spread_dynamics(ym_spread, 'YM Calendar Spread')
+    cross_results = analyzer.analyze_cross_spread_dynamics(
+        cl_spread, ym_spread, *CROSS_LABELS
+    )
 
-        # Cross-spread analysis
-        print("\n" + "="*80)
-        print("CROSS-SPREAD ANALYSIS")
-        print("="*80)
+    print(f"\nCorrelation between CL and YM spreads: {cross_results['correlation']:.4f}")
 
-        cross_results = analyzer.analyze_cross_spread_dynamics(
-            cl_spread, ym_spread, 'CL Spread', 'YM Spread'
-        )
+    # The memoized rolling means are only shared within one run
+    analyzer.rolling.clear()
+
+    return results_cl, results_ym, cross_results
 
+
+def run_update(analyzer, end_date):
+    """
+    Extend both spreads and their cross analysis with the days up to end_date.
+
+    Args:
+        analyzer: FuturesSpreadAnalyzer with a state directory
+        end_date: Last date to include
+
+    Returns:
+        Tuple of (CL results, YM results, cross results) over the full
+        history from the results store, or None without a store
+    """
+    print("\n" + "="*80)
+    print(f"INCREMENTAL UPDATE TO {end_date}")
+    print("="*80)
+
+    updates = [analyzer.update_spread_dynamics(ticker, label, end_date)
+               for ticker, label in zip(SPREAD_TICKERS, SPREAD_LABELS)]
+    cross_results = analyzer.update_cross_spread_dynamics(*updates, *CROSS_LABELS)
+    if cross_results['correlation'] is not None:
         print(f"\nCorrelation between CL and YM spreads: {cross_results['correlation']:.4f}")
 
-        # Generate visualizations
+    if analyzer.results_store is None:
+        return None
+    return load_stored_results(analyzer)
+
+
+def updated_end_date(analyzer):
+    """
+    Last date added to the spreads by the incremental updates.
+
+    Returns:
+        Latest last date of the spreads' saved states as 'YYYY-MM-DD', or
+        None if no state has been saved
+    """
+    states = [load_state(state_path(analyzer.state_dir, label)) for label in SPREAD_LABELS]
+    last_dates = [state.last_date for state in states if state is not None and state.last_date is not None]
+    if not last_dates:
+        return None
+    return pd.Timestamp(max(last_dates)).strftime('%Y-%m-%d')
+
+
+def load_stored_results(analyzer):
+    """
+    Results of a previous analysis from the results store.
+
+    Returns:
+        Tuple of (CL results, YM results, cross results), or None if the
+        store is disabled or holds no results
+    """
+    store = analyzer.results_store
+    if store is None:
+        print("No results store configured (FUTURES_RESULTS_DIR is empty)")
+        return None
+    results_cl, results_ym = (store.load_results(label) for label in SPREAD_LABELS)
+    cross_results = store.load_cross_results(*CROSS_LABELS)
+    if results_cl is None or results_ym is None or cross_results is None:
+        print(f"No stored results in {store.root}; run the analyze step first")
+        return None
+    print(f"Loaded results of {', '.join(SPREAD_LABELS)} from {store.root}")
+    return results_cl, results_ym, cross_results
+
+
+def write_outputs(analyzer, results, plot=True, report=True, start_date=None, end_date=None):
+    """
+    Render the figures and/or write the report for a set of results.
+
+    Args:
+        analyzer: FuturesSpreadAnalyzer
+        results: Tuple of (CL results, YM results, cross results)
+        plot: Render the figures
+        report: Write the text report
+        start_date: First date of the period in the report header (default:
+            the analyzer's start date)
+        end_date: Last date of the period in the report header (default:
+            the analyzer's end date)
+    """
+    results_cl, results_ym, cross_results = results
+    render = None
+    if plot:
+        # Generate visualizations (rendered in the background)
         print("\n" + "="*80)
         print("GENERATING VISUALIZATIONS")
         print("="*80)
-        analyzer.create_visualizations(results_cl, results_ym, cross_results)
+        render = analyzer.create_visualizations(results_cl, results_ym, cross_results, wait=False)
 
-        # Generate report
+    if report:
+        # Generate report while the figures render
         print("\n" + "="*80)
         print("GENERATING REPORT")
         print("="*80)
-        analyzer.generate_report(results_cl, results_ym, cross_results)
+        analyzer.generate_report(results_cl, results_ym, cross_results, start_date=start_date, end_date=end_date)
+
+    if render is not None:
+        print()
+        render.wait()
+
+
+def print_metrics(analyzer):
+    """Print per-stage totals (nested stages are also included in their parents)."""
+    if analyzer.metrics is None:
+        return
+    summary = analyzer.metrics.summary()
+    if len(summary) > 0:
+        print("\nStage metrics:")
+        with pd.option_context('display.width', 200, 'display.max_columns', 10):
+            print(summary.round(3))
+        if METRICS_PATH:
+            print(f"Saved: {METRICS_PATH}")
+
+
+def parse_args(argv=None):
+    """
+    Command-line arguments.
+
+    Subcommands (default 'all'): fetch downloads into the cache; analyze
+    computes and stores the results; plot and report render the figures and
+    the report from the results store without querying the database;
+    update adds the days since the last update (only the new rows are
+    queried) and rewrites the report.
+    """
+    parser = argparse.ArgumentParser(description="Futures calendar spread dynamics analysis")
+    parser.add_argument('command', nargs='?', default='all', choices=COMMANDS,
+                        help="Step to run (default: all)")
+    parser.add_argument('--end', default=None,
+                        help="Last date added by the update command (default: today)")
+    parser.add_argument('--quantile-backend', default=None, choices=sorted(QUANTILE_BACKENDS),
+                        help=f"Quantile backend (default: {UPDATE_QUANTILE_BACKEND} for update, exact otherwise)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    command = args.command
+    print_banner()
+
+    quantile_backend = args.quantile_backend or (UPDATE_QUANTILE_BACKEND if command == 'update' else 'exact')
+
+    # Initialize analyzer (the database is only connected on the first query)
+    analyzer = FuturesSpreadAnalyzer(WRDS_USERNAME, WRDS_PASSWORD, cache_dir=CACHE_DIR,
+                                     quantile_backend=quantile_backend,
+                                     results_dir=RESULTS_DIR, start_date=START_DATE, end_date=END_DATE,
+                                     source=DATA_SOURCE, metrics_path=METRICS_PATH or None,
+                                     state_dir=STATE_DIR or None)
+
+    try:
+        if command == 'fetch':
+            print(f"\nDownloading data for {', '.join(TICKERS)}...")
+            fetch_data(analyzer)
+            return
+
+        if command == 'update':
+            results = run_update(analyzer, args.end or datetime.now().strftime('%Y-%m-%d'))
+            if results is not None:
+                # The report covers the history from the start date to the last update
+                write_outputs(analyzer, results, plot=False, start_date=analyzer.start_date,
+                              end_date=updated_end_date(analyzer))
+            return
+
+        if command in ('plot', 'report'):
+            results = load_stored_results(analyzer)
+            if results is not None:
+                write_outputs(analyzer, results, plot=command == 'plot', report=command == 'report')
+            return
+
+        results = run_analysis(analyzer)
+        if command == 'analyze':
+            return
+        write_outputs(analyzer, results)
 
         print("\n" + "="*80)
         print("ANALYSIS COMPLETE!")
@@ -621,6 +1974,7 @@ def main():
         traceback.print_exc()
 
     finally:
+        print_metrics(analyzer)
         analyzer.close()
 
 
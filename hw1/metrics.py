@@ -0,0 +1,258 @@
+"""
+Per-stage timing and memory instrumentation of the analyzer.
+
+Methods decorated with instrumented() add one record per call to the
+analyzer's StageMetrics:
+
+    stage         method name (nested calls carry their parent stage)
+    args          identifying arguments such as ticker, label or futcode
+    seconds       wall time
+    rows_in       rows of the DataFrame/Series-like arguments
+    rows_out      rows of the result
+    result_bytes  in-memory (pandas) size of the query results fetched during
+                  the call; the database drivers do not report the bytes
+                  transferred, so this stands in for the download volume
+    rss_growth_mb growth of the process peak resident set size during the
+                  call, i.e. memory the stage needed beyond every earlier
+                  stage (0 if it stayed below the earlier peak)
+
+Records are kept in memory (StageMetrics.records, StageMetrics.summary) and,
+when a path is given, appended to a JSON lines file as they happen.
+
+Recording is opt-in: analyzers record stages when FUTURES_PROFILE is set.
+'metrics' only records; 'cprofile' or 'pyinstrument' also profiles every
+top-level stage call and writes one profile per call into
+FUTURES_PROFILE_DIR (.prof files for cProfile, .html for pyinstrument).
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import threading
+import functools
+from collections.abc import Mapping
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_ENV = 'FUTURES_PROFILE'
+PROFILE_DIR_ENV = 'FUTURES_PROFILE_DIR'
+PROFILERS = ('cprofile', 'pyinstrument')
+RECORD_ONLY = 'metrics'  # FUTURES_PROFILE value recording stages without a profiler
+
+# Arguments copied into the records to tell calls of the same stage apart
+RECORD_ARGS = ('ticker', 'tickers', 'label', 'label1', 'label2', 'futcode', 'freq', 'start_date', 'end_date')
+
+
+def metrics_enabled():
+    """Whether stage metrics are requested through the FUTURES_PROFILE variable."""
+    return bool(os.getenv(PROFILE_ENV, ''))
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def count_rows(value):
+    """Rows of a frame-like value, or of the frames in a dict/list/tuple (None if not frame-like)."""
+    if value is None or isinstance(value, (str, bytes)):
+        return None
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    # ContractBars, BarStore and stream accumulators
+    if hasattr(value, 'contract_counts') and hasattr(value, '__len__'):
+        return len(value)
+    if isinstance(value, Mapping):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [count_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def frame_bytes(df):
+    """In-memory size of a query result (not the bytes on the wire)."""
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+
+class StageMetrics:
+    """Collector of per-stage records, optionally streamed to a JSON lines file."""
+
+    def __init__(self, path=None, profile=None, profile_dir=None):
+        """
+        Args:
+            path: Optional JSON lines file the records are appended to
+            profile: Optional profiler for top-level stages: 'cprofile' or
+                'pyinstrument', or 'metrics' for none (default: the
+                FUTURES_PROFILE variable)
+            profile_dir: Directory of the profile files (default: the
+                FUTURES_PROFILE_DIR variable, or 'profiles')
+        """
+        self.path = path
+        self.profile = (profile if profile is not None else os.getenv(PROFILE_ENV, '')).lower() or None
+        if self.profile == RECORD_ONLY:
+            self.profile = None
+        if self.profile is not None and self.profile not in PROFILERS:
+            print(f"Warning: unknown profiler {self.profile!r} (expected one of {', '.join(PROFILERS)})")
+            self.profile = None
+        self.profile_dir = profile_dir or os.getenv(PROFILE_DIR_ENV, 'profiles')
+        self.records = []
+        self.result_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+
+    def add_result_bytes(self, df):
+        """Count the in-memory size of a query result."""
+        with self._lock:
+            self.result_bytes += frame_bytes(df)
+
+    @property
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def record(self, record):
+        """Add one record (and append it to the JSON lines file)."""
+        with self._lock:
+            self.records.append(record)
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+
+    def run(self, stage, fn, args=None, rows_in=None):
+        """
+        Run a call as one stage and record it.
+
+        Args:
+            stage: Stage name
+            fn: Callable without arguments
+            args: Identifying arguments of the call
+            rows_in: Rows of the inputs
+
+        Returns:
+            Result of fn
+        """
+        stack = self._stack
+        parent = stack[-1] if stack else None
+        stack.append(stage)
+        result_bytes = self.result_bytes
+        peak_before = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            if parent is None and self.profile:
+                result = self._profiled(stage, fn)
+            else:
+                result = fn()
+        finally:
+            stack.pop()
+        seconds = time.perf_counter() - start
+        peak_after = peak_rss_mb()
+
+        self.record({
+            'stage': stage,
+            'parent': parent,
+            'args': args or {},
+            'seconds': seconds,
+            'rows_in': rows_in,
+            'rows_out': count_rows(result),
+            # Includes concurrent downloads on other threads during the call
+            'result_bytes': self.result_bytes - result_bytes,
+            'rss_growth_mb': None if peak_after is None else peak_after - peak_before,
+            'pid': os.getpid(),
+            'time': time.time()
+        })
+        return result
+
+    def _profiled(self, stage, fn):
+        if not os.path.exists(self.profile_dir):
+            os.makedirs(self.profile_dir)
+        with self._lock:
+            self._profiles += 1
+            name = os.path.join(self.profile_dir, f'{os.getpid()}-{self._profiles:03d}-{stage}')
+
+        if self.profile == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("Warning: pyinstrument is not installed; profiling disabled")
+                self.profile = None
+                return fn()
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return fn()
+            finally:
+                profiler.stop()
+                with open(name + '.html', 'w') as f:
+                    f.write(profiler.output_html())
+
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn)
+        finally:
+            profiler.dump_stats(name + '.prof')
+
+    def summary(self):
+        """
+        Totals per stage over all recorded calls.
+
+        Returns:
+            DataFrame indexed by stage with calls, seconds, rows_in, rows_out,
+            result_mb and rss_growth_mb (largest of the calls) columns,
+            slowest stage first
+        """
+        if len(self.records) == 0:
+            return pd.DataFrame()
+        records = pd.DataFrame(self.records)
+        summary = records.groupby('stage').agg(
+            calls=('seconds', 'size'),
+            seconds=('seconds', 'sum'),
+            rows_in=('rows_in', 'sum'),
+            rows_out=('rows_out', 'sum'),
+            result_mb=('result_bytes', lambda values: values.sum() / 1e6),
+            rss_growth_mb=('rss_growth_mb', 'max')
+        )
+        return summary.sort_values('seconds', ascending=False)
+
+
+def instrumented(method):
+    """
+    Record every call of an analyzer method in self.metrics.
+
+    The method runs unchanged when the instance has no metrics collector.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = getattr(self, 'metrics', None)
+        if metrics is None:
+            return method(self, *args, **kwargs)
+
+        bound = signature.bind(self, *args, **kwargs).arguments
+        call_args = {name: bound[name] for name in RECORD_ARGS
+                     if name in bound and isinstance(bound[name], (str, int, float, list))}
+        counts = [count_rows(value) for name, value in bound.items() if name != 'self']
+        counts = [count for count in counts if count is not None]
+        return metrics.run(method.__name__, lambda: method(self, *args, **kwargs), args=call_args,
+                           rows_in=sum(counts) if counts else None)
+
+    return wrapper
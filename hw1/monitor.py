@@ -0,0 +1,433 @@
+"""
+Real-time calendar spread monitor with deviation alerts.
+
+SpreadMonitor consumes a stream of bar updates (ticks of futcode, time and
+close) for the two contracts of a calendar spread and keeps, per tick:
+
+- the last close of each leg (the forward fill of prepare_contract_data)
+- the spread, second month - front month (calculate_calendar_spread)
+- the N-day deviations d_N = spread - rolling mean of ROLLING_WINDOWS
+  (analyze_spread_dynamics), with an OnlineRollingMean: a tick of a new bar
+  appends the spread, a tick of the current bar replaces its value, so each
+  tick costs O(number of windows) whatever the history length
+
+An alert is emitted when a deviation leaves its band, e.g. the 1% to 99%
+quantiles of the stored d_N distribution. Each tick carries the
+perf_counter_ns time it was received, so the tick-to-alert latency is
+measured on every alert and summarized over all ticks.
+
+Tick sources: tail_file (a growing CSV or JSON lines file), socket_ticks
+(line-delimited ticks over TCP) and replay_bars (a BarStore or DataFrame of
+stored bars).
+
+Usage:
+    python monitor.py --label "CL Calendar Spread" --replay output/bars
+    python monitor.py --label "CL Calendar Spread" --tail ticks.csv --freq 1D
+    python monitor.py --label "YM Calendar Spread" --socket localhost:9000
+"""
+import os
+import sys
+import json
+import time
+import copy
+import socket
+import argparse
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+from rolling_stats import OnlineRollingMean
+
+# Bar update: time in int64 nanoseconds, futcode, close, and the
+# time.perf_counter_ns() at which the tick entered the process
+Tick = namedtuple('Tick', ['time', 'futcode', 'close', 'received'])
+
+DEFAULT_BANDS = (0.01, 0.99)  # Quantiles of each d_N distribution bounding the no-alert band
+LATENCY_BUFFER = 100000  # Most recent tick latencies kept for the latency summary
+LATENCY_TARGET_US = 1000  # Tick-to-alert latency budget; slower ticks are counted in the summary
+
+
+def parse_tick(line, received=None):
+    """
+    Parse one tick line: a JSON object with time, futcode and close, or CSV 'time,futcode,close'.
+
+    Args:
+        line: Text line
+        received: perf_counter_ns() when the line was read (default: now)
+
+    Returns:
+        Tick, or None for blank, header and malformed lines
+    """
+    received = time.perf_counter_ns() if received is None else received
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        if line.startswith('{'):
+            record = json.loads(line)
+            value, futcode, close = record['time'], record['futcode'], record['close']
+        else:
+            value, futcode, close = line.split(',')[:3]
+        return Tick(int(np.datetime64(value, 'ns').astype('int64')), int(futcode), float(close), received)
+    except (ValueError, KeyError):
+        return None
+
+
+def tail_file(path, follow=True, poll_interval=0.05):
+    """
+    Ticks of a text file, waiting for new lines at the end (like tail -f).
+
+    Args:
+        path: CSV or JSON lines file of ticks (see parse_tick)
+        follow: Keep waiting for new lines at the end of the file
+        poll_interval: Seconds between checks for new lines
+
+    Yields:
+        Tick
+    """
+    with open(path) as f:
+        pending = ''
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            received = time.perf_counter_ns()
+            if not line.endswith('\n'):
+                # Partially written line; wait for the rest
+                pending += line
+                continue
+            tick = parse_tick(pending + line, received)
+            pending = ''
+            if tick is not None:
+                yield tick
+
+
+def socket_ticks(host, port):
+    """
+    Ticks read from a TCP connection, one tick per line (see parse_tick).
+
+    Args:
+        host: Host of the tick feed
+        port: Port of the tick feed
+
+    Yields:
+        Tick until the connection is closed
+    """
+    with socket.create_connection((host, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with sock.makefile('r') as stream:
+            for line in stream:
+                tick = parse_tick(line)
+                if tick is not None:
+                    yield tick
+
+
+def replay_bars(bars, futcodes, after=None, speed=None):
+    """
+    Ticks of stored bars in time order.
+
+    Args:
+        bars: BarStore, or DataFrame with futcode, date and close columns
+        futcodes: Futcodes to replay
+        after: Optional time; only later bars are replayed
+        speed: Optional replay speed relative to the bar timestamps (e.g. 60
+            plays one minute of bars per second); as fast as possible if None
+
+    Yields:
+        Tick
+    """
+    if hasattr(bars, 'contract_rows'):
+        rows = [bars.contract_rows(futcode) for futcode in futcodes]
+        times = np.concatenate([np.asarray(r['date']).view('int64') for r in rows])
+        closes = np.concatenate([np.asarray(r['close'], dtype='float64') for r in rows])
+        codes = np.concatenate([np.full(len(r['date']), futcode) for r, futcode in zip(rows, futcodes)])
+    else:
+        bars = bars[bars['futcode'].isin(futcodes)]
+        times = pd.to_datetime(bars['date']).to_numpy(dtype='datetime64[ns]').view('int64')
+        closes = bars['close'].to_numpy(dtype='float64')
+        codes = bars['futcode'].to_numpy()
+
+    order = np.argsort(times, kind='stable')
+    times, closes, codes = times[order], closes[order], codes[order]
+    if after is not None:
+        keep = times > pd.Timestamp(after).value
+        times, closes, codes = times[keep], closes[keep], codes[keep]
+
+    start = time.perf_counter()
+    for t, futcode, close in zip(times.tolist(), codes.tolist(), closes.tolist()):
+        if speed:
+            delay = (t - times[0]) / 1e9 / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        yield Tick(t, futcode, close, time.perf_counter_ns())
+
+
+def bands_from_results(results, lower=DEFAULT_BANDS[0], upper=DEFAULT_BANDS[1]):
+    """
+    Alert bands of each deviation series from the quantiles of an analysis.
+
+    Args:
+        results: Dictionary returned by analyze_spread_dynamics (or
+            ResultsStore.load_results)
+        lower: Quantile of the lower band edge
+        upper: Quantile of the upper band edge
+
+    Returns:
+        Dictionary mapping deviation key (e.g. 'd_5') to (lower, upper) values
+    """
+    bands = {}
+    for key, dev in results['deviations'].items():
+        quantiles = dev['quantiles']
+        if lower not in quantiles.index or upper not in quantiles.index:
+            raise ValueError(f"Quantiles {lower} and {upper} are not in the results of {key}")
+        bands[key] = (quantiles.loc[lower], quantiles.loc[upper])
+    return bands
+
+
+def print_alert(alert):
+    """Default alert handler: one line per alert."""
+    print(f"[{alert['time']}] {alert['label']} {alert['series']} {alert['side']} band: "
+          f"{alert['deviation']:.4f} (band {alert['band'][0]:.4f} to {alert['band'][1]:.4f}, "
+          f"spread {alert['spread']:.4f}, latency {alert['latency_us']:.1f} us)")
+
+
+class SpreadMonitor:
+    """Streaming calendar spread and deviation tracker with band alerts."""
+
+    def __init__(self, label, futcodes, windows, bands, freq=None, history=None, on_alert=None,
+                 latency_buffer=LATENCY_BUFFER):
+        """
+        Args:
+            label: Spread label used in the alerts
+            futcodes: (second month, front month) futcodes of the spread
+            windows: Rolling window sizes (bars)
+            bands: Dictionary mapping 'd_N' to its (lower, upper) alert band
+            freq: Optional bar period (e.g. '1D', '1m'); ticks are assigned to
+                the bar of their floored time, the last tick of a bar sets its
+                close, and bars without ticks repeat the last spread (the
+                forward fill of the batch analysis). If None, every distinct
+                tick time is one bar
+            history: Optional spread values preceding the stream, warming up
+                the rolling means
+            on_alert: Callable receiving each alert dictionary (default: print_alert)
+            latency_buffer: Number of recent tick latencies kept
+        """
+        self.label = label
+        self.futcodes = tuple(futcodes)
+        self.windows = list(windows)
+        self.keys = [f'd_{N}' for N in self.windows]
+        self.bands = np.array([bands.get(key, (-np.inf, np.inf)) for key in self.keys], dtype='float64')
+        self.period = pd.Timedelta(freq).value if freq else None
+        self.on_alert = print_alert if on_alert is None else on_alert
+
+        if history is not None and len(history) > 0:
+            self.rolling = OnlineRollingMean.from_history(self.windows, np.asarray(history, dtype='float64'))
+        else:
+            self.rolling = OnlineRollingMean(self.windows)
+        self._legs = {futcode: i for i, futcode in enumerate(self.futcodes)}
+        self.closes = [np.nan, np.nan]
+        self.bar = None  # Time (ns) of the current bar
+        self.spread = np.nan
+        self.deviations = np.full(len(self.windows), np.nan)
+        # Side of each deviation relative to its band: -1 below, 0 inside, 1 above
+        self._sides = np.zeros(len(self.windows), dtype='int64')
+
+        self.ticks = 0
+        self.late = 0
+        self.alerts = 0
+        self._latencies = np.zeros(latency_buffer, dtype='int64')
+
+    @classmethod
+    def from_state(cls, state, bands, freq='1D', on_alert=None):
+        """
+        Monitor continuing an incremental SpreadState (see incremental.py).
+
+        The state's contracts, last closes and rolling means are copied, so
+        the first ticks after the state's last date give the same deviations
+        as the next update_spread_dynamics would.
+
+        Args:
+            state: SpreadState
+            bands: Dictionary mapping 'd_N' to its (lower, upper) alert band
+            freq: Bar period of the state's series (daily by default)
+            on_alert: Optional alert handler
+
+        Returns:
+            SpreadMonitor
+        """
+        monitor = cls(state.label, state.futcodes, state.windows, bands, freq=freq, on_alert=on_alert)
+        monitor.rolling = copy.deepcopy(state.rolling)
+        monitor.closes = list(state.last_closes)
+        if state.last_date is not None:
+            monitor.bar = pd.Timestamp(state.last_date).value
+            monitor.spread = monitor.closes[0] - monitor.closes[1]
+        return monitor
+
+    def on_tick(self, tick):
+        """
+        Process one tick.
+
+        Args:
+            tick: Tick of one of the spread's contracts (others are ignored)
+
+        Returns:
+            List of alert dictionaries (usually empty)
+        """
+        leg = self._legs.get(tick.futcode)
+        if leg is None or tick.close != tick.close:
+            return []
+        bar = tick.time - tick.time % self.period if self.period else tick.time
+        if self.bar is not None and bar < self.bar:
+            # Tick of a bar that is already closed
+            self.late += 1
+            return []
+
+        self.closes[leg] = tick.close
+        spread = self.closes[0] - self.closes[1]
+        if bar == self.bar:
+            means = self.rolling.replace(spread)
+        else:
+            if self.period and self.bar is not None:
+                # Bars without ticks repeat the last spread; beyond the longest
+                # window the repeats no longer change the means
+                for _ in range(min((bar - self.bar) // self.period - 1, self.rolling.size)):
+                    self.rolling.update(self.spread)
+            means = self.rolling.update(spread)
+            self.bar = bar
+        self.spread = spread
+        self.deviations = spread - means
+
+        sides = np.where(self.deviations < self.bands[:, 0], -1, np.where(self.deviations > self.bands[:, 1], 1, 0))
+        alerts = []
+        crossed = np.flatnonzero((sides != self._sides) & (sides != 0))
+        self._sides = sides
+        for i in crossed:
+            alerts.append({
+                'label': self.label,
+                'time': pd.Timestamp(tick.time),
+                'series': self.keys[i],
+                'side': 'above' if sides[i] > 0 else 'below',
+                'deviation': self.deviations[i],
+                'band': tuple(self.bands[i]),
+                'spread': spread,
+                'latency_us': (time.perf_counter_ns() - tick.received) / 1e3
+            })
+
+        self._latencies[self.ticks % len(self._latencies)] = time.perf_counter_ns() - tick.received
+        self.ticks += 1
+        self.alerts += len(alerts)
+        return alerts
+
+    def run(self, ticks, max_ticks=None):
+        """
+        Process a tick source until it ends (or max_ticks ticks).
+
+        Args:
+            ticks: Iterable of Tick (e.g. tail_file, socket_ticks, replay_bars)
+            max_ticks: Optional number of ticks to process
+
+        Returns:
+            Latency summary (see latency_summary)
+        """
+        for count, tick in enumerate(ticks, 1):
+            for alert in self.on_tick(tick):
+                self.on_alert(alert)
+            if max_ticks is not None and count >= max_ticks:
+                break
+        return self.latency_summary()
+
+    def latency_summary(self):
+        """
+        Tick-to-result latency over the recent ticks.
+
+        Returns:
+            Dictionary with ticks, late ticks, alerts, the p50, p99 and max
+            latency in microseconds and the number of recent ticks over
+            LATENCY_TARGET_US
+        """
+        latencies = self._latencies[:min(self.ticks, len(self._latencies))] / 1e3
+        summary = {'ticks': self.ticks, 'late': self.late, 'alerts': self.alerts}
+        if len(latencies) > 0:
+            summary.update(p50_us=np.percentile(latencies, 50), p99_us=np.percentile(latencies, 99),
+                           max_us=latencies.max(), over_target=int((latencies > LATENCY_TARGET_US).sum()))
+        return summary
+
+
+def load_bars(path):
+    """Stored bars for replay: a BarStore directory, or a Parquet or CSV file of bars."""
+    if os.path.isdir(path):
+        from bar_store import BarStore
+        return BarStore(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=['futcode', 'date', 'close'])
+    return pd.read_csv(path, usecols=['futcode', 'date', 'close'])
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    from main import ROLLING_WINDOWS, RESULTS_DIR, STATE_DIR
+    from results_store import ResultsStore
+    from incremental import load_state, state_path
+
+    parser = argparse.ArgumentParser(description="Real-time calendar spread deviation monitor")
+    parser.add_argument('--label', required=True, help="Spread label in the results store")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--tail', help="Follow a CSV or JSON lines file of ticks")
+    source.add_argument('--socket', help="Read line-delimited ticks from host:port")
+    source.add_argument('--replay', help="Replay stored bars (BarStore directory, Parquet or CSV file)")
+    parser.add_argument('--futcodes', type=int, nargs=2, metavar=('SECOND', 'FRONT'),
+                        help="Contracts of the spread (default: from the incremental state)")
+    parser.add_argument('--bands', type=float, nargs=2, default=DEFAULT_BANDS, metavar=('LOWER', 'UPPER'),
+                        help="Quantiles of the d_N distributions bounding the no-alert band")
+    parser.add_argument('--freq', default='1D', help="Bar period of the spread ('' for one bar per tick time)")
+    parser.add_argument('--speed', type=float, help="Replay speed relative to the bar timestamps")
+    parser.add_argument('--max-ticks', type=int, help="Stop after this many ticks")
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help="Results store with the d_N quantiles")
+    parser.add_argument('--state-dir', default=STATE_DIR, help="Directory of the incremental state")
+    args = parser.parse_args(argv)
+
+    results = ResultsStore(args.results_dir).load_results(args.label) if args.results_dir else None
+    if results is None:
+        print(f"No stored results for {args.label}; run main.py analyze or update first")
+        return 1
+    bands = bands_from_results(results, *args.bands)
+
+    state = load_state(state_path(args.state_dir, args.label)) if args.state_dir else None
+    if args.futcodes is None and state is not None:
+        monitor = SpreadMonitor.from_state(state, bands, freq=args.freq or None)
+    elif args.futcodes is not None:
+        history = results['spread'].to_numpy(dtype='float64', na_value=np.nan)
+        monitor = SpreadMonitor(args.label, args.futcodes, ROLLING_WINDOWS, bands, freq=args.freq or None,
+                                history=history)
+    else:
+        print(f"No incremental state for {args.label}; pass --futcodes SECOND FRONT")
+        return 1
+
+    if args.tail:
+        ticks = tail_file(args.tail)
+    elif args.socket:
+        host, port = args.socket.rsplit(':', 1)
+        ticks = socket_ticks(host, int(port))
+    else:
+        after = pd.Timestamp(state.last_date) if state is not None and args.futcodes is None else None
+        ticks = replay_bars(load_bars(args.replay), monitor.futcodes, after=after, speed=args.speed)
+
+    print(f"Monitoring {args.label} (futcodes {monitor.futcodes[0]} - {monitor.futcodes[1]}), "
+          f"bands at quantiles {args.bands[0]} / {args.bands[1]}")
+    try:
+        summary = monitor.run(ticks, max_ticks=args.max_ticks)
+    except KeyboardInterrupt:
+        summary = monitor.latency_summary()
+
+    print(f"\n{summary['ticks']} ticks ({summary['late']} late), {summary['alerts']} alerts")
+    if 'p50_us' in summary:
+        print(f"Tick-to-result latency: p50 {summary['p50_us']:.1f} us, p99 {summary['p99_us']:.1f} us, "
+              f"max {summary['max_us']:.1f} us ({summary['over_target']} over {LATENCY_TARGET_US} us)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
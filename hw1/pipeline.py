@@ -0,0 +1,261 @@
+"""
+Configuration-driven driver for many calendar spreads.
+
+Reads a TOML (or YAML, if PyYAML is installed) file listing the spreads and
+spread pairs to analyze, runs download -> contract selection -> spread ->
+analysis for every spread on a process pool, then the cross-spread analysis
+for every pair, and collects everything into summary tables.
+
+Usage:
+    python pipeline.py spreads.toml
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+import main
+from main import FuturesSpreadAnalyzer, ROLLING_WINDOWS
+
+# Analyzer of the current worker process (one database connection per worker)
+_worker_analyzer = None
+
+
+def load_config(path):
+    """
+    Load and validate a pipeline configuration file.
+
+    Args:
+        path: Path to a .toml, .yaml or .yml file
+
+    Returns:
+        Dictionary with start_date, end_date, spreads, pairs and options
+    """
+    if path.endswith(('.yaml', '.yml')):
+        import yaml
+        with open(path) as f:
+            config = yaml.safe_load(f)
+    else:
+        import tomllib
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+
+    config.setdefault('start_date', main.START_DATE)
+    config.setdefault('end_date', main.END_DATE)
+    config.setdefault('output_dir', 'output')
+    config.setdefault('cache_dir', main.CACHE_DIR)
+    config.setdefault('max_workers', os.cpu_count() or 1)
+    config.setdefault('contract_codes', {})
+    config.setdefault('pairs', [])
+
+    if not config.get('spreads'):
+        raise ValueError(f"No spreads configured in {path}")
+    for spread in config['spreads']:
+        if 'ticker' not in spread:
+            raise ValueError(f"Spread entry without ticker: {spread}")
+        spread.setdefault('label', f"{spread['ticker']} Calendar Spread")
+
+    labels = {spread['label'] for spread in config['spreads']}
+    for pair in config['pairs']:
+        for key in ('first', 'second'):
+            if pair.get(key) not in labels:
+                raise ValueError(f"Pair refers to unknown spread label: {pair.get(key)}")
+
+    return config
+
+
+def _init_worker(config):
+    """Process-pool initializer: register contract codes and open one analyzer."""
+    global _worker_analyzer
+    main.CONTRACT_CODES.update(config['contract_codes'])
+
+    source = config.get('source', main.DATA_SOURCE)
+    if config.get('sqlite'):
+        source = f"sqlite:{config['sqlite']}"
+    _worker_analyzer = FuturesSpreadAnalyzer(
+        main.WRDS_USERNAME, main.WRDS_PASSWORD, cache_dir=config['cache_dir'], source=source,
+        quantile_backend=config.get('quantile_backend', 'exact'),
+        # A configured metrics file turns recording on (else FUTURES_PROFILE decides)
+        metrics=True if config.get('metrics_path') else None, metrics_path=config.get('metrics_path'),
+        start_date=config['start_date'], end_date=config['end_date']
+    )
+
+
+def _run_spread(spread, start_date, end_date, shard=None):
+    """
+    Download, select contracts, build and analyze one calendar spread.
+
+    Args:
+        spread: Spread entry of the configuration (ticker, label)
+        start_date: Start date for data
+        end_date: End date for data
+        shard: Optional 'week' or 'month' to process the date range in shards
+
+    Returns:
+        Tuple (spread entry, analysis results or None, [front, second] futcodes)
+    """
+    analyzer = _worker_analyzer
+    if shard:
+        spread_series, contracts = analyzer.calculate_spread_sharded(spread['ticker'], start_date, end_date,
+                                                                     shard=shard)
+        if spread_series is None:
+            return spread, None, contracts
+        return spread, analyzer.analyze_spread_dynamics(spread_series, spread['label']), contracts
+
+    data = analyzer.download_futures_data(spread['ticker'], start_date, end_date)
+    contracts = analyzer.identify_top_contracts(data, n_contracts=2)
+    if len(contracts) < 2:
+        print(f"  Not enough contracts for {spread['label']}")
+        return spread, None, contracts
+
+    front = analyzer.prepare_contract_data(data, contracts[0], start_date=start_date, end_date=end_date)
+    second = analyzer.prepare_contract_data(data, contracts[1], start_date=start_date, end_date=end_date)
+    spread_series = analyzer.calculate_calendar_spread(second, front)
+    return spread, analyzer.analyze_spread_dynamics(spread_series, spread['label']), contracts
+
+
+def _run_pair(results1, results2, label1, label2):
+    """Cross-spread analysis of two analyzed spreads."""
+    return _worker_analyzer.analyze_cross_spread_dynamics(
+        results1['spread'], results2['spread'], label1, label2
+    )
+
+
+def summarize_spread(spread, results, contracts):
+    """One summary-table row for an analyzed spread."""
+    row = {
+        'label': spread['label'],
+        'ticker': spread['ticker'],
+        'front': contracts[0] if len(contracts) > 0 else None,
+        'second': contracts[1] if len(contracts) > 1 else None
+    }
+    if results is None:
+        return row
+
+    stats = results['stats']
+    row.update({
+        'observations': int(results['spread'].notna().sum()),
+        'mean': stats['mean'],
+        'median': stats['median'],
+        'std': stats['std'],
+        'min': stats['min'],
+        'max': stats['max']
+    })
+    for q, val in stats['quantiles'].items():
+        row[f'q{q*100:g}'] = val
+    for N in ROLLING_WINDOWS:
+        row[f'd_{N}_std'] = results['deviations'][f'd_{N}']['std']
+    return row
+
+
+def run_pipeline(config):
+    """
+    Run every configured spread and pair on a process pool.
+
+    A spread or pair that fails (an exception in its worker, or no spread to
+    analyze) is reported and recorded in the failures, and the others
+    continue; pairs of a failed spread are skipped.
+
+    Args:
+        config: Configuration dictionary from load_config
+
+    Returns:
+        Tuple (spread summary DataFrame, pair summary DataFrame, dictionary of
+        analysis results by label, dictionary mapping failed spread labels and
+        'first / second' pair labels to the reason)
+    """
+    start_date, end_date = config['start_date'], config['end_date']
+    results, rows, failures = {}, [], {}
+
+    with ProcessPoolExecutor(max_workers=config['max_workers'], initializer=_init_worker,
+                             initargs=(config,)) as executor:
+        futures = {executor.submit(_run_spread, spread, start_date, end_date, config.get('shard')): spread
+                   for spread in config['spreads']}
+        for future in as_completed(futures):
+            spread = futures[future]
+            try:
+                spread, spread_results, contracts = future.result()
+            except Exception as e:
+                print(f"Error in {spread['label']}: {e}")
+                spread_results, contracts = None, []
+                failures[spread['label']] = str(e)
+            else:
+                print(f"Finished {spread['label']}")
+                if spread_results is None:
+                    failures[spread['label']] = 'no spread'
+            results[spread['label']] = spread_results
+            rows.append(summarize_spread(spread, spread_results, contracts))
+
+        pair_futures = {}
+        for pair in config['pairs']:
+            name = f"{pair['first']} / {pair['second']}"
+            missing = [label for label in (pair['first'], pair['second']) if results[label] is None]
+            if missing:
+                print(f"Skipping pair {name}: no results for {', '.join(missing)}")
+                failures[name] = f"no results for {', '.join(missing)}"
+                continue
+            future = executor.submit(_run_pair, results[pair['first']], results[pair['second']],
+                                     pair['first'], pair['second'])
+            pair_futures[future] = pair
+
+        pair_rows = []
+        for future in as_completed(pair_futures):
+            pair = pair_futures[future]
+            try:
+                cross_results = future.result()
+            except Exception as e:
+                print(f"Error in pair {pair['first']} / {pair['second']}: {e}")
+                failures[f"{pair['first']} / {pair['second']}"] = str(e)
+                continue
+            row = {'first': pair['first'], 'second': pair['second'],
+                   'correlation': cross_results['correlation']}
+            row.update(cross_results['d_correlations'])
+            pair_rows.append(row)
+
+    # Keep configuration order regardless of completion order
+    order = [spread['label'] for spread in config['spreads']]
+    summary = pd.DataFrame(rows).set_index('label').loc[order]
+    pair_summary = pd.DataFrame(pair_rows, columns=['first', 'second', 'correlation']
+                                + [f'd_{N}' for N in ROLLING_WINDOWS])
+    return summary, pair_summary, results, failures
+
+
+def main_pipeline(config_path):
+    """
+    Run the pipeline for a configuration file and write the summary tables.
+
+    Returns:
+        Exit status: 0 if every spread and pair succeeded, 1 otherwise
+    """
+    config = load_config(config_path)
+    print("=" * 80)
+    print(f"SPREAD PIPELINE: {len(config['spreads'])} spreads, {len(config['pairs'])} pairs")
+    print(f"Date Range: {config['start_date']} to {config['end_date']}")
+    print("=" * 80)
+
+    summary, pair_summary, _, failures = run_pipeline(config)
+
+    output_dir = config['output_dir']
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    summary.to_csv(f'{output_dir}/spread_summary.csv')
+    pair_summary.to_csv(f'{output_dir}/pair_summary.csv', index=False)
+
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print("\nSpread summary:")
+        print(summary)
+        print("\nPair summary:")
+        print(pair_summary)
+    print(f"\nSaved: {output_dir}/spread_summary.csv")
+    print(f"Saved: {output_dir}/pair_summary.csv")
+
+    if failures:
+        print(f"\n{len(failures)} failed:")
+        for label, reason in failures.items():
+            print(f"  {label}: {reason}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_pipeline(sys.argv[1] if len(sys.argv) > 1 else 'spreads.toml'))
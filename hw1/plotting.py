@@ -0,0 +1,232 @@
+"""
+Figure rendering for the spread analysis.
+
+Each figure is drawn by a module-level function taking plain data, so the
+figures can be rendered in parallel on a process pool (Agg backend). Long
+series are reduced with min/max-per-pixel decimation before plotting, which
+keeps every visible extreme while drawing at most two points per pixel
+column. Preview mode renders at lower DPI without tight bounding boxes.
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+FULL_DPI = 300
+PREVIEW_DPI = 100
+MAX_SCATTER_POINTS = 50000
+MAX_RENDER_WORKERS = 4  # Default render processes, capped by the CPU count
+
+
+def decimate_minmax(series, n_buckets):
+    """
+    Downsample a series keeping the min and max of each of n_buckets bins.
+
+    Args:
+        series: Series to downsample
+        n_buckets: Number of bins (typically the plot width in pixels)
+
+    Returns:
+        Series with at most 2 * n_buckets + 2 points, in original order
+    """
+    n = len(series)
+    if n <= 2 * n_buckets:
+        return series
+
+    values = pd.Series(series.to_numpy(dtype='float64', na_value=np.nan))
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.linspace(0, n, n_buckets + 1).astype('int64')))
+    valid = values.notna().to_numpy()
+    grouped = values[valid].groupby(bucket[valid])
+    keep = np.unique(np.concatenate([
+        grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy(), [0, n - 1]
+    ]).astype('int64'))
+    return series.iloc[keep]
+
+
+def _setup_worker():
+    """Select the non-interactive backend and the plot style in a render worker."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    sns.set_style('whitegrid')
+    plt.rcParams['figure.figsize'] = (15, 10)
+
+
+def _save(fig, path, preview):
+    import matplotlib.pyplot as plt
+    plt.tight_layout()
+    if preview:
+        fig.savefig(path, dpi=PREVIEW_DPI)
+    else:
+        fig.savefig(path, dpi=FULL_DPI, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+def plot_timeseries(spreads, path, preview=False):
+    """
+    Time series of spreads, one panel each.
+
+    Args:
+        spreads: List of (label, Series, color) tuples, None for an empty panel
+        path: Output PNG path
+        preview: Render at preview quality
+    """
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(2, 1, figsize=(15, 10))
+
+    for idx, item in enumerate(spreads):
+        if item is None:
+            continue
+        label, spread, color = item
+        spread.plot(ax=axes[idx], label=label, linewidth=2, color=color)
+        axes[idx].set_title(f"{label} Over Time", fontsize=14, fontweight='bold')
+        if idx == 1:
+            axes[idx].set_xlabel('Date', fontsize=12)
+        axes[idx].set_ylabel('Spread Value', fontsize=12)
+        axes[idx].legend()
+        axes[idx].grid(True, alpha=0.3)
+
+    return _save(fig, path, preview)
+
+
+def plot_distributions(spreads, path, preview=False):
+    """
+    Histograms of spread values with the median marked.
+
+    Args:
+        spreads: List of (label, values, median, color) tuples, None for an
+            empty panel; values may be pre-binned as (counts, edges)
+        path: Output PNG path
+        preview: Render at preview quality
+    """
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+
+    for idx, item in enumerate(spreads):
+        if item is None:
+            continue
+        label, (counts, edges), median, color = item
+        axes[idx].hist(edges[:-1], bins=edges, weights=counts, alpha=0.7,
+                       color=color, edgecolor='black')
+        axes[idx].axvline(median, color='red', linestyle='--', label=f"Median: {median:.4f}")
+        axes[idx].set_title(f"Distribution of {label}", fontsize=14, fontweight='bold')
+        axes[idx].set_xlabel('Spread Value', fontsize=12)
+        axes[idx].set_ylabel('Frequency', fontsize=12)
+        axes[idx].legend()
+        axes[idx].grid(True, alpha=0.3)
+
+    return _save(fig, path, preview)
+
+
+def plot_deviations(label, deviations, path, color=None, preview=False):
+    """
+    Deviation from the N-day moving average, one panel per window.
+
+    Args:
+        label: Spread label
+        deviations: List of (N, Series) tuples (at most four)
+        path: Output PNG path
+        color: Line color
+        preview: Render at preview quality
+    """
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    axes = axes.flatten()
+
+    for idx, (N, dev_data) in enumerate(deviations):
+        dev_data.plot(ax=axes[idx], label=f'{N}-day deviation', linewidth=2, color=color)
+        axes[idx].axhline(0, color='red', linestyle='--', alpha=0.5)
+        axes[idx].set_title(f"{label} - Deviation from {N}-Day MA", fontsize=12, fontweight='bold')
+        axes[idx].set_ylabel('Deviation', fontsize=10)
+        axes[idx].legend()
+        axes[idx].grid(True, alpha=0.3)
+
+    return _save(fig, path, preview)
+
+
+def plot_scatter(label1, values1, label2, values2, correlation, path, preview=False):
+    """
+    Scatter plot of two spreads.
+
+    Args:
+        label1: Label of the x-axis spread
+        values1: Values of the x-axis spread
+        label2: Label of the y-axis spread
+        values2: Values of the y-axis spread
+        correlation: Correlation shown in the title
+        path: Output PNG path
+        preview: Render at preview quality
+    """
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.scatter(values1, values2, alpha=0.6, s=100, rasterized=len(values1) > MAX_SCATTER_POINTS // 10)
+    ax.set_xlabel(label1, fontsize=12)
+    ax.set_ylabel(label2, fontsize=12)
+    ax.set_title(f"Scatter Plot: {label1} vs {label2}\n" + f"Correlation: {correlation:.4f}",
+                 fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+
+    return _save(fig, path, preview)
+
+
+def pixel_width(figure_width, preview=False):
+    """Number of horizontal pixels of a figure of the given width in inches."""
+    return int(figure_width * (PREVIEW_DPI if preview else FULL_DPI))
+
+
+def histogram(values, bins=30):
+    """Pre-binned histogram (counts, edges) of the non-NaN values."""
+    values = np.asarray(values, dtype='float64')
+    return np.histogram(values[~np.isnan(values)], bins=bins)
+
+
+def thin_pairs(values1, values2, max_points=MAX_SCATTER_POINTS):
+    """Evenly thin two aligned arrays to at most max_points points."""
+    step = max(1, len(values1) // max_points)
+    return values1[::step], values2[::step]
+
+
+class RenderPipeline:
+    """
+    Renders figure jobs on a process pool without blocking the caller.
+
+    Workers are spawned rather than forked: a forked worker would inherit the
+    parent's matplotlib state (backend, open figures) and any lock held by
+    another thread at fork time, while a spawned one starts clean and is set
+    up by _setup_worker.
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        Args:
+            max_workers: Number of render processes (default: MAX_RENDER_WORKERS,
+                capped by the CPU count)
+        """
+        self.max_workers = max_workers or min(MAX_RENDER_WORKERS, os.cpu_count() or 1)
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_setup_worker)
+        self.futures = []
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a figure function; returns immediately."""
+        self.futures.append(self.executor.submit(func, *args, **kwargs))
+
+    def wait(self):
+        """
+        Block until all figures are written.
+
+        Returns:
+            List of written file paths
+        """
+        paths = []
+        for future in self.futures:
+            path = future.result()
+            print(f"Saved: {path}")
+            paths.append(path)
+        self.executor.shutdown()
+        self.futures = []
+        return paths
@@ -0,0 +1,269 @@
+"""
+Pluggable quantile backends for spread and deviation statistics.
+
+- 'exact':   keeps every value; same result as Series.quantile (linear)
+- 'tdigest': merging t-digest; bounded memory and mergeable, so sketches
+             built on separate days or workers combine without raw data
+- 'p2':      P-squared estimator (Jain & Chlamtac); five markers per quantile,
+             constant memory, but not mergeable
+
+All backends share the interface update / update_many / merge / quantile.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def _clean(values):
+    """Float array of values with NaNs removed."""
+    values = np.asarray(values, dtype='float64').ravel()
+    return values[~np.isnan(values)]
+
+
+class ExactQuantiles:
+    """Exact quantiles over all values seen (reference backend)."""
+
+    mergeable = True
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.quantiles = list(quantiles)
+        self._chunks = []
+        self.count = 0
+
+    def update(self, x):
+        """Add one value."""
+        self.update_many([x])
+
+    def update_many(self, values):
+        """Add an array of values (NaNs are skipped)."""
+        values = _clean(values)
+        if len(values) > 0:
+            self._chunks.append(values)
+            self.count += len(values)
+
+    def merge(self, other):
+        """Return a new sketch holding the values of both sketches."""
+        merged = ExactQuantiles(self.quantiles)
+        merged._chunks = self._chunks + other._chunks
+        merged.count = self.count + other.count
+        return merged
+
+    def quantile(self, qs=None):
+        """Quantiles (linear interpolation) as a NumPy array."""
+        qs = self.quantiles if qs is None else qs
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        return np.quantile(np.concatenate(self._chunks), qs)
+
+
+class TDigest:
+    """Merging t-digest with the k1 (arcsine) scale function."""
+
+    mergeable = True
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES, compression=200, buffer_size=10000):
+        """
+        Args:
+            quantiles: Default quantiles returned by quantile()
+            compression: Number of k-scale bins; roughly compression / 2 centroids
+            buffer_size: Values buffered by update() before compressing
+        """
+        self.quantiles = list(quantiles)
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []
+
+    @property
+    def count(self):
+        return self.weights.sum() + len(self._buffer)
+
+    def update(self, x):
+        """Add one value."""
+        if x == x:
+            self._buffer.append(x)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush()
+
+    def update_many(self, values):
+        """Add an array of values (NaNs are skipped)."""
+        values = _clean(values)
+        if len(values) == 0:
+            return
+        self._flush()
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+
+    def _flush(self):
+        if self._buffer:
+            values = np.array(self._buffer)
+            self._buffer = []
+            self._compress(np.concatenate([self.means, values]),
+                           np.concatenate([self.weights, np.ones(len(values))]))
+
+    def _compress(self, means, weights):
+        """Merge sorted centroids that fall into the same k-scale bin."""
+        self.min = min(self.min, means.min())
+        self.max = max(self.max, means.max())
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bins = np.floor(k).astype('int64')
+        bins -= bins[0]
+
+        merged_weights = np.bincount(bins, weights=weights)
+        merged_sums = np.bincount(bins, weights=means * weights)
+        keep = merged_weights > 0
+        self.weights = merged_weights[keep]
+        self.means = merged_sums[keep] / self.weights
+
+    def merge(self, other):
+        """Return a new digest summarizing both digests."""
+        self._flush()
+        other._flush()
+        merged = TDigest(self.quantiles, compression=self.compression, buffer_size=self.buffer_size)
+        if len(self.weights) + len(other.weights) > 0:
+            merged._compress(np.concatenate([self.means, other.means]),
+                             np.concatenate([self.weights, other.weights]))
+        # Centroid means lie inside the range, so keep the exact extremes
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        return merged
+
+    def quantile(self, qs=None):
+        """Approximate quantiles as a NumPy array."""
+        qs = self.quantiles if qs is None else qs
+        self._flush()
+        if len(self.weights) == 0:
+            return np.full(len(qs), np.nan)
+
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        xp = np.concatenate([[0.0], centers, [total]])
+        fp = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(qs) * total, xp, fp)
+
+
+class _P2Marker:
+    """P-squared estimator of a single quantile."""
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        # Plain lists: scalar updates on small lists are faster than NumPy
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self.desired
+        for i in range(5):
+            desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self):
+        if len(self.heights) == 0:
+            return np.nan
+        if len(self.heights) < 5:
+            return np.quantile(self.heights, self.p)
+        return self.heights[2]
+
+
+class P2Quantiles:
+    """P-squared streaming estimator for a fixed set of quantiles."""
+
+    mergeable = False
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.quantiles = list(quantiles)
+        self._markers = [_P2Marker(p) for p in self.quantiles]
+        self.count = 0
+
+    def update(self, x):
+        """Add one value."""
+        if x == x:
+            for marker in self._markers:
+                marker.update(x)
+            self.count += 1
+
+    def update_many(self, values):
+        """Add an array of values (NaNs are skipped)."""
+        for x in _clean(values).tolist():
+            self.update(x)
+
+    def merge(self, other):
+        raise TypeError("P2 sketches cannot be merged; use the 'tdigest' backend")
+
+    def quantile(self, qs=None):
+        """Estimated quantiles; only the quantiles given at construction are tracked."""
+        if qs is not None and list(qs) != self.quantiles:
+            raise ValueError(f"P2 sketch only tracks quantiles {self.quantiles}")
+        return np.array([marker.value() for marker in self._markers])
+
+
+QUANTILE_BACKENDS = {
+    'exact': ExactQuantiles,
+    'tdigest': TDigest,
+    'p2': P2Quantiles
+}
+
+
+def make_sketch(backend, quantiles=DEFAULT_QUANTILES):
+    """
+    Create an empty quantile sketch.
+
+    Args:
+        backend: One of 'exact', 'tdigest', 'p2'
+        quantiles: Quantiles the sketch reports by default
+
+    Returns:
+        Sketch object with update / update_many / merge / quantile
+    """
+    if backend not in QUANTILE_BACKENDS:
+        raise ValueError(f"Unknown quantile backend: {backend}")
+    return QUANTILE_BACKENDS[backend](quantiles)
+
+
+def sketch_to_series(sketch):
+    """Quantiles of a sketch as a Series indexed by quantile, like Series.quantile."""
+    return pd.Series(sketch.quantile(), index=sketch.quantiles)
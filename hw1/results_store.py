@@ -0,0 +1,206 @@
+"""
+Columnar store for spread analysis results.
+
+Results are written as Parquet datasets under one root directory:
+
+- stats/        one row per (spread, series): mean, median, std, min, max
+- quantiles/    one row per (spread, series, quantile)
+- deviations/   spread and d_N deviation values per date, partitioned by
+                spread and month
+- cross/        one row per (spread1, spread2, series) correlation
+
+Downstream tools (and the notebook) can query these with pandas, pyarrow or
+DuckDB without rerunning the pipeline; load_results rebuilds the dictionary
+returned by FuturesSpreadAnalyzer.analyze_spread_dynamics.
+"""
+import os
+import shutil
+import uuid
+from urllib.parse import quote
+import pandas as pd
+
+TABLES = ['stats', 'quantiles', 'deviations', 'cross']
+
+
+class ResultsStore:
+    """Parquet-backed store of per-spread statistics, quantiles and deviations."""
+
+    def __init__(self, root):
+        """
+        Args:
+            root: Root directory of the store
+        """
+        self.root = root
+        if not os.path.exists(root):
+            os.makedirs(root)
+
+    def _table_path(self, table):
+        return os.path.join(self.root, table)
+
+    def _drop_partition(self, table, column, value):
+        # pyarrow URL-encodes partition values ('CL Calendar Spread' is written
+        # as spread=CL%20Calendar%20Spread)
+        for name in {str(value), quote(str(value), safe='')}:
+            path = os.path.join(self._table_path(table), f'{column}={name}')
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+    def _write(self, table, df, partition_cols):
+        df.to_parquet(self._table_path(table), partition_cols=partition_cols, index=False,
+                      basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet')
+
+    def write_spread_results(self, results, append=False):
+        """
+        Write the results of analyze_spread_dynamics for one spread.
+
+        Args:
+            results: Dictionary returned by analyze_spread_dynamics
+            append: Append the deviation rows to the spread's existing ones
+                instead of replacing them (stats and quantiles are always replaced)
+        """
+        label = results['label']
+        for table in ['stats', 'quantiles'] + ([] if append else ['deviations']):
+            self._drop_partition(table, 'spread', label)
+
+        stats = results['stats']
+        stat_rows = [{'spread': label, 'series': 'spread', 'mean': stats['mean'],
+                      'median': stats['median'], 'std': stats['std'],
+                      'min': stats['min'], 'max': stats['max']}]
+        quantile_rows = [{'spread': label, 'series': 'spread', 'quantile': q, 'value': v}
+                         for q, v in stats['quantiles'].items()]
+
+        frame = pd.DataFrame({'spread_value': results['spread']})
+        for key, dev in results['deviations'].items():
+            stat_rows.append({'spread': label, 'series': key, 'median': dev['median'], 'std': dev['std']})
+            quantile_rows.extend({'spread': label, 'series': key, 'quantile': q, 'value': v}
+                                 for q, v in dev['quantiles'].items())
+            if dev.get('values') is not None:
+                frame[key] = dev['values']
+
+        self._write('stats', pd.DataFrame(stat_rows), ['spread'])
+        self._write('quantiles', pd.DataFrame(quantile_rows), ['spread'])
+
+        frame.index = pd.to_datetime(frame.index)
+        frame = frame.rename_axis('date').reset_index()
+        frame['spread'] = label
+        frame['month'] = frame['date'].dt.strftime('%Y-%m')
+        self._write('deviations', frame, ['spread', 'month'])
+
+    def write_cross_results(self, label1, label2, cross_results):
+        """
+        Write the results of analyze_cross_spread_dynamics for one pair.
+
+        Args:
+            label1: Label of the first spread
+            label2: Label of the second spread
+            cross_results: Dictionary returned by analyze_cross_spread_dynamics
+        """
+        pair = f'{label1} | {label2}'
+        self._drop_partition('cross', 'pair', pair)
+        rows = [{'pair': pair, 'spread1': label1, 'spread2': label2, 'series': 'spread',
+                 'correlation': cross_results['correlation']}]
+        rows.extend({'pair': pair, 'spread1': label1, 'spread2': label2, 'series': key,
+                     'correlation': corr}
+                    for key, corr in cross_results['d_correlations'].items())
+        self._write('cross', pd.DataFrame(rows), ['pair'])
+
+    def read(self, table, **filters):
+        """
+        Read a table, optionally filtered on partition columns.
+
+        Args:
+            table: One of TABLES
+            **filters: Column equality filters, e.g. spread='CL Calendar Spread'
+
+        Returns:
+            DataFrame (empty if the table does not exist)
+        """
+        path = self._table_path(table)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        conditions = [(col, '=', value) for col, value in filters.items()] or None
+        df = pd.read_parquet(path, filters=conditions)
+        for col in ('spread', 'month', 'pair'):
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(str)
+        return df
+
+    def spreads(self):
+        """Labels of all spreads in the store."""
+        df = self.read('stats')
+        return [] if len(df) == 0 else sorted(df['spread'].unique())
+
+    def read_deviations(self, label):
+        """
+        Spread and deviation values of one spread as a date-indexed DataFrame.
+
+        Args:
+            label: Spread label
+
+        Returns:
+            DataFrame with a 'spread_value' column and one d_N column per window
+        """
+        df = self.read('deviations', spread=label)
+        if len(df) == 0:
+            return df
+        df = df.drop(columns=['spread', 'month']).sort_values('date')
+        df.index = pd.Index(df.pop('date').dt.date, name='date')
+        return df
+
+    def load_results(self, label):
+        """
+        Rebuild the analyze_spread_dynamics dictionary of one spread.
+
+        Args:
+            label: Spread label
+
+        Returns:
+            Dictionary with label, spread, stats and deviations, or None
+        """
+        stats = self.read('stats', spread=label)
+        if len(stats) == 0:
+            return None
+        quantiles = self.read('quantiles', spread=label)
+        values = self.read_deviations(label)
+
+        def series_quantiles(series):
+            rows = quantiles[quantiles['series'] == series].sort_values('quantile')
+            return pd.Series(rows['value'].to_numpy(), index=rows['quantile'].to_numpy())
+
+        spread_stats = stats[stats['series'] == 'spread'].iloc[0]
+        results = {
+            'label': label,
+            'spread': values['spread_value'].rename(None),
+            'stats': {key: spread_stats[key] for key in ['mean', 'median', 'std', 'min', 'max']},
+            'deviations': {}
+        }
+        results['stats']['quantiles'] = series_quantiles('spread')
+
+        dev_keys = sorted(stats.loc[stats['series'] != 'spread', 'series'],
+                          key=lambda key: int(key.split('_')[1]))
+        for key in dev_keys:
+            row = stats[stats['series'] == key].iloc[0]
+            results['deviations'][key] = {
+                'values': values[key] if key in values.columns else None,
+                'median': row['median'],
+                'std': row['std'],
+                'quantiles': series_quantiles(key)
+            }
+        return results
+
+    def load_cross_results(self, label1, label2):
+        """
+        Rebuild the analyze_cross_spread_dynamics dictionary of one pair.
+
+        Returns:
+            Dictionary with correlation and d_correlations, or None
+        """
+        df = self.read('cross', pair=f'{label1} | {label2}')
+        if len(df) == 0:
+            return None
+        d_rows = df[df['series'] != 'spread']
+        d_rows = d_rows.iloc[d_rows['series'].map(lambda key: int(key.split('_')[1])).argsort()]
+        return {
+            'correlation': df.loc[df['series'] == 'spread', 'correlation'].iloc[0],
+            'd_correlations': dict(zip(d_rows['series'], d_rows['correlation']))
+        }
@@ -0,0 +1,301 @@
+"""
+Shared rolling-statistics engine for the N-day deviation analysis.
+
+All window sizes are computed from a single cumulative-sum pass over a
+series, matching ``series.rolling(N, min_periods=1).mean()`` (NaNs are
+skipped, a window with no valid values gives NaN). Results are memoized per
+(series, N) so the per-spread and cross-spread analyses share the work; the
+memo keeps the MAX_CACHED_SERIES most recently used series. Entries are
+keyed by the identity of the series object (or an explicit key), so a series
+modified in place after a call returns stale results: pass a new key or call
+clear() after changing it.
+OnlineRollingMean keeps the same statistics up to date in O(1) per new bar.
+
+rolling_comoments does the same for pairs of series: rolling covariance,
+correlation and beta from cumulative sums of x, y, x*x, y*y and x*y, matching
+``x.rolling(N).cov(y)`` and ``x.rolling(N).corr(y)``.
+"""
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Rows per restart of the cumulative sums in rolling_comoments
+COMOMENT_BLOCK = 4096
+MAX_CACHED_SERIES = 8  # Series whose rolling means RollingStatsEngine keeps
+
+
+def rolling_means(values, windows):
+    """
+    Trailing means for several window sizes from one cumulative-sum pass.
+
+    Args:
+        values: 1-D array-like of floats (NaN allowed)
+        windows: Iterable of window sizes
+
+    Returns:
+        Dictionary mapping window size to a NumPy array of rolling means
+    """
+    x = np.asarray(values, dtype='float64')
+    valid = ~np.isnan(x)
+    # Center on the first valid value to limit cancellation in long cumsums
+    offset = x[valid][0] if valid.any() else 0.0
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, x - offset, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+
+    end = np.arange(1, len(x) + 1)
+    means = {}
+    for N in windows:
+        start = np.maximum(end - N, 0)
+        window_count = counts[end] - counts[start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (sums[end] - sums[start]) / window_count + offset
+        mean[window_count == 0] = np.nan
+        means[N] = mean
+    return means
+
+
+def rolling_comoments(x, y, windows, min_periods=None):
+    """
+    Rolling covariance, correlation and beta of two aligned series.
+
+    Only rows where both values are valid enter a window, as in pandas. The
+    cumulative sums are restarted every COMOMENT_BLOCK rows (with enough
+    lookback for the largest window) and centered on a value of that block,
+    so the squared sums stay small and short windows keep their precision.
+
+    Args:
+        x: 1-D array-like of floats (NaN allowed)
+        y: 1-D array-like of floats aligned with x
+        windows: Iterable of window sizes
+        min_periods: Minimum number of joint observations per window
+            (default: the window size, as in pandas)
+
+    Returns:
+        Dictionary mapping window size to a dictionary of NumPy arrays
+        'covariance', 'correlation' and 'beta' (slope of x on y)
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    windows = list(windows)
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    lookback = max(windows) - 1 if windows else 0
+
+    def cumulative(values):
+        return np.concatenate([[0.0], np.cumsum(values)])
+
+    sums = {N: np.full((6, len(x)), np.nan) for N in windows}
+    for block in range(0, len(x), COMOMENT_BLOCK):
+        lo = max(block - lookback, 0)
+        hi = min(block + COMOMENT_BLOCK, len(x))
+        ok = valid[lo:hi]
+        if not ok.any():
+            continue
+        # Center on the block's mean joint value to limit cancellation
+        x0, y0 = x[lo:hi][ok].mean(), y[lo:hi][ok].mean()
+        dx = np.where(ok, x[lo:hi] - x0, 0.0)
+        dy = np.where(ok, y[lo:hi] - y0, 0.0)
+        cums = [cumulative(ok.astype('float64')), cumulative(dx), cumulative(dy),
+                cumulative(dx * dx), cumulative(dy * dy), cumulative(dx * dy)]
+
+        end = np.arange(block, hi) - lo + 1
+        for N in windows:
+            start = np.maximum(end - N, 0)
+            sums[N][:, block:hi] = [c[end] - c[start] for c in cums]
+
+    results = {}
+    for N in windows:
+        n, wx, wy, wxx, wyy, wxy = sums[N]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (wxy - wx * wy / n) / (n - 1)
+            var_x = (wxx - wx * wx / n) / (n - 1)
+            var_y = (wyy - wy * wy / n) / (n - 1)
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+            beta = cov / var_y
+
+        too_few = ~(n >= max(min_periods if min_periods is not None else N, 2))
+        cov[too_few] = np.nan
+        corr[too_few | ~(var_x > 0) | ~(var_y > 0)] = np.nan
+        beta[too_few | ~(var_y > 0)] = np.nan
+        results[N] = {'covariance': cov, 'correlation': corr, 'beta': beta}
+    return results
+
+
+class RollingStatsEngine:
+    """Memoized rolling means and deviations for a fixed set of window sizes."""
+
+    def __init__(self, windows, max_series=MAX_CACHED_SERIES):
+        """
+        Args:
+            windows: List of rolling window sizes (e.g. ROLLING_WINDOWS)
+            max_series: Number of most recently used series kept in the memo
+        """
+        self.windows = list(windows)
+        self.max_series = max_series
+        self._cache = OrderedDict()
+
+    def _entry(self, series, key):
+        key = id(series) if key is None else key
+        entry = self._cache.get(key)
+        # id() values can be reused after a series is freed, so check identity
+        if entry is None or entry[0] is not series:
+            entry = (series, {})
+            self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_series:
+            self._cache.popitem(last=False)
+        return entry[1]
+
+    def rolling_means(self, series, key=None, windows=None):
+        """
+        Rolling means of a series for every requested window size.
+
+        Args:
+            series: Series of values
+            key: Optional cache key (defaults to the identity of series)
+            windows: Window sizes to return (defaults to the engine's windows)
+
+        Returns:
+            Dictionary mapping window size to Series of rolling means
+        """
+        windows = self.windows if windows is None else list(windows)
+        memo = self._entry(series, key)
+        todo = [N for N in windows if N not in memo]
+        if todo:
+            for N, mean in rolling_means(series.to_numpy(dtype='float64', na_value=np.nan), todo).items():
+                memo[N] = pd.Series(mean, index=series.index, name=series.name)
+        return {N: memo[N] for N in windows}
+
+    def rolling_mean(self, series, N, key=None):
+        """Rolling mean of a series for one window size."""
+        return self.rolling_means(series, key=key, windows=[N])[N]
+
+    def deviations(self, series, key=None, windows=None):
+        """
+        Deviations d_N = series - rolling mean for every requested window size.
+
+        Args:
+            series: Series of values
+            key: Optional cache key (defaults to the identity of series)
+            windows: Window sizes to return (defaults to the engine's windows)
+
+        Returns:
+            Dictionary mapping window size to Series of deviations
+        """
+        return {N: series - mean for N, mean in self.rolling_means(series, key=key, windows=windows).items()}
+
+    def rolling_pair(self, series1, series2, windows=None, min_periods=None):
+        """
+        Rolling covariance, correlation and beta of two series.
+
+        Args:
+            series1: First series (x)
+            series2: Second series (y); aligned with series1 on the index
+            windows: Window sizes to return (defaults to the engine's windows)
+            min_periods: Minimum joint observations per window (default: N)
+
+        Returns:
+            Dictionary mapping window size to a DataFrame with 'covariance',
+            'correlation' and 'beta' (hedge ratio of series1 on series2) columns
+        """
+        windows = self.windows if windows is None else list(windows)
+        aligned = pd.concat([series1, series2], axis=1, keys=['x', 'y'])
+        stats = rolling_comoments(aligned['x'].to_numpy(dtype='float64', na_value=np.nan),
+                                  aligned['y'].to_numpy(dtype='float64', na_value=np.nan),
+                                  windows, min_periods=min_periods)
+        return {N: pd.DataFrame(stats[N], index=aligned.index) for N in windows}
+
+    def clear(self):
+        """Drop all memoized results."""
+        self._cache = OrderedDict()
+
+
+class OnlineRollingMean:
+    """Trailing means for several window sizes, updated in O(1) per value."""
+
+    # Running sums are recomputed from the buffer this often to stop drift
+    RESYNC_EVERY = 1000000
+
+    def __init__(self, windows, shape=()):
+        """
+        Args:
+            windows: List of rolling window sizes
+            shape: Shape of each value, e.g. (n_spreads,) to track several
+                series side by side (default: scalar values)
+        """
+        self.windows = list(windows)
+        self.size = max(self.windows)
+        self.shape = tuple(shape)
+        self._buffer = np.full((self.size,) + self.shape, np.nan)
+        self._sums = np.zeros((len(self.windows),) + self.shape)
+        self._counts = np.zeros((len(self.windows),) + self.shape, dtype='int64')
+        self.n = 0
+
+    @classmethod
+    def from_history(cls, windows, values):
+        """Create an instance warmed up with the tail of a history of values (rows for vector values)."""
+        values = np.asarray(values, dtype='float64')
+        online = cls(windows, shape=values.shape[1:])
+        for x in values[-online.size:]:
+            online.update(x)
+        return online
+
+    def update(self, x):
+        """
+        Add a new value.
+
+        Args:
+            x: New value, or array of self.shape (NaN is skipped in the means,
+                as in pandas rolling)
+
+        Returns:
+            NumPy array of rolling means, one per window size (leading axis)
+        """
+        x = np.asarray(x, dtype='float64')
+        valid = ~np.isnan(x)
+        # All windows at once: the value leaving each full window is subtracted
+        windows = np.asarray(self.windows)
+        leaving = self._buffer[(self.n - windows) % self.size]
+        left = ~np.isnan(leaving) & (self.n >= windows).reshape((-1,) + (1,) * len(self.shape))
+        self._sums += np.where(valid, x, 0.0) - np.where(left, leaving, 0.0)
+        self._counts += valid.astype('int64') - left
+        self._buffer[self.n % self.size] = x
+        self.n += 1
+        if self.n % self.RESYNC_EVERY == 0:
+            self._resync()
+        return self.means()
+
+    def replace(self, x):
+        """
+        Replace the most recent value, e.g. with a revised close of the current bar.
+
+        Args:
+            x: New value, or array of self.shape
+
+        Returns:
+            NumPy array of rolling means, one per window size (leading axis)
+        """
+        if self.n == 0:
+            return self.update(x)
+        x = np.asarray(x, dtype='float64')
+        position = (self.n - 1) % self.size
+        last = np.array(self._buffer[position])
+        # The most recent value is in every window
+        self._sums += np.where(~np.isnan(x), x, 0.0) - np.where(~np.isnan(last), last, 0.0)
+        self._counts += (~np.isnan(x)).astype('int64') - (~np.isnan(last))
+        self._buffer[position] = x
+        return self.means()
+
+    def _resync(self):
+        """Recompute the running sums and counts exactly from the buffer."""
+        for i, N in enumerate(self.windows):
+            window = self._buffer[(self.n - 1 - np.arange(min(N, self.n))) % self.size]
+            self._sums[i] = np.nansum(window, axis=0)
+            self._counts[i] = (~np.isnan(window)).sum(axis=0)
+
+    def means(self):
+        """Current rolling means, one per window size (NaN if the window is empty)."""
+        return np.divide(self._sums, self._counts, out=np.full(self._sums.shape, np.nan), where=self._counts > 0)
+
+    def deviations(self, x):
+        """Add a new value and return the deviations x - mean per window size."""
+        return x - self.update(x)
@@ -0,0 +1,149 @@
+"""
+Streaming ingestion of futures bars.
+
+Query results are read in chunks (server-side cursor on WRDS, chunked cursor
+on the local stand-ins) and each chunk is coerced to fixed dtypes. A
+ContractStreamAccumulator folds the chunks into per-contract row counts and
+daily closes, so contract selection and spread construction never need the
+full result set in memory.
+"""
+import pandas as pd
+
+# Fixed dtypes of streamed chunks, so every chunk has the same schema
+BAR_DTYPES = {
+    'futcode': 'int64',
+    'contrcode': 'int64',
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'float64',
+    'openinterest': 'float64'
+}
+BAR_DATE_COLUMNS = ['date', 'lasttrddate', 'expirationdate', 'startdate']
+# Contract info kept per futcode by ContractStreamAccumulator (roll dates for the calendar)
+STREAM_META_COLUMNS = ['dsmnem', 'lasttrddate', 'expirationdate']
+
+
+def coerce_chunk(chunk):
+    """
+    Rename query columns and cast a chunk to the fixed streaming dtypes.
+
+    Args:
+        chunk: DataFrame chunk returned by the futures query
+
+    Returns:
+        DataFrame with consistent column names and dtypes
+    """
+    chunk = chunk.rename(columns={'date_': 'date', 'open_': 'open'})
+    for col in BAR_DATE_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = pd.to_datetime(chunk[col])
+    for col, dtype in BAR_DTYPES.items():
+        if col in chunk.columns:
+            chunk[col] = pd.to_numeric(chunk[col]).astype(dtype)
+    return chunk
+
+
+def iter_query(db, query, chunksize):
+    """
+    Run a query and yield its result in chunks.
+
+    On a wrds.Connection a dedicated connection with a server-side cursor
+    (stream_results) is used, so rows are only transferred as chunks are
+    consumed; other connections use their raw_sql iterator.
+
+    Args:
+        db: wrds.Connection or a local stand-in with a wrds-style raw_sql
+        query: SQL query string
+        chunksize: Number of rows per chunk
+
+    Yields:
+        DataFrame chunks
+    """
+    engine = getattr(db, 'engine', None)
+    if engine is None:
+        yield from db.raw_sql(query, chunksize=chunksize, return_iter=True)
+        return
+
+    import sqlalchemy as sa
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        yield from pd.read_sql_query(sa.text(query), conn, chunksize=chunksize)
+
+
+class ContractStreamAccumulator:
+    """Folds streamed chunks into per-contract counts and daily closes."""
+
+    def __init__(self):
+        self.rows = 0
+        self.first_date = None
+        self.counts = pd.Series(dtype='int64')
+        self.meta = pd.DataFrame(columns=STREAM_META_COLUMNS)
+        self._closes = {}
+        self._series = {}
+
+    def update(self, chunk):
+        """
+        Add one chunk of bars.
+
+        Args:
+            chunk: DataFrame chunk with futcode, date, close and contract info
+        """
+        if len(chunk) == 0:
+            return
+        self.rows += len(chunk)
+        self._series = {}
+        chunk_first = chunk['date'].min()
+        if self.first_date is None or chunk_first < self.first_date:
+            self.first_date = chunk_first
+
+        self.counts = self.counts.add(chunk.groupby('futcode')['date'].count(), fill_value=0).astype('int64')
+
+        new_meta = chunk.groupby('futcode')[[col for col in STREAM_META_COLUMNS if col in chunk.columns]].first()
+        new_meta = new_meta[~new_meta.index.isin(self.meta.index)]
+        if len(new_meta) > 0:
+            self.meta = pd.concat([self.meta, new_meta]) if len(self.meta) > 0 else new_meta
+
+        # Keep only the last close per (futcode, day) of this chunk
+        daily = chunk[['futcode', 'date', 'close']].copy()
+        daily['date'] = daily['date'].dt.normalize()
+        daily = daily.groupby(['futcode', 'date'], sort=False)['close'].last()
+        for futcode, closes in daily.groupby(level='futcode', sort=False):
+            self._closes.setdefault(futcode, []).append(closes.droplevel('futcode'))
+
+    def __len__(self):
+        return self.rows
+
+    def consume(self, chunks):
+        """Add every chunk of an iterator; returns self for chaining."""
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def contract_counts(self):
+        """Row count, symbol, last trade and expiration date per futcode (unsorted)."""
+        counts = self.counts.rename('count').to_frame()
+        return counts.join(self.meta)
+
+    def contract_series(self, futcode):
+        """
+        Daily close series of one contract, last close of each day.
+
+        Args:
+            futcode: Futcode of the contract
+
+        Returns:
+            Series indexed by date objects, or None if the contract never appeared
+        """
+        if futcode not in self._closes:
+            return None
+        if futcode not in self._series:
+            closes = pd.concat(self._closes[futcode])
+            closes = closes[~closes.index.duplicated(keep='last')].sort_index()
+            # Compact the per-chunk pieces into one series
+            self._closes[futcode] = [closes]
+            series = closes.rename('close')
+            series.index = closes.index.date
+            self._series[futcode] = series
+        return self._series[futcode]
@@ -0,0 +1,326 @@
+"""
+Synthetic multi-contract futures bars shaped like the tr_ds_fut tables.
+
+SyntheticFutures generates a contract schedule (monthly or quarterly expiry
+cycles, Datastream-style mnemonics such as CLF6 or ZTZ5) and daily or minute
+bars for every listed contract. All contracts of a ticker follow one random
+walk plus a carry term that shrinks towards expiry, so calendar spreads
+behave like real ones. Daily bars (settlements) exist for every listed
+contract; intraday, deferred contracts print bars only sporadically: the
+contract of rank r (0 = nearest expiry) trades in a bar interval with
+probability activity * decay**r, which reproduces sparse contracts like
+ZTZ5 next to a dense front month.
+
+Bars are produced trade date by trade date from per-ticker random
+generators, so the data does not depend on the chunk size and any scale
+from a few thousand to billions of rows can be streamed into a local
+database with write (see datasources.write_tables).
+
+Usage:
+    python synthetic.py local_wrds.db --rows 1e6 --freq 1m
+"""
+import sys
+import math
+import argparse
+import numpy as np
+import pandas as pd
+
+from datasources import write_tables
+from intraday import SESSION_CALENDARS, bar_step
+
+MONTH_CODES = 'FGHJKMNQUVXZ'
+
+# Per-ticker generator parameters:
+#   price: starting price level; vol: return volatility per minute
+#   carry: price difference per month to expiry; tick: price increment
+#   cycle: contract months ('monthly' or 'quarterly'); listed: contracts traded at once
+#   activity, decay: bar probability of the front contract, decay per rank
+#   volume: mean volume per front-month bar
+TICKER_PROFILES = {
+    'CL': dict(contrcode=1986, name='Light Sweet Crude Oil', price=60.0, vol=0.0006, carry=0.25,
+               tick=0.01, cycle='monthly', listed=6, activity=0.95, decay=0.5, volume=300,
+               session='cme_energy'),
+    'HO': dict(contrcode=2029, name='NY Harbor ULSD', price=2.3, vol=0.0007, carry=0.01,
+               tick=0.0001, cycle='monthly', listed=4, activity=0.8, decay=0.4, volume=60,
+               session='cme_energy'),
+    'YM': dict(contrcode=4712, name='Micro E-Mini Dow Jones', price=47000.0, vol=0.0003, carry=150.0,
+               tick=1.0, cycle='quarterly', listed=3, activity=0.9, decay=0.1, volume=200,
+               session='cme_equity'),
+    'RTY': dict(contrcode=4396, name='E-Mini Russell 2000', price=2500.0, vol=0.0004, carry=12.0,
+                tick=0.1, cycle='quarterly', listed=3, activity=0.85, decay=0.1, volume=100,
+                session='cme_equity'),
+    # Thinly traded 2-year note: deferred months (e.g. ZTZ5) print few bars.
+    # The contract code is a placeholder, not a Datastream code.
+    'ZT': dict(contrcode=90001, name='2-Year T-Note', price=104.0, vol=0.00005, carry=0.05,
+               tick=0.0078125, cycle='quarterly', listed=3, activity=0.3, decay=0.05, volume=40,
+               session='cme_equity')
+}
+
+# Offsets of the contract codes of replicated tickers (copies > 1)
+COPY_CODE_OFFSET = 100000
+
+
+def _third_friday(month):
+    """Third Friday of the month of a Timestamp."""
+    first = month.replace(day=1)
+    return first + pd.Timedelta(days=(4 - first.weekday()) % 7 + 14)
+
+
+def _last_trade_date(month, cycle):
+    """Last trade date of the contract month (quarterly: third Friday; monthly: CL-style)."""
+    if cycle == 'quarterly':
+        return _third_friday(month)
+    # Three business days before the 25th of the previous month
+    previous = month - pd.DateOffset(months=1)
+    return pd.Timestamp(previous.year, previous.month, 25) - pd.offsets.BDay(3)
+
+
+class SyntheticFutures:
+    """Generator of synthetic contract info and bars for several tickers."""
+
+    def __init__(self, tickers=None, start_date='2025-09-01', end_date='2025-12-31', freq='1m',
+                 copies=1, max_rows=None, seed=0):
+        """
+        Args:
+            tickers: Ticker names from TICKER_PROFILES (default: all)
+            start_date: First trade date
+            end_date: Last trade date
+            freq: Bar frequency ('1d' for daily bars, or an intraday frequency
+                of intraday.BAR_FREQS such as '1m')
+            copies: Number of replicas of each ticker (with distinct contract
+                codes), to scale the row count without lengthening the history
+            max_rows: Optional cap on the number of generated bars
+            seed: Random seed
+        """
+        self.tickers = list(tickers) if tickers else list(TICKER_PROFILES)
+        self.start_date = pd.Timestamp(start_date)
+        self.end_date = pd.Timestamp(end_date)
+        self.freq = freq
+        self.copies = copies
+        self.max_rows = max_rows
+        self.seed = seed
+        self.contracts = self._schedule()
+
+    @classmethod
+    def for_rows(cls, rows, freq='1m', tickers=None, start_date='2025-09-01', max_days=1300, seed=0):
+        """
+        Generator sized for a target number of bars.
+
+        The history is lengthened up to max_days trade dates; beyond that the
+        tickers are replicated. Generation stops at exactly rows bars.
+
+        Args:
+            rows: Target number of bars (1e3 to 1e9 and beyond)
+            freq: Bar frequency
+            tickers: Ticker names from TICKER_PROFILES (default: all)
+            start_date: First trade date
+            max_days: Maximum number of trade dates
+            seed: Random seed
+
+        Returns:
+            SyntheticFutures
+        """
+        rows = int(rows)
+        probe = cls(tickers, start_date, start_date, freq, seed=seed)
+        per_day = max(probe.rows_per_day(), 1.0)
+        days = math.ceil(rows / per_day)
+        copies = max(1, math.ceil(days / max_days))
+        days = max(1, math.ceil(rows / (per_day * copies)))
+        # Margin for the randomness of the sparse contracts
+        days = math.ceil(days * 1.05) + 1
+        end_date = pd.bdate_range(start_date, periods=days)[-1]
+        return cls(tickers, start_date, end_date, freq, copies=copies, max_rows=rows, seed=seed)
+
+    def _profiles(self):
+        """(ticker name, profile) of every generated ticker, including replicas."""
+        profiles = []
+        for copy in range(self.copies):
+            for ticker in self.tickers:
+                profile = dict(TICKER_PROFILES[ticker])
+                profile['contrcode'] += copy * COPY_CODE_OFFSET
+                profiles.append((ticker if copy == 0 else f'{ticker}{copy}', profile))
+        return profiles
+
+    def _schedule(self):
+        """Contract info rows of all contracts listed during the date range."""
+        rows = []
+        futcode = 1
+        for ticker, profile in self._profiles():
+            step = 3 if profile['cycle'] == 'quarterly' else 1
+            months = pd.date_range(self.start_date.replace(day=1),
+                                   self.end_date + pd.DateOffset(months=step * profile['listed'] + 2), freq='MS')
+            if step > 1:
+                months = months[months.month % 3 == 0]
+            for month in months:
+                last = _last_trade_date(month, profile['cycle'])
+                if last < self.start_date:
+                    continue
+                rows.append({
+                    'futcode': futcode,
+                    'contrcode': profile['contrcode'],
+                    'dsmnem': f"{ticker}{MONTH_CODES[month.month - 1]}{month.year % 10}",
+                    'contrname': f"{profile['name']} {month.strftime('%b %Y')}",
+                    'lasttrddate': last,
+                    'expirationdate': last,
+                    'startdate': last - pd.DateOffset(years=2),
+                    'ticker': ticker
+                })
+                futcode += 1
+        return pd.DataFrame(rows)
+
+    def contract_info(self):
+        """Contract table shaped like tr_ds_fut.wrds_contract_info."""
+        return self.contracts.drop(columns='ticker')
+
+    def _bar_times(self, calendar, date):
+        """Bar timestamps of one trade date."""
+        if self.freq == '1d':
+            return pd.DatetimeIndex([date])
+        return calendar.grid(date, date, self.freq)
+
+    def _activity(self, profile, rank):
+        """Probability that the contract of a rank prints a bar (daily settlements always exist)."""
+        return 1.0 if self.freq == '1d' else profile['activity'] * profile['decay'] ** rank
+
+    def rows_per_day(self):
+        """Expected number of bars per trade date over all tickers."""
+        total = 0.0
+        date = pd.bdate_range(self.start_date, periods=1)[0]
+        for _, profile in self._profiles():
+            bars = len(self._bar_times(SESSION_CALENDARS[profile['session']], date))
+            total += bars * sum(self._activity(profile, rank) for rank in range(profile['listed']))
+        return total
+
+    def estimate_rows(self):
+        """Expected number of bars over the date range (before max_rows)."""
+        days = len(pd.bdate_range(self.start_date, self.end_date))
+        estimate = int(self.rows_per_day() * days)
+        return min(estimate, self.max_rows) if self.max_rows else estimate
+
+    def _ticker_day(self, ticker, profile, contracts, calendar, date, state, rng):
+        """Bars of the listed contracts of one ticker on one trade date."""
+        times = self._bar_times(calendar, date)
+        listed = contracts[contracts['lasttrddate'] >= date].head(profile['listed'])
+        if len(times) == 0 or len(listed) == 0:
+            return None
+
+        # Common random walk of the ticker (log price), carried across days
+        minutes = 390.0 if self.freq == '1d' else bar_step(self.freq).total_seconds() / 60.0
+        steps = rng.standard_normal(len(times)) * profile['vol'] * math.sqrt(minutes)
+        path = state.get(ticker, 0.0) + np.cumsum(steps)
+        state[ticker] = path[-1]
+        base = profile['price'] * np.exp(path)
+
+        frames = []
+        for rank, contract in enumerate(listed.itertuples()):
+            traded = rng.random(len(times)) < self._activity(profile, rank)
+            n = int(traded.sum())
+            if n == 0:
+                continue
+            months_out = (contract.lasttrddate - date).days / 30.0
+            noise = rng.standard_normal(n) * profile['price'] * profile['vol'] * 0.5
+            close = base[traded] + profile['carry'] * months_out + noise
+            open_ = close - rng.standard_normal(n) * profile['price'] * profile['vol']
+            wick = np.abs(rng.standard_normal((2, n))) * profile['price'] * profile['vol']
+            tick = profile['tick']
+            frames.append(pd.DataFrame({
+                'futcode': contract.futcode,
+                'date_': times[traded],
+                'open_': np.round(open_ / tick) * tick,
+                'high': np.round((np.maximum(open_, close) + wick[0]) / tick) * tick,
+                'low': np.round((np.minimum(open_, close) - wick[1]) / tick) * tick,
+                'settlement': np.round(close / tick) * tick,
+                'volume': rng.poisson(profile['volume'] * profile['decay'] ** rank, n) + 1.0,
+                'openinterest': float(round(1e5 * profile['decay'] ** rank))
+            }))
+        return pd.concat(frames) if frames else None
+
+    def iter_bars(self, chunk_rows=1000000):
+        """
+        Generate bars in chunks of about chunk_rows rows.
+
+        Args:
+            chunk_rows: Rows per yielded chunk (whole trade dates are kept together)
+
+        Yields:
+            DataFrames shaped like tr_ds_fut.wrds_fut_contract, sorted by date
+        """
+        profiles = self._profiles()
+        by_ticker = {ticker: group.sort_values('lasttrddate')
+                     for ticker, group in self.contracts.groupby('ticker', sort=False)}
+        rngs = {ticker: np.random.default_rng([self.seed, i]) for i, (ticker, _) in enumerate(profiles)}
+        state = {}
+        pending, pending_rows, total = [], 0, 0
+
+        for date in pd.bdate_range(self.start_date, self.end_date):
+            for ticker, profile in profiles:
+                bars = self._ticker_day(ticker, profile, by_ticker[ticker],
+                                        SESSION_CALENDARS[profile['session']], date, state, rngs[ticker])
+                if bars is not None:
+                    pending.append(bars)
+                    pending_rows += len(bars)
+
+            if self.max_rows and total + pending_rows >= self.max_rows:
+                chunk = pd.concat(pending).sort_values('date_', kind='stable')
+                yield chunk.head(self.max_rows - total).reset_index(drop=True)
+                return
+            if pending_rows >= chunk_rows:
+                yield pd.concat(pending).sort_values('date_', kind='stable').reset_index(drop=True)
+                total += pending_rows
+                pending, pending_rows = [], 0
+
+        if pending:
+            yield pd.concat(pending).sort_values('date_', kind='stable').reset_index(drop=True)
+
+    def bars(self):
+        """All bars in one DataFrame (for small sizes)."""
+        chunks = list(self.iter_bars())
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    def write(self, path, chunk_rows=1000000):
+        """
+        Stream the contract info and bars into a local SQLite or DuckDB file.
+
+        Args:
+            path: Database file ('.duckdb' or '.ddb' for DuckDB, else SQLite)
+            chunk_rows: Rows per write
+
+        Returns:
+            Number of bars written
+        """
+        intraday = self.freq != '1d'
+        write_tables(path, self.contract_info(), None)
+        total = 0
+        for i, chunk in enumerate(self.iter_bars(chunk_rows)):
+            write_tables(path, None, chunk, if_exists='replace' if i == 0 else 'append', intraday=intraday)
+            total += len(chunk)
+            print(f"  Wrote {total:,} bars (through {chunk['date_'].iloc[-1]})")
+        return total
+
+
+def main(argv=None):
+    """Command-line entry point: write a synthetic tr_ds_fut database."""
+    parser = argparse.ArgumentParser(description="Write synthetic tr_ds_fut tables to a local database")
+    parser.add_argument('path', help="Output file (.duckdb/.ddb for DuckDB, otherwise SQLite)")
+    parser.add_argument('--rows', type=float, help="Target number of bars (overrides --end)")
+    parser.add_argument('--freq', default='1m', help="Bar frequency ('1d' or e.g. '1m', '5m')")
+    parser.add_argument('--start', default='2025-09-01', help="First trade date")
+    parser.add_argument('--end', default='2025-12-31', help="Last trade date")
+    parser.add_argument('--tickers', default=','.join(TICKER_PROFILES), help="Comma-separated tickers")
+    parser.add_argument('--chunk-rows', type=int, default=1000000, help="Rows per write")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers.split(',')
+    if args.rows:
+        generator = SyntheticFutures.for_rows(args.rows, args.freq, tickers, args.start, seed=args.seed)
+    else:
+        generator = SyntheticFutures(tickers, args.start, args.end, args.freq, seed=args.seed)
+    print(f"Generating ~{generator.estimate_rows():,} {args.freq} bars for {len(generator.contracts)} contracts "
+          f"({generator.start_date.date()} to {generator.end_date.date()}, {generator.copies} copies)")
+    total = generator.write(args.path, args.chunk_rows)
+    print(f"Saved: {args.path} ({total:,} bars)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,101 @@
+"""
+Shared fixtures of the offline test suite.
+
+The test_wrds*.py and test_data_check.py scripts explore the live WRDS
+database when imported and are not collected. The tests run the analyzer on
+a SQLite stand-in of tr_ds_fut written by synthetic.py and compare each
+optimized path with the plain pandas computation.
+
+Run from hw1/:
+    python -m pytest tests
+"""
+import os
+import sys
+import pytest
+
+HW1_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HW1_DIR)
+
+from synthetic import SyntheticFutures
+from datasources import SQLiteConnection
+
+collect_ignore_glob = ['test_wrds*.py', 'test_data_check.py']
+
+START_DATE = '2025-06-02'
+END_DATE = '2025-12-31'
+TICKERS = ['CL', 'HO', 'YM', 'RTY']
+
+
+class CountingConnection(SQLiteConnection):
+    """SQLite stand-in that counts its queries."""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self.queries = []
+
+    def raw_sql(self, sql, *args, **kwargs):
+        self.queries.append(sql)
+        return super().raw_sql(sql, *args, **kwargs)
+
+
+@pytest.fixture(scope='session')
+def daily_db(tmp_path_factory):
+    """Path of a SQLite database with synthetic daily bars of TICKERS."""
+    path = str(tmp_path_factory.mktemp('db') / 'daily.db')
+    SyntheticFutures(TICKERS, START_DATE, END_DATE, freq='1d').write(path)
+    return path
+
+
+@pytest.fixture(scope='session')
+def minute_db(tmp_path_factory):
+    """Path of a SQLite database with a few weeks of synthetic minute bars."""
+    path = str(tmp_path_factory.mktemp('db') / 'minute.db')
+    SyntheticFutures(['CL', 'YM'], '2025-11-03', '2025-11-21', freq='1m').write(path)
+    return path
+
+
+@pytest.fixture
+def make_analyzer(daily_db):
+    """Factory of analyzers on the daily database (or the given SQLite file or source; metrics off)."""
+    from main import FuturesSpreadAnalyzer
+
+    analyzers = []
+
+    def make(db_path=None, **kwargs):
+        kwargs.setdefault('start_date', START_DATE)
+        kwargs.setdefault('end_date', END_DATE)
+        kwargs.setdefault('metrics', False)
+        if 'db' not in kwargs and 'db_factory' not in kwargs:
+            kwargs.setdefault('source', f'sqlite:{db_path or daily_db}')
+        analyzer = FuturesSpreadAnalyzer(None, None, **kwargs)
+        analyzers.append(analyzer)
+        return analyzer
+
+    yield make
+    for analyzer in analyzers:
+        analyzer.close()
+
+
+def build_spread(analyzer, ticker, start_date=START_DATE, end_date=END_DATE):
+    """Calendar spread (second - front month) of a ticker, built the plain pandas way."""
+    data = analyzer.download_futures_data(ticker, start_date, end_date)
+    front, second = analyzer.identify_top_contracts(data, n_contracts=2)
+    return analyzer.calculate_calendar_spread(
+        analyzer.prepare_contract_data(data, second, start_date=start_date, end_date=end_date),
+        analyzer.prepare_contract_data(data, front, start_date=start_date, end_date=end_date))
+
+
+@pytest.fixture
+def cli(daily_db, tmp_path, monkeypatch):
+    """main.main run in a temporary directory against the daily database (returns main)."""
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'DATA_SOURCE', f'sqlite:{daily_db}')
+    monkeypatch.setattr(main, 'START_DATE', START_DATE)
+    monkeypatch.setattr(main, 'END_DATE', END_DATE)
+    monkeypatch.setattr(main, 'CACHE_DIR', 'cache')
+    monkeypatch.setattr(main, 'RESULTS_DIR', os.path.join('output', 'results'))
+    monkeypatch.setattr(main, 'STATE_DIR', os.path.join('output', 'state'))
+    monkeypatch.setattr(main, 'METRICS_PATH', '')
+    return main
@@ -0,0 +1,62 @@
+"""(futcode, date) index lookups versus boolean masks over the frame."""
+import gc
+import weakref
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE
+from bar_index import ContractIndex
+
+
+@pytest.fixture
+def df(make_analyzer):
+    df = make_analyzer().download_futures_data('CL', START_DATE, END_DATE)
+    # Shuffle so the index has to sort
+    return df.sample(frac=1.0, random_state=0)
+
+
+def masked(df, futcode, start=None, end=None):
+    dates = pd.to_datetime(df['date'])
+    keep = df['futcode'] == futcode
+    if start is not None:
+        keep &= dates >= pd.Timestamp(start)
+    if end is not None:
+        keep &= dates < pd.Timestamp(end)
+    return df[keep].sort_values('date', kind='stable')
+
+
+@pytest.mark.parametrize('window', [(None, None), ('2025-08-01', None), (None, '2025-10-01'),
+                                    ('2025-09-03', '2025-09-10'), ('2027-01-01', None)])
+def test_rows_match_boolean_mask(df, window):
+    index = ContractIndex(df)
+    for futcode in df['futcode'].unique():
+        pd.testing.assert_frame_equal(index.rows(df, futcode, *window), masked(df, futcode, *window))
+
+        expected = masked(df, futcode, *window)
+        series = index.contract_series(df, futcode, *window)
+        if len(expected) == 0:
+            assert series is None
+        else:
+            assert list(series.index) == list(pd.to_datetime(expected['date']).dt.date)
+            assert list(series) == list(expected['close'])
+
+
+def test_unknown_futcode_has_no_rows(df):
+    index = ContractIndex(df)
+    assert len(index.rows(df, -1)) == 0
+    assert index.contract_series(df, -1) is None
+
+
+def test_analyzer_reuses_the_index_without_keeping_the_frame(make_analyzer, df):
+    analyzer = make_analyzer()
+    index = analyzer.index_futures_data(df)
+    assert analyzer.index_futures_data(df) is index
+    assert analyzer.index_futures_data(df.copy()) is not index
+
+    frame = df.copy()
+    analyzer.index_futures_data(frame)
+    ref = weakref.ref(frame)
+    del frame
+    gc.collect()
+    assert ref() is None
+    assert len(analyzer._indexes) == 1
@@ -0,0 +1,73 @@
+"""ContractBars and BarStore versus the downloaded DataFrame."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE
+from bars import ContractBars
+from bar_store import BarStore
+
+
+@pytest.fixture
+def analyzer(make_analyzer):
+    return make_analyzer()
+
+
+@pytest.fixture
+def df(analyzer):
+    return analyzer.download_futures_data('CL', START_DATE, END_DATE)
+
+
+def prepared(analyzer, data, futcodes):
+    return [analyzer.prepare_contract_data(data, futcode) for futcode in futcodes]
+
+
+def test_contract_bars_round_trip(df):
+    bars = ContractBars.from_frame(df)
+    frame = bars.frame()
+    expected = df.sort_values('date', kind='stable').reset_index(drop=True)
+
+    assert len(bars) == len(df)
+    assert bars.memory_usage() < df.memory_usage(deep=True).sum()
+    for col in ['futcode', 'dsmnem', 'lasttrddate']:
+        assert list(frame[col].astype(str)) == list(expected[col].astype(str))
+    np.testing.assert_array_equal(frame['close'], expected['close'])
+    np.testing.assert_allclose(frame['volume'], expected['volume'], rtol=1e-6)
+
+
+@pytest.mark.parametrize('compact', ['contract_bars', 'bar_store'])
+def test_compact_inputs_match_the_frame(analyzer, df, tmp_path, compact):
+    if compact == 'contract_bars':
+        data = analyzer.compact_futures_data(df)
+    else:
+        data = analyzer.write_bar_store(df, str(tmp_path / 'bars'))
+
+    futcodes = analyzer.identify_top_contracts(df, n_contracts=2)
+    assert analyzer.identify_top_contracts(data, n_contracts=2) == futcodes
+    for closes, expected in zip(prepared(analyzer, data, futcodes), prepared(analyzer, df, futcodes)):
+        pd.testing.assert_series_equal(closes, expected, check_names=False)
+
+    calendar = analyzer.build_contract_calendar(data)
+    np.testing.assert_array_equal(calendar.futcodes, analyzer.build_contract_calendar(df).futcodes)
+
+
+def test_bar_store_appends_match_one_write(df, tmp_path):
+    dates = pd.to_datetime(df['date'])
+    first, second = df[dates < '2025-09-01'], df[dates >= '2025-08-15']
+
+    store = BarStore(str(tmp_path / 'split'))
+    store.append(first)
+    # Overlapping rows at or before each contract's last stored date are skipped
+    assert store.append(second) == int((dates >= '2025-09-01').sum())
+    assert store.append(second) == 0
+
+    reopened = BarStore(str(tmp_path / 'split'))
+    whole = BarStore(str(tmp_path / 'whole'))
+    whole.append(df)
+    assert len(reopened) == len(whole) == len(df)
+    pd.testing.assert_frame_equal(reopened.contract_counts(), whole.contract_counts(), check_dtype=False,
+                                  check_categorical=False)
+    for futcode in df['futcode'].unique():
+        pd.testing.assert_series_equal(reopened.contract_series(futcode), whole.contract_series(futcode))
+        expected = ContractBars.from_frame(df).contract_series(futcode)
+        pd.testing.assert_series_equal(whole.contract_series(futcode), expected)
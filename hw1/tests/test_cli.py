@@ -0,0 +1,110 @@
+"""Command-line steps run against the SQLite stand-in."""
+import os
+import sys
+import json
+import subprocess
+import pytest
+
+from conftest import HW1_DIR, START_DATE
+from results_store import ResultsStore
+
+FIGURES = ['spreads_timeseries.png', 'spreads_distribution.png', 'spread1_deviations.png',
+           'spread2_deviations.png', 'spreads_scatter.png']
+
+
+def no_database(monkeypatch, cli):
+    """Make any connection attempt fail the test."""
+    def factory(spec, latency=0.0):
+        def connect():
+            raise AssertionError(f"unexpected database connection to {spec}")
+        return connect
+    monkeypatch.setattr(cli, 'source_factory', factory)
+
+
+def read_report():
+    with open(os.path.join('output', 'analysis_report.txt')) as f:
+        return f.read()
+
+
+def outputs():
+    return sorted(os.listdir('output')) if os.path.exists('output') else []
+
+
+def test_fetch_fills_the_cache_only(cli, monkeypatch, capsys):
+    cli.main(['fetch'])
+    assert os.path.exists(os.path.join('cache', 'manifest.json'))
+    assert not any(name.endswith(('.png', '.txt')) for name in outputs())
+
+    # The second fetch is served from the cache
+    capsys.readouterr()
+    no_database(monkeypatch, cli)
+    cli.main(['fetch'])
+    out = capsys.readouterr().out
+    assert all(f"Cache: hit for {ticker}" in out for ticker in cli.TICKERS)
+    assert 'Error' not in out
+
+
+def test_analyze_then_report_and_plot_from_the_store(cli, monkeypatch):
+    cli.main(['analyze'])
+    store = ResultsStore(cli.RESULTS_DIR)
+    assert all(store.load_results(label) is not None for label in cli.SPREAD_LABELS)
+    assert store.load_cross_results(*cli.CROSS_LABELS) is not None
+    assert 'analysis_report.txt' not in outputs() and not set(FIGURES) & set(outputs())
+
+    no_database(monkeypatch, cli)
+    cli.main(['report'])
+    report = read_report()
+    assert f"Analysis Period: {START_DATE} to {cli.END_DATE}" in report
+    assert not set(FIGURES) & set(outputs())
+
+    cli.main(['plot'])
+    assert set(FIGURES) <= set(outputs())
+
+
+def test_all_matches_the_separate_steps(cli, tmp_path, monkeypatch):
+    steps = tmp_path / 'steps'
+    steps.mkdir()
+    monkeypatch.chdir(steps)
+    cli.main(['analyze'])
+    cli.main(['report'])
+    expected = read_report()
+
+    combined = tmp_path / 'all'
+    combined.mkdir()
+    monkeypatch.chdir(combined)
+    cli.main(['all'])
+    assert read_report() == expected
+    assert set(FIGURES) <= set(outputs())
+
+
+def test_plot_without_stored_results(cli, capsys):
+    cli.main(['plot'])
+    assert 'run the analyze step first' in capsys.readouterr().out
+    assert not set(FIGURES) & set(outputs())
+
+
+LAZY_IMPORTS_SCRIPT = """
+import sys
+import json
+import main
+
+main.START_DATE, main.END_DATE = '2025-06-02', '2025-12-31'
+main.main(['fetch'])
+print(json.dumps({name: name in sys.modules for name in ['matplotlib', 'seaborn', 'wrds']}))
+"""
+
+
+def test_fetch_does_not_import_plotting_libraries(daily_db, tmp_path):
+    # A fresh interpreter: other tests import matplotlib in this one
+    env = dict(os.environ, FUTURES_DATA_SOURCE=f'sqlite:{daily_db}', FUTURES_CACHE_DIR=str(tmp_path / 'cache'),
+               FUTURES_METRICS_PATH='', PYTHONPATH=HW1_DIR)
+    result = subprocess.run([sys.executable, '-c', LAZY_IMPORTS_SCRIPT], cwd=str(tmp_path), env=env, capture_output=True, text=True, check=True)
+    imported = json.loads(result.stdout.strip().splitlines()[-1])
+    assert imported == {'matplotlib': False, 'seaborn': False, 'wrds': False}
+    assert os.path.exists(tmp_path / 'cache' / 'manifest.json')
+
+
+@pytest.mark.parametrize('argv', [['nope'], ['update', '--quantile-backend', 'nope']])
+def test_invalid_arguments_exit(cli, argv):
+    with pytest.raises(SystemExit):
+        cli.main(argv)
@@ -0,0 +1,118 @@
+"""Continuous back-adjusted series versus hand-computed rolls and full rebuilds."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE
+from contract_calendar import ContractCalendar
+from continuous import ContinuousContractBuilder
+
+# Three contracts trading every weekday; B's volume overtakes A's on
+# 2025-01-10 and its open interest on 2025-01-14
+LAST_TRADE = {1: '2025-01-20', 2: '2025-02-20', 3: '2025-03-20'}
+DATES = pd.bdate_range('2025-01-02', '2025-02-28')
+
+
+@pytest.fixture
+def bars():
+    rows = []
+    for i, date in enumerate(DATES):
+        for futcode, base in [(1, 100.0), (2, 103.0), (3, 107.0)]:
+            if date > pd.Timestamp(LAST_TRADE[futcode]):
+                continue
+            front = futcode == 1 or (futcode == 2 and date > pd.Timestamp(LAST_TRADE[1]))
+            volume = 1000 if front else 10
+            if futcode == 2 and date >= pd.Timestamp('2025-01-10'):
+                volume = 2000
+            openinterest = 5000 if front else 50
+            if futcode == 2 and date >= pd.Timestamp('2025-01-14'):
+                openinterest = 9000
+            rows.append({'futcode': futcode, 'date': date, 'close': base + i * (1 + 0.1 * futcode),
+                         'volume': volume, 'openinterest': openinterest,
+                         'lasttrddate': pd.Timestamp(LAST_TRADE[futcode])})
+    return pd.DataFrame(rows)
+
+
+def build(bars, **kwargs):
+    builder = ContinuousContractBuilder(ContractCalendar.from_frame(bars), **kwargs)
+    builder.append(bars)
+    return builder
+
+
+def roll_dates(builder):
+    return [(roll['date'].strftime('%Y-%m-%d'), roll['from'], roll['to']) for roll in builder.rolls]
+
+
+@pytest.mark.parametrize('kwargs,expected', [
+    ({'roll_rule': 'calendar'}, [('2025-01-21', 1, 2), ('2025-02-21', 2, 3)]),
+    ({'roll_rule': 'calendar', 'roll_days_before': 5}, [('2025-01-16', 1, 2), ('2025-02-17', 2, 3)]),
+    ({'roll_rule': 'volume'}, [('2025-01-10', 1, 2), ('2025-02-21', 2, 3)]),
+    ({'roll_rule': 'open_interest'}, [('2025-01-14', 1, 2), ('2025-02-21', 2, 3)]),
+])
+def test_roll_dates_by_rule(bars, kwargs, expected):
+    builder = build(bars, **kwargs)
+    assert roll_dates(builder) == expected
+    held = builder.frame()['futcode']
+    for date, old, new in expected:
+        assert held[held.index < date].iloc[-1] == old
+        assert held[date] == new
+
+
+@pytest.mark.parametrize('adjustment', ['difference', 'ratio'])
+def test_back_adjustment(bars, adjustment):
+    builder = build(bars, adjustment=adjustment)
+    closes = bars.pivot(index='date', columns='futcode', values='close')
+    raw = builder.series(adjusted=False)
+    held = builder.frame()['futcode']
+    assert list(raw) == [closes.loc[date, code] for date, code in held.items()]
+
+    # Each roll shifts (or scales) every earlier close by the gap between the
+    # new contract's close and the old one's last close on the roll date
+    expected = raw.copy()
+    for roll in builder.rolls:
+        date = roll['date']
+        new, old = closes.loc[date, roll['to']], closes.loc[:date, roll['from']].dropna().iloc[-1]
+        gap = new - old if adjustment == 'difference' else new / old
+        if adjustment == 'difference':
+            expected[expected.index < date] += gap
+        else:
+            expected[expected.index < date] *= gap
+        assert roll['gap'] == pytest.approx(gap)
+    pd.testing.assert_series_equal(builder.series(), expected, rtol=1e-12)
+    # The last contract's closes are not adjusted
+    assert builder.series().iloc[-1] == raw.iloc[-1]
+
+
+@pytest.mark.parametrize('roll_rule', ['calendar', 'volume', 'open_interest'])
+@pytest.mark.parametrize('adjustment', ['difference', 'ratio'])
+def test_incremental_appends_match_full_rebuild(make_analyzer, tmp_path, roll_rule, adjustment):
+    analyzer = make_analyzer()
+    df = analyzer.download_futures_data('CL', START_DATE, END_DATE)
+    calendar = analyzer.build_contract_calendar(df)
+    full = analyzer.build_continuous_series(df, calendar, roll_rule=roll_rule, adjustment=adjustment)
+
+    path = str(tmp_path / 'continuous')
+    dates = pd.to_datetime(df['date'])
+    for end in ['2025-07-15', '2025-09-01', '2025-09-02', '2025-11-20', END_DATE]:
+        series = analyzer.build_continuous_series(df[dates <= end], calendar, roll_rule=roll_rule,
+                                                  adjustment=adjustment, path=path)
+    pd.testing.assert_series_equal(series, full, rtol=1e-12)
+
+    reloaded = ContinuousContractBuilder.load(path, calendar)
+    assert len(reloaded.rolls) > 0
+    assert reloaded.rolls == build(df, roll_rule=roll_rule, adjustment=adjustment).rolls
+    pd.testing.assert_series_equal(reloaded.series(), full, rtol=1e-12)
+
+
+def test_persisted_configuration_must_match(make_analyzer, bars, tmp_path):
+    analyzer = make_analyzer()
+    calendar = ContractCalendar.from_frame(bars)
+    path = str(tmp_path / 'continuous')
+    analyzer.build_continuous_series(bars, calendar, path=path)
+
+    with pytest.raises(ValueError, match='roll_rule'):
+        analyzer.build_continuous_series(bars, calendar, roll_rule='open_interest', adjustment='ratio', path=path)
+    with pytest.raises(ValueError, match='roll_days_before'):
+        analyzer.build_continuous_series(bars, calendar, roll_days_before=3, path=path)
+    series = analyzer.build_continuous_series(bars, calendar, path=path)
+    assert np.isfinite(series).all()
@@ -0,0 +1,56 @@
+"""Contract calendar lookups versus a row-by-row pandas reference."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE
+from contract_calendar import ContractCalendar
+
+
+@pytest.fixture
+def contracts():
+    return pd.DataFrame({
+        'futcode': [3, 1, 2, 4],
+        'lasttrddate': pd.to_datetime(['2025-12-19', '2025-10-20', '2025-11-19', None]),
+        'expirationdate': pd.to_datetime(['2025-12-22', '2025-10-21', '2025-11-20', '2026-01-20'])
+    })
+
+
+def reference_nearby(contracts, date, k, roll_on='lasttrddate'):
+    """k-th contract whose roll date is on or after the day of date."""
+    live = contracts[contracts[roll_on] >= pd.Timestamp(date).normalize()].sort_values([roll_on, 'futcode'])
+    return live['futcode'].iloc[k] if k < len(live) else pd.NA
+
+
+@pytest.mark.parametrize('roll_on', ['lasttrddate', 'expirationdate'])
+def test_nearby_matches_reference(contracts, roll_on):
+    calendar = ContractCalendar(contracts, roll_on=roll_on)
+    dates = pd.date_range('2025-10-01', '2026-02-01', freq='D')
+    for k in range(3):
+        nearby = calendar.nearby(dates, k)
+        expected = [reference_nearby(contracts.dropna(subset=[roll_on]), d, k, roll_on) for d in dates]
+        assert list(nearby) == expected
+
+
+def test_intraday_timestamps_keep_the_front_month_on_its_last_trade_date(contracts):
+    calendar = ContractCalendar(contracts)
+    stamps = pd.to_datetime(['2025-11-19 00:00', '2025-11-19 09:30', '2025-11-19 16:59', '2025-11-20 00:01'])
+    assert list(calendar.nearby(stamps, 0)) == [2, 2, 2, 3]
+    assert list(calendar.nearby(stamps, 1)) == [3, 3, 3, pd.NA]
+
+
+def test_missing_roll_column_is_rejected(contracts):
+    with pytest.raises(ValueError, match='expirationdate'):
+        ContractCalendar(contracts.drop(columns='expirationdate'), roll_on='expirationdate')
+
+
+@pytest.mark.parametrize('roll_on', ['lasttrddate', 'expirationdate'])
+def test_calendar_from_stream_matches_frame(make_analyzer, roll_on):
+    analyzer = make_analyzer()
+    df = analyzer.download_futures_data('CL', START_DATE, END_DATE)
+    streamed = analyzer.consume_stream(analyzer.stream_futures_data('CL', START_DATE, END_DATE, chunksize=100))
+
+    expected = analyzer.build_contract_calendar(df, roll_on=roll_on)
+    calendar = analyzer.build_contract_calendar(streamed, roll_on=roll_on)
+    np.testing.assert_array_equal(calendar.futcodes, expected.futcodes)
+    np.testing.assert_array_equal(calendar.roll_dates, expected.roll_dates)
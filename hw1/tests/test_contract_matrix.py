@@ -0,0 +1,64 @@
+"""Pivot-based contract matrix and adjacent spreads versus per-contract preparation."""
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE
+
+
+def with_duplicates(df):
+    # Repeated rows of some dates with revised closes, after the originals
+    repeated = df.sample(frac=0.1, random_state=1).assign(close=lambda d: d['close'] + 0.5)
+    return pd.concat([df, repeated], ignore_index=True)
+
+
+def with_missing_days(df):
+    return df.drop(df.sample(frac=0.3, random_state=2).index).reset_index(drop=True)
+
+
+def with_disjoint_contracts(df):
+    # The front contract stops in July, the next one only starts in September
+    codes = df.groupby('futcode')['lasttrddate'].first().sort_values().index
+    dates = pd.to_datetime(df['date'])
+    keep = ~((df['futcode'] == codes[0]) & (dates > '2025-07-31'))
+    keep &= ~((df['futcode'] == codes[1]) & (dates < '2025-09-01'))
+    return df[keep].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('ticker', ['CL', 'YM'])
+@pytest.mark.parametrize('modify', [None, with_duplicates, with_missing_days, with_disjoint_contracts])
+def test_matrix_matches_per_contract_data(make_analyzer, ticker, modify):
+    analyzer = make_analyzer()
+    df = analyzer.download_futures_data(ticker, START_DATE, END_DATE)
+    if modify is not None:
+        df = modify(df)
+
+    matrix = analyzer.prepare_contract_matrix(df)
+    assert list(matrix.columns) == list(df.groupby('futcode')['lasttrddate'].first().sort_values(kind='stable').index)
+    for futcode in matrix.columns:
+        expected = analyzer.prepare_contract_data(df, futcode)
+        if expected is None:
+            assert matrix[futcode].isna().all()
+        else:
+            pd.testing.assert_series_equal(matrix[futcode], expected, check_names=False)
+
+    spreads = analyzer.calculate_adjacent_spreads(matrix)
+    assert spreads.shape[1] == matrix.shape[1] - 1
+    for second, front in spreads.columns:
+        expected = analyzer.calculate_calendar_spread(analyzer.prepare_contract_data(df, second),
+                                                      analyzer.prepare_contract_data(df, front))
+        if expected is None:
+            assert spreads[(second, front)].isna().all()
+        else:
+            pd.testing.assert_series_equal(spreads[(second, front)], expected, check_names=False)
+
+
+def test_duplicate_dates_keep_the_last_row(make_analyzer):
+    analyzer = make_analyzer()
+    df = analyzer.download_futures_data('CL', START_DATE, END_DATE)
+    futcode = df['futcode'].iloc[0]
+    row = df[df['futcode'] == futcode].iloc[[10]].assign(close=-1.0)
+    df = pd.concat([df, row], ignore_index=True)
+
+    date = pd.Timestamp(row['date'].iloc[0]).date()
+    assert analyzer.prepare_contract_data(df, futcode)[date] == -1.0
+    assert analyzer.prepare_contract_matrix(df).loc[date, futcode] == -1.0
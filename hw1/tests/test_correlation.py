@@ -0,0 +1,71 @@
+"""Online correlation matrices versus DataFrame.corr."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import build_spread
+from correlation import OnlineCorrelation, SpreadCorrelationTracker, correlation_matrix
+
+WINDOWS = [3, 5, 10, 20]
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    common = np.cumsum(rng.normal(size=400))
+    frame = pd.DataFrame({f's{i}': 10 * i + common * (i - 1.5) + np.cumsum(rng.normal(size=400))
+                          for i in range(4)}, index=pd.date_range('2025-01-01', periods=400))
+    frame.iloc[rng.integers(0, 400, 40), 1] = np.nan
+    frame.iloc[rng.integers(0, 400, 40), 3] = np.nan
+    frame.iloc[:30, 2] = np.nan
+    return frame
+
+
+def test_correlation_matrix_matches_pandas(frame):
+    pd.testing.assert_frame_equal(correlation_matrix(frame), frame.corr(), rtol=1e-10)
+
+
+def test_row_updates_and_merges_match_pandas(frame):
+    values = frame.to_numpy()
+    by_row = OnlineCorrelation(frame.columns)
+    for row in values:
+        by_row.update(row)
+    pd.testing.assert_frame_equal(by_row.correlation(), frame.corr(), rtol=1e-10)
+    pd.testing.assert_frame_equal(by_row.covariance(), frame.cov(), rtol=1e-10)
+
+    parts = [OnlineCorrelation(frame.columns).update_many(block) for block in np.array_split(values, 5)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    pd.testing.assert_frame_equal(merged.correlation(), frame.corr(), rtol=1e-10)
+
+    with pytest.raises(ValueError):
+        merged.merge(OnlineCorrelation(['a', 'b']))
+
+
+def test_tracker_updates_match_full_history(frame):
+    deviations = {N: frame - frame.rolling(N, min_periods=1).mean() for N in WINDOWS}
+    head = 250
+    tracker = SpreadCorrelationTracker.from_history(frame.iloc[:head],
+                                                   {N: dev.iloc[:head] for N, dev in deviations.items()}, WINDOWS)
+    for row in frame.to_numpy()[head:]:
+        tracker.update(row)
+
+    results = tracker.correlations()
+    pd.testing.assert_frame_equal(results['spread'], frame.corr(), rtol=1e-10)
+    for N in WINDOWS:
+        pd.testing.assert_frame_equal(results[f'd_{N}'], deviations[N].corr(), rtol=1e-8)
+
+
+def test_analyzer_matrix_matches_pairwise_cross_analysis(make_analyzer):
+    analyzer = make_analyzer()
+    spreads = {f'{ticker} Spread': build_spread(analyzer, ticker) for ticker in ('CL', 'HO', 'YM')}
+    results = analyzer.analyze_correlation_matrix(spreads, online=True)
+
+    cross = analyzer.analyze_cross_spread_dynamics(spreads['CL Spread'], spreads['YM Spread'],
+                                                   'CL Spread', 'YM Spread')
+    assert results['spread'].loc['CL Spread', 'YM Spread'] == pytest.approx(cross['correlation'])
+    for key, corr in cross['d_correlations'].items():
+        assert results[key].loc['CL Spread', 'YM Spread'] == pytest.approx(corr)
+    offline = analyzer.analyze_correlation_matrix(spreads)
+    pd.testing.assert_frame_equal(offline['d_5'], results['d_5'], rtol=1e-10)
@@ -0,0 +1,146 @@
+"""Parquet download cache versus direct queries."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from conftest import CountingConnection, START_DATE
+from data_cache import ParquetCache
+from main import FUTURES_COLUMNS, CONTRACT_CODES
+
+
+def normalized(df):
+    return df.sort_values(['date', 'futcode']).reset_index(drop=True)
+
+
+def test_cached_download_matches_direct_query(make_analyzer, daily_db, tmp_path):
+    direct = make_analyzer().download_futures_data('CL', START_DATE, '2025-09-30')
+
+    db = CountingConnection(daily_db)
+    cached = make_analyzer(db=db, cache_dir=str(tmp_path))
+    first = cached.download_futures_data('CL', START_DATE, '2025-09-30')
+    second = cached.download_futures_data('CL', START_DATE, '2025-09-30')
+
+    assert len(db.queries) == 1
+    assert_frame_equal(normalized(first), normalized(direct), check_dtype=False)
+    assert_frame_equal(normalized(second), normalized(direct), check_dtype=False)
+
+
+def test_extending_the_range_queries_only_the_new_days(make_analyzer, daily_db, tmp_path):
+    db = CountingConnection(daily_db)
+    analyzer = make_analyzer(db=db, cache_dir=str(tmp_path))
+    analyzer.download_futures_data('CL', START_DATE, '2025-09-30')
+    extended = analyzer.download_futures_data('CL', START_DATE, '2025-10-31')
+
+    assert len(db.queries) == 2
+    assert "v.date_ >= '2025-10-01'" in db.queries[1]
+    direct = make_analyzer().download_futures_data('CL', START_DATE, '2025-10-31')
+    assert_frame_equal(normalized(extended), normalized(direct), check_dtype=False)
+
+
+def recent_days(offset, periods):
+    """Date strings of days within the publication lag (relative to today)."""
+    start = pd.Timestamp.today().normalize() - pd.Timedelta(days=offset)
+    return [day.strftime('%Y-%m-%d') for day in pd.date_range(start, periods=periods, freq='D')]
+
+
+def test_recent_days_without_rows_are_not_marked_as_covered(tmp_path):
+    cache = ParquetCache(str(tmp_path))
+    days = recent_days(5, 10)
+    rows = pd.DataFrame({'date': pd.to_datetime(days[:2]), 'close': [1.0, 2.0]})
+    cache.store(1986, FUTURES_COLUMNS, days[0], days[-1], rows)
+
+    # Data ended two days in: the later, unpublished days are fetched again next time
+    assert cache.missing_ranges(1986, FUTURES_COLUMNS, days[0], days[-1]) == [(days[2], days[-1])]
+
+    cache.store(1986, FUTURES_COLUMNS, days[2], days[-1], rows.iloc[:0])
+    assert cache.missing_ranges(1986, FUTURES_COLUMNS, days[2], days[-1]) == [(days[2], days[-1])]
+
+
+def test_final_days_are_covered_without_rows(tmp_path):
+    cache = ParquetCache(str(tmp_path))
+    days = recent_days(10, 8)
+    rows = pd.DataFrame({'date': pd.to_datetime(days[:2]), 'close': [1.0, 2.0]})
+    cache.store(1986, FUTURES_COLUMNS, days[0], days[-1], rows)
+
+    # Days older than the publication lag are final; the rest stay missing
+    assert cache.missing_ranges(1986, FUTURES_COLUMNS, days[0], days[-1]) == [(days[4], days[-1])]
+
+    cache.store(1986, FUTURES_COLUMNS, '2025-06-07', '2025-06-08', rows.iloc[:0])
+    assert cache.missing_ranges(1986, FUTURES_COLUMNS, '2025-06-07', '2025-06-08') == []
+
+
+def test_warm_run_makes_no_queries(make_analyzer, daily_db, tmp_path):
+    # Ends on a Sunday after the last published day of the data
+    db = CountingConnection(daily_db)
+    cold = make_analyzer(db=db, cache_dir=str(tmp_path)).download_many(['CL', 'YM'], START_DATE, '2026-01-04')
+    weekend = make_analyzer(db=db, cache_dir=str(tmp_path)).download_futures_data('HO', '2025-11-08', '2025-11-09')
+    assert len(db.queries) == 2 and len(weekend) == 0
+
+    warm = make_analyzer(db=db, cache_dir=str(tmp_path))
+    again = warm.download_many(['CL', 'YM'], START_DATE, '2026-01-04')
+    warm.download_futures_data('HO', '2025-11-08', '2025-11-09')
+    assert len(db.queries) == 2
+    for ticker in ('CL', 'YM'):
+        assert_frame_equal(normalized(again[ticker]), normalized(cold[ticker]), check_dtype=False)
+
+
+def test_unpublished_days_are_fetched_after_an_empty_download(make_analyzer, daily_db, tmp_path):
+    db = CountingConnection(daily_db)
+    analyzer = make_analyzer(db=db, cache_dir=str(tmp_path))
+    days = recent_days(2, 5)
+    empty = analyzer.download_futures_data('CL', days[0], days[-1])
+    assert len(empty) == 0 and 'futcode' in empty.columns
+
+    analyzer.download_futures_data('CL', days[0], days[-1])
+    assert len(db.queries) == 2
+
+
+def segment_rows(start, end):
+    dates = pd.date_range(start, end, freq='D')
+    return pd.DataFrame({'date': dates, 'close': range(len(dates))})
+
+
+def test_stale_process_does_not_restore_evicted_segments(tmp_path):
+    # Two caches on one directory stand in for two processes
+    first = ParquetCache(str(tmp_path))
+    second = ParquetCache(str(tmp_path))
+    first.store(1, FUTURES_COLUMNS, '2025-01-01', '2025-01-31', segment_rows('2025-01-01', '2025-01-31'))
+
+    second.max_bytes = 1
+    second.store(2, FUTURES_COLUMNS, '2025-01-01', '2025-01-31', segment_rows('2025-01-01', '2025-01-31'))
+    first.store(3, FUTURES_COLUMNS, '2025-01-01', '2025-01-31', segment_rows('2025-01-01', '2025-01-31'))
+
+    reopened = ParquetCache(str(tmp_path))
+    assert sorted(meta['contrcode'] for meta in reopened.segments.values()) == [2, 3]
+    assert first.missing_ranges(1, FUTURES_COLUMNS, '2025-01-01', '2025-01-31') == [('2025-01-01', '2025-01-31')]
+    assert len(first.load(3, FUTURES_COLUMNS, '2025-01-01', '2025-01-31')) == 31
+
+
+def test_deleted_segment_counts_as_missing(make_analyzer, daily_db, tmp_path):
+    db = CountingConnection(daily_db)
+    analyzer = make_analyzer(db=db, cache_dir=str(tmp_path))
+    direct = analyzer.download_futures_data('CL', START_DATE, '2025-09-30')
+    cache = analyzer.cache
+    for name in list(cache.segments):
+        os.remove(os.path.join(str(tmp_path), name))
+
+    assert cache.missing_ranges(CONTRACT_CODES['CL'], FUTURES_COLUMNS, START_DATE, '2025-09-30') == \
+        [(START_DATE, '2025-09-30')]
+    assert cache.load(CONTRACT_CODES['CL'], FUTURES_COLUMNS, START_DATE, '2025-09-30') is None
+
+    again = analyzer.download_futures_data('CL', START_DATE, '2025-09-30')
+    assert len(db.queries) == 2
+    assert_frame_equal(normalized(again), normalized(direct), check_dtype=False)
+
+
+def test_concurrent_stores_keep_every_segment(tmp_path):
+    caches = [ParquetCache(str(tmp_path)) for _ in range(4)]
+    rows = segment_rows('2025-01-01', '2025-01-10')
+
+    def store(i):
+        caches[i % 4].store(i, FUTURES_COLUMNS, '2025-01-01', '2025-01-10', rows)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(store, range(32)))
+    assert len(ParquetCache(str(tmp_path)).segments) == 32
@@ -0,0 +1,51 @@
+"""SQLite and DuckDB stand-ins return the same data."""
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from synthetic import SyntheticFutures
+from datasources import write_tables, SQLiteConnection, DuckDBConnection
+
+pytest.importorskip('duckdb')
+
+
+def normalized(df):
+    return df.sort_values(['date', 'futcode']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('freq,start,end', [('1d', '2025-06-02', '2025-09-30'), ('5m', '2025-11-03', '2025-11-07')])
+def test_backends_return_the_same_rows(make_analyzer, tmp_path, freq, start, end):
+    generator = SyntheticFutures(['CL', 'YM'], start, end, freq=freq)
+    downloads = {}
+    for backend in ('db', 'duckdb'):
+        path = str(tmp_path / f'bars.{backend}')
+        generator.write(path)
+        analyzer = make_analyzer(source=path, start_date=start, end_date=end)
+        downloads[backend] = analyzer.download_many(['CL', 'YM'], start, end, intraday=freq != '1d')
+
+    for ticker in ('CL', 'YM'):
+        sqlite, duckdb = normalized(downloads['db'][ticker]), normalized(downloads['duckdb'][ticker])
+        assert len(sqlite) > 0
+        assert_frame_equal(duckdb, sqlite, check_dtype=False)
+
+
+@pytest.mark.parametrize('intraday', [False, True])
+def test_time_of_day_is_kept_only_for_intraday_tables(tmp_path, intraday):
+    bars = pd.DataFrame({'futcode': [1, 1], 'date_': pd.to_datetime(['2025-11-03 09:30', '2025-11-04 16:00']),
+                         'settlement': [1.0, 2.0]})
+    info = pd.DataFrame({'futcode': [1], 'contrcode': [7], 'lasttrddate': pd.to_datetime(['2025-12-19 13:30'])})
+    frames = {}
+    for path, connection in [(str(tmp_path / 'bars.db'), SQLiteConnection),
+                             (str(tmp_path / 'bars.duckdb'), DuckDBConnection)]:
+        write_tables(path, info, bars, intraday=intraday)
+        conn = connection(path)
+        frames[connection] = conn.raw_sql("""
+            SELECT v.date_, c.lasttrddate FROM tr_ds_fut.wrds_fut_contract v
+            INNER JOIN tr_ds_fut.wrds_contract_info c ON c.futcode = v.futcode
+            WHERE v.date_ >= '2025-11-03' AND v.date_ < '2025-11-05' ORDER BY v.date_""")
+        conn.close()
+
+    expected_dates = bars['date_'] if intraday else bars['date_'].dt.normalize()
+    for df in frames.values():
+        assert list(df['date_']) == list(expected_dates)
+        assert list(df['lasttrddate']) == [pd.Timestamp('2025-12-19')] * 2
@@ -0,0 +1,105 @@
+"""Batched and concurrent downloads versus one query per ticker."""
+import sqlite3
+import pytest
+from pandas.testing import assert_frame_equal
+
+from conftest import CountingConnection, START_DATE, END_DATE, TICKERS
+from datasources import ConnectionPool
+
+
+def normalized(df):
+    return df.sort_values(['date', 'futcode']).reset_index(drop=True)
+
+
+class FlakyConnection(CountingConnection):
+    """Connection whose first failures queries raise a transient error."""
+
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+
+    def raw_sql(self, sql, *args, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            raise sqlite3.OperationalError('database is locked')
+        return super().raw_sql(sql, *args, **kwargs)
+
+
+@pytest.fixture
+def expected(make_analyzer):
+    analyzer = make_analyzer()
+    return {ticker: analyzer.download_futures_data(ticker, START_DATE, END_DATE) for ticker in TICKERS}
+
+
+def test_download_many_matches_single_downloads(make_analyzer, daily_db, expected):
+    db = CountingConnection(daily_db)
+    data = make_analyzer(db=db).download_many(TICKERS, START_DATE, END_DATE)
+
+    assert len(db.queries) == 1
+    for ticker in TICKERS:
+        assert_frame_equal(normalized(data[ticker]), normalized(expected[ticker]), check_dtype=False)
+
+
+def test_download_concurrent_matches_single_downloads(make_analyzer, daily_db, expected):
+    analyzer = make_analyzer(db_factory=lambda: CountingConnection(daily_db), pool_size=3)
+    data = analyzer.download_concurrent(TICKERS, START_DATE, END_DATE, max_workers=3)
+
+    for ticker in TICKERS:
+        assert_frame_equal(normalized(data[ticker]), normalized(expected[ticker]), check_dtype=False)
+
+
+def test_transient_errors_are_retried_on_a_fresh_connection(make_analyzer, daily_db, expected):
+    opened = []
+
+    def factory():
+        # The first connection fails on every query, later ones work
+        conn = FlakyConnection(daily_db, failures=100 if not opened else 0)
+        opened.append(conn)
+        return conn
+
+    analyzer = make_analyzer(db_factory=factory, pool_size=2)
+    data = analyzer.download_concurrent(['CL'], START_DATE, END_DATE, max_workers=1, backoff=0.0)
+
+    assert len(opened) == 2
+    assert_frame_equal(normalized(data['CL']), normalized(expected['CL']), check_dtype=False)
+
+    # The broken seeded connection is not used again outside the pool either
+    assert analyzer.db is not opened[0]
+    single = analyzer.download_futures_data('CL', START_DATE, END_DATE)
+    assert_frame_equal(normalized(single), normalized(expected['CL']), check_dtype=False)
+    assert opened[0].queries == []
+
+
+def test_failed_download_after_retries_gives_none(make_analyzer, daily_db):
+    analyzer = make_analyzer(db_factory=lambda: FlakyConnection(daily_db, failures=100), pool_size=1)
+    data = analyzer.download_concurrent(['CL', 'HO'], START_DATE, END_DATE, retries=2, backoff=0.0)
+
+    assert data == {'CL': None, 'HO': None}
+
+
+def test_pool_reuses_connections_up_to_max_size(daily_db):
+    opened = []
+
+    def factory():
+        opened.append(CountingConnection(daily_db))
+        return opened[-1]
+
+    pool = ConnectionPool(factory, max_size=2)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.discard(second)
+    pool.acquire()
+    assert len(opened) == 3
+    pool.close()
+
+
+def test_discarded_seeded_connection_is_reported(daily_db):
+    seeded = CountingConnection(daily_db)
+    discarded = []
+    pool = ConnectionPool(lambda: CountingConnection(daily_db), max_size=1, connections=[seeded],
+                          on_discard=discarded.append)
+    pool.discard(pool.acquire())
+    assert discarded == [seeded]
+    assert pool.acquire() is not seeded
+    assert pool._created == 1
@@ -0,0 +1,120 @@
+"""Incremental updates versus a full recompute of the same history."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE
+from incremental import load_state, state_path
+import main
+
+SPREADS = [('CL', 'CL Calendar Spread'), ('YM', 'YM Calendar Spread')]
+UPDATE_ENDS = ['2025-10-03', '2025-10-04', '2025-10-20', '2025-10-20', END_DATE]
+
+
+def incremental_analyzer(make_analyzer, root, backend='exact'):
+    return make_analyzer(quantile_backend=backend, results_dir=str(root / 'results'),
+                         state_dir=str(root / 'state'))
+
+
+def run_updates(analyzer, ends):
+    for end in ends:
+        results = [analyzer.update_spread_dynamics(ticker, label, end) for ticker, label in SPREADS]
+        cross = analyzer.update_cross_spread_dynamics(*results, 'CL Spread', 'YM Spread')
+    return cross
+
+
+def full_spreads(reference, state_dir):
+    """Spreads of the saved states' contracts, built in full up to each state's last date."""
+    spreads = []
+    for ticker, label in SPREADS:
+        state = load_state(state_path(state_dir, label))
+        end = str(state.last_date)
+        df = reference.download_futures_data(ticker, START_DATE, END_DATE)
+        second = reference.prepare_contract_data(df, state.futcodes[0], end_date=end)
+        front = reference.prepare_contract_data(df, state.futcodes[1], end_date=end)
+        spreads.append(reference.calculate_calendar_spread(second, front))
+    return spreads
+
+
+def assert_cross_matches(cross, expected):
+    assert cross['correlation'] == pytest.approx(expected['correlation'], rel=1e-9)
+    assert cross['d_correlations'] == pytest.approx(expected['d_correlations'], rel=1e-9)
+
+
+def test_updates_match_full_recompute(make_analyzer, tmp_path):
+    analyzer = incremental_analyzer(make_analyzer, tmp_path / 'incremental')
+    cross = run_updates(analyzer, ['2025-09-30'] + UPDATE_ENDS)
+
+    reference = make_analyzer(results_dir=str(tmp_path / 'full' / 'results'))
+    spreads = full_spreads(reference, str(tmp_path / 'incremental' / 'state'))
+    for spread, (ticker, label) in zip(spreads, SPREADS):
+        reference.analyze_spread_dynamics(spread, label)
+
+        updated = analyzer.results_store.load_results(label)
+        full = reference.results_store.load_results(label)
+        pd.testing.assert_series_equal(updated['spread'], full['spread'], rtol=1e-12)
+        for key in ['mean', 'median', 'std', 'min', 'max']:
+            assert updated['stats'][key] == pytest.approx(full['stats'][key], rel=1e-10)
+        np.testing.assert_allclose(updated['stats']['quantiles'], full['stats']['quantiles'], rtol=1e-10)
+        for key, dev in full['deviations'].items():
+            np.testing.assert_allclose(updated['deviations'][key]['values'], dev['values'], rtol=1e-9, atol=1e-9)
+            assert updated['deviations'][key]['std'] == pytest.approx(dev['std'], rel=1e-9)
+            np.testing.assert_allclose(updated['deviations'][key]['quantiles'], dev['quantiles'],
+                                       rtol=1e-9, atol=1e-9)
+
+    assert_cross_matches(cross, reference.analyze_cross_spread_dynamics(*spreads, 'CL Spread', 'YM Spread'))
+
+
+@pytest.mark.parametrize('with_store', [True, False])
+def test_staggered_updates_match_full_cross_analysis(make_analyzer, tmp_path, with_store):
+    # CL lags YM by a few weeks until the last update
+    analyzer = make_analyzer(results_dir=str(tmp_path / 'results') if with_store else None,
+                             state_dir=str(tmp_path / 'state'))
+    reference = make_analyzer()
+    for cl_end, ym_end in [('2025-09-30', '2025-10-15'), ('2025-10-03', '2025-10-03'),
+                           ('2025-10-20', '2025-11-14'), ('2025-11-07', '2025-11-14'),
+                           (END_DATE, '2025-11-14'), (END_DATE, END_DATE)]:
+        results = [analyzer.update_spread_dynamics('CL', 'CL Calendar Spread', cl_end),
+                   analyzer.update_spread_dynamics('YM', 'YM Calendar Spread', ym_end)]
+        cross = analyzer.update_cross_spread_dynamics(*results, 'CL Spread', 'YM Spread')
+
+        spreads = full_spreads(reference, str(tmp_path / 'state'))
+        expected = reference.analyze_cross_spread_dynamics(*spreads, 'CL Spread', 'YM Spread')
+        assert_cross_matches(cross, expected)
+
+
+def test_up_to_date_update_adds_nothing(make_analyzer, tmp_path):
+    analyzer = incremental_analyzer(make_analyzer, tmp_path)
+    run_updates(analyzer, ['2025-09-30', '2025-10-20'])
+    results = analyzer.update_spread_dynamics('CL', 'CL Calendar Spread', '2025-10-20')
+    assert len(results['spread']) == 0
+    assert len(analyzer.results_store.read_deviations('CL Calendar Spread')) > 0
+
+
+@pytest.mark.parametrize('backend', ['exact', 'tdigest'])
+def test_saved_sketches_by_backend(make_analyzer, tmp_path, backend):
+    analyzer = incremental_analyzer(make_analyzer, tmp_path, backend)
+    for end in ['2025-09-30', END_DATE]:
+        analyzer.update_spread_dynamics('CL', 'CL Calendar Spread', end)
+    state = load_state(state_path(str(tmp_path / 'state'), 'CL Calendar Spread'))
+    for sketch in state.sketches.values():
+        if backend == 'exact':
+            assert sum(len(chunk) for chunk in sketch._chunks) == sketch.count
+        else:
+            # Centroids instead of values: bounded by the compression
+            assert len(sketch.means) + len(sketch._buffer) < sketch.count
+            assert len(sketch.means) <= sketch.compression
+
+
+def test_update_command_defaults_to_tdigest():
+    assert main.UPDATE_QUANTILE_BACKEND == 'tdigest'
+    assert main.parse_args(['update']).quantile_backend is None
+    assert main.parse_args(['update', '--quantile-backend', 'exact']).quantile_backend == 'exact'
+
+
+def test_update_report_covers_the_updated_period(cli):
+    for end in ['2025-09-30', '2025-10-20']:
+        cli.main(['update', '--end', end])
+    with open('output/analysis_report.txt') as f:
+        report = f.read()
+    assert f"Analysis Period: {START_DATE} to 2025-10-20\n" in report
@@ -0,0 +1,55 @@
+"""Intraday downloads and session-grid resampling versus pandas resample."""
+import pandas as pd
+import pytest
+
+from intraday import CME_ENERGY, CME_EQUITY
+
+START, END = '2025-11-04', '2025-11-14'
+
+
+@pytest.fixture
+def minute_analyzer(make_analyzer, minute_db):
+    return make_analyzer(minute_db, start_date=START, end_date=END)
+
+
+@pytest.fixture
+def minute_bars(minute_analyzer):
+    return minute_analyzer.download_futures_data('CL', START, END, intraday=True)
+
+
+def test_download_covers_the_whole_session_range(minute_analyzer, minute_bars):
+    dates = pd.to_datetime(minute_bars['date'])
+    # The session of the first trade date opens the evening before
+    assert dates.min().normalize() == pd.Timestamp('2025-11-03')
+    assert (dates == pd.Timestamp('2025-11-03 17:00')).any()
+    # Bars after midnight of end_date are not cut off
+    assert dates.max() == pd.Timestamp('2025-11-14 15:59')
+
+    daily = minute_analyzer.download_futures_data('CL', START, END)
+    assert pd.to_datetime(daily['date']).min() == pd.Timestamp(START)
+    assert pd.to_datetime(daily['date']).max() == pd.Timestamp('2025-11-14 15:59')
+
+
+@pytest.mark.parametrize('freq', ['5m', '1h'])
+def test_session_grid_matches_pandas_resample(minute_analyzer, minute_bars, freq):
+    futcode = minute_analyzer.identify_top_contracts(minute_bars, n_contracts=1)[0]
+    closes = minute_analyzer.prepare_contract_data(minute_bars, futcode, freq=freq)
+
+    rows = minute_bars[minute_bars['futcode'] == futcode].sort_values('date')
+    step = {'5m': '5min', '1h': '1h'}[freq]
+    expected = (rows.set_index(pd.to_datetime(rows['date']))['close']
+                .resample(step, origin=CME_ENERGY.session_open(START)).last()
+                .reindex(CME_ENERGY.grid(START, END, freq)).ffill())
+    pd.testing.assert_series_equal(closes, expected, check_names=False, check_freq=False)
+
+    matrix = minute_analyzer.prepare_contract_matrix(minute_bars, futcodes=[futcode], freq=freq)
+    pd.testing.assert_series_equal(matrix[futcode], closes, check_names=False)
+
+
+def test_holidays_have_no_session():
+    for calendar in (CME_ENERGY, CME_EQUITY):
+        dates = calendar.trade_dates('2025-12-22', '2025-12-26')
+        assert pd.Timestamp('2025-12-25') not in dates
+        opens, closes = calendar.session_bounds('2025-12-26', '2025-12-26')
+        assert opens[0] == pd.Timestamp('2025-12-25 17:00')
+        assert closes[0] == pd.Timestamp('2025-12-26 16:00')
@@ -0,0 +1,52 @@
+"""Stage metrics records of instrumented analyzer methods."""
+import json
+import pytest
+
+from conftest import START_DATE, END_DATE
+import metrics
+from metrics import frame_bytes
+
+
+def test_metrics_are_opt_in(make_analyzer, monkeypatch):
+    monkeypatch.delenv('FUTURES_PROFILE', raising=False)
+    assert make_analyzer(metrics=None).metrics is None
+
+    monkeypatch.setenv('FUTURES_PROFILE', 'metrics')
+    analyzer = make_analyzer(metrics=None)
+    assert analyzer.metrics is not None and analyzer.metrics.profile is None
+
+
+def test_records_of_nested_stages(make_analyzer, daily_db, tmp_path):
+    path = str(tmp_path / 'metrics.jsonl')
+    analyzer = make_analyzer(metrics=True, metrics_path=path)
+    df = analyzer.download_futures_data('CL', START_DATE, END_DATE)
+    front, second = analyzer.identify_top_contracts(df)[:2]
+    analyzer.prepare_contract_data(df, front)
+
+    records = {record['stage']: record for record in analyzer.metrics.records}
+    download = records['download_futures_data']
+    assert download['args'] == {'ticker': 'CL', 'start_date': START_DATE, 'end_date': END_DATE}
+    assert download['rows_out'] == len(df)
+    # In-memory size of the query result (before the column renames)
+    assert download['result_bytes'] == frame_bytes(df)
+    assert records['prepare_contract_data']['rows_in'] == len(df)
+    assert records['prepare_contract_data']['result_bytes'] == 0
+
+    with open(path) as f:
+        assert [json.loads(line)['stage'] for line in f] == [r['stage'] for r in analyzer.metrics.records]
+
+    summary = analyzer.metrics.summary()
+    assert list(summary.columns) == ['calls', 'seconds', 'rows_in', 'rows_out', 'result_mb', 'rss_growth_mb']
+    assert summary.loc['download_futures_data', 'result_mb'] == pytest.approx(frame_bytes(df) / 1e6)
+
+
+def test_rss_growth_is_per_stage(monkeypatch):
+    # Process peak RSS before and after each stage: the first stage raises it
+    # by 200 MB, the second stays below that peak
+    peaks = iter([100.0, 300.0, 300.0, 300.0])
+    monkeypatch.setattr(metrics, 'peak_rss_mb', lambda: next(peaks))
+    stages = metrics.StageMetrics()
+    stages.run('allocate', lambda: None)
+    stages.run('small', lambda: None)
+    assert [record['rss_growth_mb'] for record in stages.records] == [200.0, 0.0]
+    assert stages.summary().loc['allocate', 'rss_growth_mb'] == 200.0
@@ -0,0 +1,95 @@
+"""Streaming monitor deviations versus the batch and incremental analyses."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE, build_spread
+from incremental import load_state, state_path
+from main import ROLLING_WINDOWS
+from monitor import SpreadMonitor, Tick, replay_bars, bands_from_results
+
+LABEL = 'YM Calendar Spread'
+
+
+def replay(monitor, bars, futcodes, after=None):
+    """Deviations of the monitor at the last tick of each day."""
+    deviations = {}
+    for tick in replay_bars(bars, futcodes, after=after):
+        monitor.on_tick(tick)
+        deviations[pd.Timestamp(monitor.bar)] = monitor.deviations.copy()
+    return pd.DataFrame.from_dict(deviations, orient='index', columns=monitor.keys)
+
+
+def test_monitor_continues_the_incremental_update(make_analyzer, tmp_path):
+    analyzer = make_analyzer(results_dir=str(tmp_path / 'results'), state_dir=str(tmp_path / 'state'))
+    analyzer.update_spread_dynamics('YM', LABEL, '2025-09-30')
+    state = load_state(state_path(str(tmp_path / 'state'), LABEL))
+    bands = bands_from_results(analyzer.results_store.load_results(LABEL), 0.05, 0.95)
+    monitor = SpreadMonitor.from_state(state, bands, on_alert=lambda alert: None)
+
+    delta = analyzer.download_delta(list(state.futcodes), state.last_date, END_DATE)
+    streamed = replay(monitor, delta, state.futcodes, after=state.last_date)
+    updated = analyzer.update_spread_dynamics('YM', LABEL, END_DATE)
+
+    assert len(streamed) > 0 and streamed.notna().all().all()
+    for key in monitor.keys:
+        expected = updated['deviations'][key]['values']
+        expected.index = pd.to_datetime(expected.index)
+        assert streamed.index.isin(expected.index).all()
+        np.testing.assert_allclose(streamed[key], expected.loc[streamed.index], rtol=1e-9, atol=1e-9)
+
+
+def test_monitor_from_scratch_matches_batch_deviations(make_analyzer):
+    analyzer = make_analyzer()
+    spread = build_spread(analyzer, 'YM')
+    results = analyzer.analyze_spread_dynamics(spread, LABEL)
+    bars = analyzer.download_futures_data('YM', START_DATE, END_DATE)
+    front, second = analyzer.identify_top_contracts(bars, n_contracts=2)
+    futcodes = (second, front)
+
+    monitor = SpreadMonitor(LABEL, futcodes, ROLLING_WINDOWS, {}, freq='1D')
+    streamed = replay(monitor, bars, futcodes)
+    for key in monitor.keys:
+        expected = results['deviations'][key]['values']
+        expected.index = pd.to_datetime(expected.index)
+        # Days without bars are forward filled in both; compare on the bar days
+        assert streamed.index.isin(expected.index).all()
+        np.testing.assert_allclose(streamed[key], expected.loc[streamed.index], rtol=1e-9, atol=1e-9)
+
+
+def ticks(closes, start='2025-11-03', futcode=1):
+    day = pd.Timedelta('1D').value
+    t0 = pd.Timestamp(start).value
+    return [Tick(t0 + i * day, futcode, close, 0) for i, close in enumerate(closes)]
+
+
+def test_alerts_fire_once_per_band_crossing():
+    monitor = SpreadMonitor('test', (1, 2), [3], {'d_3': (-1.0, 1.0)}, freq='1D')
+    monitor.on_tick(Tick(pd.Timestamp('2025-11-02').value, 2, 0.0, 0))
+    alerts = [monitor.on_tick(tick) for tick in ticks([10, 10, 10, 20, 21, 21, 21, 10])]
+
+    fired = [(alert['time'].date(), alert['side']) for day in alerts for alert in day]
+    assert fired == [(pd.Timestamp('2025-11-06').date(), 'above'), (pd.Timestamp('2025-11-10').date(), 'below')]
+    assert monitor.latency_summary()['alerts'] == 2
+
+
+def test_late_and_unknown_ticks_are_ignored():
+    monitor = SpreadMonitor('test', (1, 2), [3], {}, freq='1D')
+    for tick in ticks([10, 11, 12]):
+        monitor.on_tick(tick)
+    deviations = monitor.deviations.copy()
+    assert monitor.on_tick(Tick(pd.Timestamp('2025-11-03').value, 1, 50.0, 0)) == []
+    assert monitor.on_tick(Tick(pd.Timestamp('2025-11-06').value, 9, 50.0, 0)) == []
+    np.testing.assert_array_equal(monitor.deviations, deviations)
+    summary = monitor.latency_summary()
+    assert (summary['ticks'], summary['late']) == (3, 1)
+
+
+def test_bands_require_the_stored_quantiles(make_analyzer):
+    analyzer = make_analyzer()
+    results = analyzer.analyze_spread_dynamics(build_spread(analyzer, 'CL'), 'CL Calendar Spread')
+    bands = bands_from_results(results, 0.05, 0.95)
+    assert bands['d_5'] == (results['deviations']['d_5']['quantiles'].loc[0.05],
+                            results['deviations']['d_5']['quantiles'].loc[0.95])
+    with pytest.raises(ValueError):
+        bands_from_results(results, 0.05, 0.925)
@@ -0,0 +1,68 @@
+"""Configuration-driven pipeline versus the analyzer run spread by spread."""
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE, build_spread
+import pipeline
+
+
+@pytest.fixture
+def config(daily_db, tmp_path):
+    path = tmp_path / 'spreads.toml'
+    path.write_text(f'''
+start_date = "{START_DATE}"
+end_date = "{END_DATE}"
+output_dir = "{tmp_path / 'output'}"
+cache_dir = "{tmp_path / 'cache'}"
+max_workers = 2
+source = "sqlite:{daily_db}"
+
+[[spreads]]
+ticker = "CL"
+
+[[spreads]]
+ticker = "YM"
+
+[[spreads]]
+ticker = "XX"
+
+[[pairs]]
+first = "CL Calendar Spread"
+second = "YM Calendar Spread"
+
+[[pairs]]
+first = "CL Calendar Spread"
+second = "XX Calendar Spread"
+''')
+    return str(path)
+
+
+def test_pipeline_matches_analyzer(config, make_analyzer):
+    summary, pair_summary, results, failures = pipeline.run_pipeline(pipeline.load_config(config))
+
+    analyzer = make_analyzer()
+    spreads = {}
+    for ticker in ('CL', 'YM'):
+        spreads[ticker] = build_spread(analyzer, ticker)
+        expected = analyzer.analyze_spread_dynamics(spreads[ticker], f'{ticker} Calendar Spread')
+        label = f'{ticker} Calendar Spread'
+        pd.testing.assert_series_equal(results[label]['spread'], expected['spread'])
+        assert summary.loc[label, 'std'] == pytest.approx(expected['stats']['std'])
+
+    cross = analyzer.analyze_cross_spread_dynamics(spreads['CL'], spreads['YM'], 'CL Spread', 'YM Spread')
+    assert len(pair_summary) == 1
+    assert pair_summary['correlation'].iloc[0] == pytest.approx(cross['correlation'])
+
+
+def test_failures_are_reported_without_stopping_the_run(config, capsys):
+    summary, pair_summary, results, failures = pipeline.run_pipeline(pipeline.load_config(config))
+
+    assert results['XX Calendar Spread'] is None
+    assert results['CL Calendar Spread'] is not None
+    assert set(failures) == {'XX Calendar Spread', 'CL Calendar Spread / XX Calendar Spread'}
+    assert 'Skipping pair CL Calendar Spread / XX Calendar Spread' in capsys.readouterr().out
+    assert list(summary.index) == ['CL Calendar Spread', 'YM Calendar Spread', 'XX Calendar Spread']
+
+
+def test_main_pipeline_exit_status(config):
+    assert pipeline.main_pipeline(config) == 1
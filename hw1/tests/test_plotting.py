@@ -0,0 +1,47 @@
+"""Min/max decimation and the render process pool."""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from plotting import RenderPipeline, decimate_minmax, plot_timeseries
+
+
+def buckets(n, n_buckets):
+    bounds = np.linspace(0, n, n_buckets + 1).astype('int64')
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+@pytest.mark.parametrize('n,n_buckets', [(10007, 100), (5000, 1000), (2001, 1000)])
+def test_decimation_keeps_every_bucket_extreme(n, n_buckets):
+    rng = np.random.default_rng(n)
+    values = np.cumsum(rng.normal(size=n))
+    values[rng.choice(n, n // 50, replace=False)] = np.nan
+    series = pd.Series(values, index=pd.date_range('2020-01-01', periods=n, freq='min'))
+
+    result = decimate_minmax(series, n_buckets)
+    assert len(result) <= 2 * n_buckets + 2
+    assert result.index.is_monotonic_increasing
+    pd.testing.assert_series_equal(result, series.loc[result.index])
+    assert result.index[0] == series.index[0] and result.index[-1] == series.index[-1]
+    for lo, hi in buckets(n, n_buckets):
+        bucket = series.iloc[lo:hi].dropna()
+        kept = result.loc[bucket.index[0]:bucket.index[-1]]
+        assert kept.min() == bucket.min() and kept.max() == bucket.max()
+
+
+def test_short_series_is_returned_unchanged():
+    series = pd.Series(np.arange(20.0))
+    assert decimate_minmax(series, 10) is series
+
+
+def test_render_pipeline_writes_figures(tmp_path):
+    index = pd.bdate_range('2025-01-01', periods=200)
+    spread = pd.Series(np.sin(np.arange(200) / 10.0), index=index)
+    pipeline = RenderPipeline(max_workers=1)
+    assert pipeline.executor._mp_context.get_start_method() == 'spawn'
+
+    path = str(tmp_path / 'timeseries.png')
+    pipeline.submit(plot_timeseries, [('Spread', spread, 'blue'), None], path, preview=True)
+    assert pipeline.wait() == [path]
+    assert os.path.getsize(path) > 0
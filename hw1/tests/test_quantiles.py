@@ -0,0 +1,76 @@
+"""Quantile backends versus Series.quantile."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from quantiles import (DEFAULT_QUANTILES, ExactQuantiles, TDigest, P2Quantiles, make_sketch,
+                       sketch_to_series)
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    values = rng.permutation(np.concatenate([rng.normal(size=20000), rng.standard_t(3, size=5000)]))
+    values[::997] = np.nan
+    return values
+
+
+def rank_error(values, estimates, qs):
+    """Largest distance between the requested and the achieved quantile ranks."""
+    clean = np.sort(values[~np.isnan(values)])
+    ranks = np.searchsorted(clean, estimates) / len(clean)
+    return np.max(np.abs(ranks - np.asarray(qs)))
+
+
+def test_exact_matches_series_quantile(values):
+    sketch = make_sketch('exact')
+    for chunk in np.array_split(values, 7):
+        sketch.update_many(chunk)
+    pd.testing.assert_series_equal(sketch_to_series(sketch), pd.Series(values).quantile(DEFAULT_QUANTILES))
+
+
+def test_tdigest_is_close_to_exact(values):
+    sketch = TDigest()
+    sketch.update_many(values)
+    assert sketch.count == np.count_nonzero(~np.isnan(values))
+    assert rank_error(values, sketch.quantile(), DEFAULT_QUANTILES) < 0.005
+
+
+def test_tdigest_merge_equals_single_sketch(values):
+    parts = [TDigest() for _ in range(4)]
+    for part, chunk in zip(parts, np.array_split(values, 4)):
+        part.update_many(chunk)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged = merged.merge(part)
+
+    assert rank_error(values, merged.quantile(), DEFAULT_QUANTILES) < 0.005
+    exact = pd.Series(values).quantile([0.0, 1.0]).to_numpy()
+    np.testing.assert_allclose(merged.quantile([0.0, 1.0]), exact)
+
+
+def test_p2_is_close_to_exact(values):
+    sketch = P2Quantiles()
+    sketch.update_many(values)
+    assert rank_error(values, sketch.quantile(), DEFAULT_QUANTILES) < 0.01
+    with pytest.raises(ValueError):
+        sketch.quantile([0.3])
+    with pytest.raises(TypeError):
+        sketch.merge(P2Quantiles())
+
+
+def test_exact_merge_keeps_all_values(values):
+    first, second = ExactQuantiles(), ExactQuantiles()
+    first.update_many(values[:1000])
+    second.update_many(values[1000:])
+    np.testing.assert_array_equal(first.merge(second).quantile(), pd.Series(values).quantile(DEFAULT_QUANTILES))
+
+
+@pytest.mark.parametrize('backend', ['exact', 'tdigest', 'p2'])
+def test_empty_sketches_give_nan(backend):
+    assert np.isnan(make_sketch(backend).quantile()).all()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_sketch('median-of-medians')
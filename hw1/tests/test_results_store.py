@@ -0,0 +1,69 @@
+"""Parquet results store versus the in-memory analysis results."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import build_spread
+from results_store import ResultsStore
+
+LABEL = 'CL Calendar Spread'
+
+
+@pytest.fixture
+def analyzed(make_analyzer):
+    analyzer = make_analyzer()
+    cl, ym = build_spread(analyzer, 'CL'), build_spread(analyzer, 'YM')
+    return (analyzer.analyze_spread_dynamics(cl, LABEL),
+            analyzer.analyze_cross_spread_dynamics(cl, ym, 'CL Spread', 'YM Spread'))
+
+
+def assert_same_results(loaded, results):
+    np.testing.assert_allclose(loaded['spread'].to_numpy(), results['spread'].to_numpy())
+    for key in ['mean', 'median', 'std', 'min', 'max']:
+        assert loaded['stats'][key] == pytest.approx(results['stats'][key], nan_ok=True)
+    np.testing.assert_allclose(loaded['stats']['quantiles'], results['stats']['quantiles'])
+    assert list(loaded['deviations']) == list(results['deviations'])
+    for key, dev in results['deviations'].items():
+        np.testing.assert_allclose(loaded['deviations'][key]['values'].to_numpy(), dev['values'].to_numpy())
+        assert loaded['deviations'][key]['std'] == pytest.approx(dev['std'])
+
+
+def test_rewrite_replaces_previous_results(analyzed, tmp_path):
+    results, _ = analyzed
+    store = ResultsStore(str(tmp_path))
+    store.write_spread_results(results)
+    store.write_spread_results(results)
+
+    n_windows = len(results['deviations'])
+    assert len(store.read('stats', spread=LABEL)) == 1 + n_windows
+    assert len(store.read('quantiles', spread=LABEL)) == (1 + n_windows) * len(results['stats']['quantiles'])
+    assert len(store.read_deviations(LABEL)) == len(results['spread'])
+    assert_same_results(store.load_results(LABEL), results)
+
+
+def test_append_adds_only_new_rows(analyzed, tmp_path):
+    results, _ = analyzed
+    store = ResultsStore(str(tmp_path))
+    head = dict(results, spread=results['spread'].iloc[:100],
+                deviations={key: dict(dev, values=dev['values'].iloc[:100])
+                            for key, dev in results['deviations'].items()})
+    tail = dict(results, spread=results['spread'].iloc[100:],
+                deviations={key: dict(dev, values=dev['values'].iloc[100:])
+                            for key, dev in results['deviations'].items()})
+    store.write_spread_results(head)
+    store.write_spread_results(tail, append=True)
+
+    assert len(store.read('stats', spread=LABEL)) == 1 + len(results['deviations'])
+    assert_same_results(store.load_results(LABEL), results)
+
+
+def test_cross_results_round_trip(analyzed, tmp_path):
+    _, cross = analyzed
+    store = ResultsStore(str(tmp_path))
+    store.write_cross_results('CL Spread', 'YM Spread', cross)
+    store.write_cross_results('CL Spread', 'YM Spread', cross)
+
+    assert len(store.read('cross')) == 1 + len(cross['d_correlations'])
+    loaded = store.load_cross_results('CL Spread', 'YM Spread')
+    assert loaded['correlation'] == pytest.approx(cross['correlation'])
+    assert loaded['d_correlations'] == pytest.approx(cross['d_correlations'])
@@ -0,0 +1,32 @@
+"""Rolling pair statistics of the analyzer versus pandas rolling windows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import build_spread
+
+
+@pytest.fixture
+def spreads(make_analyzer):
+    analyzer = make_analyzer()
+    return analyzer, build_spread(analyzer, 'CL'), build_spread(analyzer, 'YM')
+
+
+def test_rolling_pair_matches_pandas(spreads):
+    analyzer, cl, ym = spreads
+    results = analyzer.analyze_rolling_pair(cl, ym, windows=[5, 20])
+    for N in [5, 20]:
+        cov = cl.rolling(N).cov(ym)
+        np.testing.assert_allclose(results[N]['covariance'], cov, rtol=1e-8, atol=1e-9)
+        # pandas gives +-inf instead of NaN on windows where a spread is constant
+        corr = cl.rolling(N).corr(ym).replace([np.inf, -np.inf], np.nan)
+        np.testing.assert_allclose(results[N]['correlation'], corr, rtol=1e-8, atol=1e-9)
+        np.testing.assert_allclose(results[N]['beta'], cov / ym.rolling(N).var(), rtol=1e-8, atol=1e-9)
+
+
+def test_rolling_pair_of_empty_spreads(spreads, capsys):
+    analyzer, cl, ym = spreads
+    results = analyzer.analyze_rolling_pair(cl.iloc[:0], ym.iloc[:0], windows=[5])
+    assert len(results[5]) == 0
+    assert 'no data' in capsys.readouterr().out
+    assert analyzer.analyze_rolling_pair(None, ym) is None
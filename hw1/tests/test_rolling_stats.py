@@ -0,0 +1,107 @@
+"""Rolling statistics engine versus pandas rolling windows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling_stats import (rolling_means, rolling_comoments, RollingStatsEngine, OnlineRollingMean,
+                           COMOMENT_BLOCK)
+
+WINDOWS = [3, 5, 10, 20]
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    values = 50.0 + np.cumsum(rng.normal(size=300))
+    values[[0, 7, 8, 9, 120, 121]] = np.nan
+    return pd.Series(values, index=pd.date_range('2025-01-01', periods=300))
+
+
+@pytest.fixture
+def pair(series):
+    rng = np.random.default_rng(1)
+    other = 0.5 * series + pd.Series(rng.normal(size=len(series)), index=series.index)
+    other.iloc[[3, 50, 51]] = np.nan
+    return series, other
+
+
+def test_rolling_means_match_pandas(series):
+    means = rolling_means(series.to_numpy(), WINDOWS)
+    for N in WINDOWS:
+        np.testing.assert_allclose(means[N], series.rolling(N, min_periods=1).mean(), rtol=1e-10)
+
+
+def test_rolling_means_keep_precision_far_from_zero():
+    values = 1e6 + np.sin(np.arange(500))
+    means = rolling_means(values, [3])
+    np.testing.assert_allclose(means[3], pd.Series(values).rolling(3, min_periods=1).mean(), rtol=1e-12)
+
+
+def test_comoments_match_pandas(pair):
+    x, y = pair
+    stats = rolling_comoments(x.to_numpy(), y.to_numpy(), WINDOWS)
+    for N in WINDOWS:
+        cov = x.rolling(N).cov(y)
+        np.testing.assert_allclose(stats[N]['covariance'], cov, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(stats[N]['correlation'], x.rolling(N).corr(y), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(stats[N]['beta'], cov / y.rolling(N).var(), rtol=1e-8, atol=1e-10)
+
+
+def test_comoments_across_block_boundaries():
+    rng = np.random.default_rng(2)
+    n = 2 * COMOMENT_BLOCK + 100
+    x = pd.Series(np.cumsum(rng.normal(size=n)))
+    y = pd.Series(np.cumsum(rng.normal(size=n)))
+    stats = rolling_comoments(x.to_numpy(), y.to_numpy(), [20], min_periods=5)
+    np.testing.assert_allclose(stats[20]['correlation'], x.rolling(20, min_periods=5).corr(y),
+                               rtol=1e-7, atol=1e-9)
+
+
+def test_engine_deviations_match_pandas(series):
+    engine = RollingStatsEngine(WINDOWS)
+    deviations = engine.deviations(series)
+    for N in WINDOWS:
+        pd.testing.assert_series_equal(deviations[N], series - series.rolling(N, min_periods=1).mean(),
+                                       rtol=1e-10)
+
+
+def test_engine_memo_is_shared_and_bounded(series):
+    engine = RollingStatsEngine(WINDOWS, max_series=2)
+    first = engine.rolling_means(series)
+    assert engine.rolling_means(series)[5] is first[5]
+
+    copies = [series + i for i in range(3)]
+    for copy in copies:
+        engine.rolling_means(copy)
+    assert len(engine._cache) == 2
+    assert engine.rolling_means(series)[5] is not first[5]
+
+    engine.clear()
+    assert len(engine._cache) == 0
+
+
+def test_engine_explicit_key_survives_new_objects(series):
+    engine = RollingStatsEngine(WINDOWS)
+    first = engine.rolling_mean(series, 10, key='s')
+    assert engine.rolling_mean(series, 10, key='s') is first
+    # A different object under the same key is recomputed
+    changed = series * 2
+    np.testing.assert_allclose(engine.rolling_mean(changed, 10, key='s'), 2 * first)
+
+
+def test_online_rolling_mean_matches_pandas(series):
+    online = OnlineRollingMean(WINDOWS)
+    rows = np.array([online.update(x) for x in series.to_numpy()])
+    for i, N in enumerate(WINDOWS):
+        np.testing.assert_allclose(rows[:, i], series.rolling(N, min_periods=1).mean(), rtol=1e-10)
+
+
+def test_online_rolling_mean_vector_values_and_replace(pair):
+    x, y = pair
+    values = np.column_stack([x.to_numpy(), y.to_numpy()])
+    online = OnlineRollingMean.from_history(WINDOWS, values[:-1])
+    online.update(np.array([0.0, 0.0]))
+    means = online.replace(values[-1])
+    for i, N in enumerate(WINDOWS):
+        np.testing.assert_allclose(means[i], [x.rolling(N, min_periods=1).mean().iloc[-1],
+                                              y.rolling(N, min_periods=1).mean().iloc[-1]], rtol=1e-10)
@@ -0,0 +1,41 @@
+"""Sharded spread construction versus one unsharded run."""
+import pandas as pd
+import pytest
+
+from conftest import CountingConnection, START_DATE, END_DATE
+
+
+def unsharded_spread(analyzer, ticker, futcodes):
+    data = analyzer.download_futures_data(ticker, START_DATE, END_DATE)
+    front = analyzer.prepare_contract_data(data, futcodes[0])
+    second = analyzer.prepare_contract_data(data, futcodes[1])
+    return analyzer.calculate_calendar_spread(second, front)
+
+
+@pytest.mark.parametrize('shard', ['week', 'month'])
+def test_date_shards_cover_the_range_once(make_analyzer, shard):
+    shards = make_analyzer().date_shards('2025-06-04', '2025-09-02', shard)
+    days = pd.DatetimeIndex([])
+    for start, end in shards:
+        days = days.append(pd.date_range(start, end))
+    pd.testing.assert_index_equal(days, pd.date_range('2025-06-04', '2025-09-02'), check_names=False)
+
+
+@pytest.mark.parametrize('shard', ['week', 'month'])
+@pytest.mark.parametrize('ticker', ['CL', 'YM'])
+def test_sharded_spread_matches_unsharded(make_analyzer, daily_db, ticker, shard):
+    analyzer = make_analyzer(db_factory=lambda: CountingConnection(daily_db))
+    spread, futcodes = analyzer.calculate_spread_sharded(ticker, START_DATE, END_DATE, shard=shard)
+
+    expected = unsharded_spread(make_analyzer(), ticker, futcodes)
+    pd.testing.assert_series_equal(spread, expected, check_names=False)
+
+
+def test_sharded_spread_with_given_contracts(make_analyzer, daily_db):
+    analyzer = make_analyzer()
+    data = analyzer.download_futures_data('CL', START_DATE, END_DATE)
+    futcodes = analyzer.identify_top_contracts(data, n_contracts=2)
+
+    spread, used = analyzer.calculate_spread_sharded('CL', START_DATE, END_DATE, futcodes=futcodes, shard='week')
+    assert used == futcodes[:2]
+    pd.testing.assert_series_equal(spread, unsharded_spread(make_analyzer(), 'CL', futcodes), check_names=False)
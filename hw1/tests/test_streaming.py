@@ -0,0 +1,43 @@
+"""Chunked stream accumulation versus the single-frame path."""
+import pandas as pd
+import pytest
+
+from conftest import START_DATE, END_DATE
+from streaming import ContractStreamAccumulator
+
+
+def split_keys(chunks, keys):
+    """Keys whose rows are spread over more than one chunk."""
+    seen = {}
+    for i, chunk in enumerate(chunks):
+        for key in chunk.groupby(keys(chunk)).size().index:
+            seen.setdefault(key, set()).add(i)
+    return {key for key, parts in seen.items() if len(parts) > 1}
+
+
+@pytest.mark.parametrize('db,ticker,start,end,chunksize', [
+    ('daily', 'CL', START_DATE, END_DATE, 37),
+    ('daily', 'YM', START_DATE, END_DATE, 1),
+    ('minute', 'CL', '2025-11-03', '2025-11-21', 997),
+])
+def test_stream_matches_frame(make_analyzer, minute_db, db, ticker, start, end, chunksize):
+    analyzer = make_analyzer(minute_db if db == 'minute' else None, start_date=start, end_date=end)
+    df = analyzer.download_futures_data(ticker, start, end)
+    chunks = list(analyzer.stream_futures_data(ticker, start, end, chunksize=chunksize))
+    assert len(chunks) > 1
+    # Contracts (and with minute bars, single trading days) span chunk boundaries
+    assert split_keys(chunks, lambda chunk: chunk['futcode'])
+    if db == 'minute':
+        assert split_keys(chunks, lambda chunk: [chunk['futcode'], chunk['date'].dt.normalize()])
+
+    streamed = analyzer.consume_stream(iter(chunks))
+    assert isinstance(streamed, ContractStreamAccumulator)
+    assert len(streamed) == len(df)
+
+    top = analyzer.identify_top_contracts(df, n_contracts=4)
+    assert analyzer.identify_top_contracts(streamed, n_contracts=4) == top
+    for futcode in top:
+        expected = analyzer.prepare_contract_data(df, futcode)
+        result = analyzer.prepare_contract_data(streamed, futcode)
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+